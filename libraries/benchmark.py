@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import time
+import timeit
+import platform
+import argparse
+import tempfile
+import subprocess
+
+import libraries.constants as constants
+
+# Modules whose import cost is measured in a fresh interpreter
+cold_imports = ('pint', 'thermo', 'matplotlib.pyplot', 'libraries.simulation', 'simulate_motor')
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_time(function, number=1, repeat=3):
+    """Fastest of repeat runs of number calls to function, in seconds per call
+    """
+
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def external_temp():
+    return constants.ureg.Quantity(70, constants.ureg.degF)
+
+
+def simulate_run(report):
+    from libraries.run import simulate
+
+    def run():
+        # A fresh results directory each time, so the report is really rendered rather than skipped as unchanged
+        with tempfile.TemporaryDirectory() as results_dir:
+            simulate(True, external_temp(), report=report, cached=False, results_dir=results_dir)
+
+    return run
+
+
+def parts(reference=False):
+    """The combustion and nozzle of a fresh default simulation, at its first step
+    """
+
+    from libraries.simulation import Simulation
+
+    simulation = Simulation(external_temp(), reference=reference)
+
+    simulation.combustion.solve_for_average_total_mass_flow_rate()
+
+    return simulation.combustion, simulation.nozzle
+
+
+def combustion_step():
+    combustion, _ = parts()
+
+    return best_time(combustion.solve_for_average_total_mass_flow_rate, number=2000)
+
+
+def reference_combustion_step():
+    combustion, _ = parts(reference=True)
+
+    return best_time(combustion.solve_for_average_total_mass_flow_rate, number=20)
+
+
+def nozzle_evaluate():
+    combustion, nozzle = parts()
+
+    total_mass_flow_rate = combustion.average_total_mass_flow_rate
+    oxi_fuel_ratio = combustion.oxi_fuel_ratio_function()
+
+    return best_time(lambda: nozzle.evaluate(total_mass_flow_rate, oxi_fuel_ratio), number=2000)
+
+
+def reference_nozzle_evaluate():
+    combustion, nozzle = parts(reference=True)
+
+    return best_time(lambda: nozzle.evaluate(combustion.average_total_mass_flow_rate), number=20)
+
+
+def thermodynamic_live():
+    """A new state every call, so every property comes from thermo rather than the property cache
+    """
+
+    from libraries.thermochemical import Thermochemical
+    from libraries.thermodynamic import NumericThermodynamic, PropertyCache
+
+    mixture = Thermochemical().get_mixture()
+
+    thermo = NumericThermodynamic(mixture, cache=PropertyCache(1))
+    states = iter(range(10 ** 9))
+
+    def properties():
+        thermo.set_state(3000.0 + next(states) * 1e-6, mixture.P)
+
+        return thermo.K(), thermo.Cp(), thermo.density(), thermo.speed_of_sound()
+
+    return best_time(properties, number=200)
+
+
+def thermodynamic_tabulated():
+    from libraries.property_table import PropertyTable
+    from libraries.thermochemical import Thermochemical
+    from libraries.thermodynamic import NumericThermodynamic
+
+    mixture = Thermochemical(live=False).get_mixture()
+
+    thermo = NumericThermodynamic(mixture, table=PropertyTable.load_or_build(mixture))
+    states = iter(range(10 ** 9))
+
+    def properties():
+        thermo.set_state(3000.0 + next(states) * 1e-6, mixture.P)
+
+        return thermo.K(), thermo.Cp(), thermo.density(), thermo.speed_of_sound()
+
+    return best_time(properties, number=20000)
+
+
+def n2o_density():
+    from libraries.oxidiser import Oxidiser
+
+    temperature = external_temp()
+
+    return best_time(lambda: Oxidiser.n2o_density(temperature), number=2000)
+
+
+def fresh_interpreter(code):
+    """Seconds to run code in a fresh interpreter, start up included
+    """
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
+
+    return time.perf_counter() - start
+
+
+def import_time(module):
+    """Seconds to import module in a fresh interpreter, over the cost of starting one
+    """
+
+    def measure():
+        return min(fresh_interpreter('import ' + module) for _ in range(3)) - min(fresh_interpreter('pass') for _ in range(3))
+
+    return measure
+
+
+# A short tabulated run without a report, the start up a sweep worker or a quick design check pays
+cold_start_code = """
+import tempfile
+
+import libraries.constants as constants
+
+from libraries.run import simulate
+
+with tempfile.TemporaryDirectory() as results_dir:
+    simulate(True, constants.ureg.Quantity(70, constants.ureg.degF), tabulated=True, report=False, cached=False, results_dir=results_dir)
+"""
+
+
+def cold_start():
+    return min(fresh_interpreter(cold_start_code) for _ in range(3))
+
+
+# name: (function returning seconds, what the seconds are per)
+benchmarks = {
+    'simulate': (lambda: best_time(simulate_run(False)), 'run'),
+    'simulate_with_report': (lambda: best_time(simulate_run(True), repeat=2), 'run'),
+    'combustion_step': (combustion_step, 'step'),
+    'reference_combustion_step': (reference_combustion_step, 'step'),
+    'nozzle_evaluate': (nozzle_evaluate, 'step'),
+    'reference_nozzle_evaluate': (reference_nozzle_evaluate, 'step'),
+    'thermodynamic_live': (thermodynamic_live, 'state'),
+    'thermodynamic_tabulated': (thermodynamic_tabulated, 'state'),
+    'n2o_density': (n2o_density, 'call'),
+    'cold_start_tabulated_run': (cold_start, 'process')
+}
+
+for module in cold_imports:
+    benchmarks['import_' + module] = (import_time(module), 'import')
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=None, label=None):
+    """One history entry with the seconds of every benchmark in names, all of them by default
+    """
+
+    names = list(benchmarks) if not names else names
+
+    unknown = set(names) - set(benchmarks)
+
+    if unknown:
+        raise ValueError('Unknown benchmarks: {}'.format(', '.join(sorted(unknown))))
+
+    results = {}
+
+    for name in names:
+        function, unit = benchmarks[name]
+
+        results[name] = {'seconds': function(), 'per': unit}
+
+        print('{:>32}: {:>12.6g} s per {}'.format(name, results[name]['seconds'], unit), flush=True)
+
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'label': label,
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': results
+    }
+
+
+def load_history(path=constants.benchmark_history_path):
+    if not os.path.exists(path):
+        return []
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_history(entry, path=constants.benchmark_history_path):
+    history = load_history(path)
+    history.append(entry)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=4)
+
+    return history
+
+
+def compare(baseline, latest, threshold=constants.benchmark_regression_threshold):
+    """[(name, baseline seconds, latest seconds, latest / baseline, regressed)] of every benchmark both entries ran
+
+    A benchmark regressed when it got more than threshold, a fraction, slower.
+    """
+
+    rows = []
+
+    for name, result in latest['results'].items():
+        if name not in baseline['results']:
+            continue
+
+        before = baseline['results'][name]['seconds']
+        after = result['seconds']
+
+        ratio = after / before if before > 0 else float('inf')
+
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+
+    return rows
+
+
+def describe(entry):
+    return '{} {}{}'.format(entry['time'], entry['commit'], ' ({})'.format(entry['label']) if entry.get('label') else '')
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog='python -m libraries.benchmark', description='Times the simulation hot paths')
+    parser.add_argument('--history', default=constants.benchmark_history_path, help='JSON history file')
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_command = commands.add_parser('run', help='run benchmarks and append the results to the history')
+    run_command.add_argument('names', nargs='*', help='benchmarks to run, all by default: ' + ', '.join(benchmarks))
+    run_command.add_argument('--label', help='note stored with the results')
+    run_command.add_argument('--no-save', action='store_true', help='only print the results')
+
+    compare_command = commands.add_parser('compare', help='compare two history entries, exits 1 on a regression')
+    compare_command.add_argument('--baseline', type=int, default=-2, help='history index of the baseline, default the one before last')
+    compare_command.add_argument('--latest', type=int, default=-1, help='history index compared against it, default the last')
+    compare_command.add_argument('--threshold', type=float, default=constants.benchmark_regression_threshold, help='slowdown fraction flagged as a regression')
+
+    arguments = parser.parse_args(arguments)
+
+    if arguments.command == 'run':
+        try:
+            entry = run(arguments.names, arguments.label)
+        except ValueError as error:
+            parser.error(str(error))
+
+        if not arguments.no_save:
+            append_history(entry, arguments.history)
+
+        return 0
+
+    history = load_history(arguments.history)
+
+    if len(history) < 2:
+        print('Need at least two benchmark runs in {} to compare'.format(arguments.history))
+
+        return 1
+
+    baseline = history[arguments.baseline]
+    latest = history[arguments.latest]
+
+    print('baseline {}\nlatest   {}\n'.format(describe(baseline), describe(latest)))
+
+    regressions = 0
+
+    for name, before, after, ratio, regressed in compare(baseline, latest, arguments.threshold):
+        regressions += regressed
+
+        print('{:>32}: {:>12.6g} -> {:>12.6g} s  x{:.2f}{}'.format(name, before, after, ratio, '  REGRESSION' if regressed else ''))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
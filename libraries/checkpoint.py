@@ -0,0 +1,393 @@
+import os
+import json
+import itertools
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import libraries.constants as constants
+
+from libraries import sweep
+from libraries.config import MotorConfig
+from libraries.property_table import PropertyTable
+from libraries.result_cache import code_version
+from libraries.simulation import Simulation, create_simulation
+from libraries.thermochemical import Thermochemical
+
+checkpoint_version = 2
+
+# Attributes of each part of a numeric engine Simulation that change during the burn, everything else follows
+# from its config. Attributes a part does not have, e.g. the cells of a lumped grain, are left out.
+state_attributes = {
+    'simulation': ('time', 'count', 'impulse'),
+    'combustion': (
+        'average_port_diameter',
+        'average_total_mass_flow_rate',
+        'average_total_mass_flux',
+        'average_regression_rate',
+        'average_fuel_mass_flow_rate',
+        'oxi_fuel_ratio',
+        'iterations',
+        'residual',
+        'port_diameters',
+        'flows',
+        'previous_flows',
+        'fuel_mass_flow_rates',
+        'regression_rates'
+    ),
+    'oxidiser': (
+        'mass',
+        'mass_flow_rate',
+        'temperature',
+        'pressure',
+        'liquid',
+        'vapour_temperature',
+        'vapour_pressure',
+        'vapour_density',
+        'chamber_pressure_per_flow'
+    ),
+    'nozzle': ('oxi_fuel_ratio',)
+}
+
+recorder_attributes = ('count', 'written', 'written_sums', 'written_peaks')
+
+recorder_parts = ('recorder', 'solver_recorder')
+
+# Parameters that decide which parts a simulation is built from, a branch cannot change them
+structural_parameters = ('integrator', 'recording', 'oxidiser_model', 'combustion_model', 'chamber_pressure_model', 'grain_model', 'grain_cells')
+
+
+def parts(simulation):
+    return {
+        'simulation': simulation,
+        'combustion': simulation.combustion,
+        'oxidiser': simulation.oxidiser,
+        'nozzle': simulation.nozzle
+    }
+
+
+def plain(value):
+    """value as a JSON serialisable scalar, NumPy scalars included
+    """
+
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def rows_path(path, part):
+    """The file the rows of one recorder of the checkpoint at path are appended to, next to it
+    """
+
+    return '{}.{}.rows'.format(path, part)
+
+
+def checkpoint_files(path):
+    return [path] + [rows_path(path, part) for part in recorder_parts]
+
+
+def remove_checkpoint(path):
+    """Removes the checkpoint at path and its rows files
+    """
+
+    for file in checkpoint_files(path):
+        if os.path.exists(file):
+            os.remove(file)
+
+
+def append_rows(recorder, path, start):
+    """Writes the rows of recorder from row start on to the end of path, a raw float64 file of (time, values) rows
+
+    Anything already in the file past start, the rows of a save that crashed before its checkpoint was
+    renamed into place, is cut off first.
+    """
+
+    row_size = (recorder.values.shape[0] + 1) * np.dtype(np.float64).itemsize
+
+    if not os.path.exists(path) or os.path.getsize(path) < start * row_size:
+        start = 0
+
+    with open(path, 'r+b' if start else 'wb') as f:
+        f.seek(start * row_size)
+        f.truncate()
+
+        rows = np.empty((recorder.count - start, recorder.values.shape[0] + 1))
+        rows[:, 0] = recorder.times[start:recorder.count]
+        rows[:, 1:] = recorder.values[:, start:recorder.count].T
+
+        f.write(rows.tobytes())
+
+
+def load_rows(path, columns, count):
+    """(times, values) of the first count rows of a rows file written by append_rows()
+    """
+
+    try:
+        rows = np.fromfile(path, dtype=np.float64, count=count * (columns + 1))
+    except FileNotFoundError:
+        rows = np.empty(0)
+
+    if rows.shape[0] != count * (columns + 1):
+        raise ValueError('{} is missing rows of its checkpoint'.format(path))
+
+    rows = rows.reshape(count, columns + 1)
+
+    return rows[:, 0].copy(), np.ascontiguousarray(rows[:, 1:].T)
+
+
+def check_checkpointable(simulation):
+    if simulation.reference:
+        raise ValueError('Only the numeric engine can be checkpointed')
+
+    if type(simulation) is not Simulation:
+        raise ValueError('Only the Euler stepped Simulation can be checkpointed')
+
+    if simulation.recorder.sink is not None:
+        raise ValueError('A streamed run cannot be checkpointed, its rows are in the output file')
+
+
+def save_checkpoint(simulation, path, compress=False):
+    """Saves the complete state of a numeric engine burn at a step boundary to path, a binary .npz file
+
+    The scalars and the config go in a JSON header and the state arrays in float64, so a resumed run is
+    bit for bit the uninterrupted one. The recorded rows go in a rows file per recorder next to it, see
+    rows_path(), and only the rows since the last save to path are appended, so a save costs the same
+    however long the burn. The .npz is written next to path and renamed over it once the rows are in, so
+    a crash never leaves half a checkpoint. compress only shrinks the state arrays, the rows stay raw.
+    """
+
+    check_checkpointable(simulation)
+
+    scalars = {}
+    arrays = {}
+
+    for part, state in parts(simulation).items():
+        for name in state_attributes[part]:
+            if not hasattr(state, name):
+                continue
+
+            value = getattr(state, name)
+
+            if isinstance(value, np.ndarray):
+                arrays['{}.{}'.format(part, name)] = value
+            else:
+                scalars['{}.{}'.format(part, name)] = plain(value)
+
+    if simulation.nozzle.variable_chamber:
+        thermo = simulation.nozzle.combustion_thermo
+
+        scalars['nozzle.chamber'] = [thermo.T(), thermo.P()]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    for part in recorder_parts:
+        recorder = getattr(simulation, part)
+
+        for name in recorder_attributes:
+            value = getattr(recorder, name)
+
+            if isinstance(value, np.ndarray):
+                arrays['{}.{}'.format(part, name)] = value
+            else:
+                scalars['{}.{}'.format(part, name)] = plain(value)
+
+        scalars['{}.columns'.format(part)] = recorder.values.shape[0]
+
+        append_rows(recorder, rows_path(path, part), simulation.checkpointed_rows.get((path, part), 0))
+
+        simulation.checkpointed_rows[(path, part)] = recorder.count
+
+    header = {
+        'version': checkpoint_version,
+        'code version': code_version(),
+        'config': simulation.config.plain_values(),
+        'external temp': [simulation.external_temp.magnitude, str(simulation.external_temp.units)],
+        'state': scalars
+    }
+
+    staging = path + '.partial'
+
+    with open(staging, 'wb') as f:
+        (np.savez_compressed if compress else np.savez)(f, header=np.array(json.dumps(header)), **arrays)
+
+    os.replace(staging, path)
+
+
+class Checkpoint:
+    """A saved burn state, its config and external temperature, see save_checkpoint()
+    """
+
+    def __init__(self, path, config, external_temp, scalars, arrays):
+        self.path = path
+        self.config = config
+        self.external_temp = external_temp
+        self.scalars = scalars
+        self.arrays = arrays
+
+    @property
+    def time(self):
+        return self.scalars['simulation.time']
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            header = json.loads(str(data['header']))
+            arrays = {name: data[name] for name in data.files if name != 'header'}
+
+        if header['version'] != checkpoint_version:
+            raise ValueError('{} is a version {} checkpoint, this is version {}'.format(path, header['version'], checkpoint_version))
+
+        if header['code version'] != code_version():
+            raise ValueError('{} was saved by a different version of libraries/, its state may not fit this model'.format(path))
+
+        scalars = header['state']
+
+        for part in recorder_parts:
+            times, values = load_rows(rows_path(path, part), scalars['{}.columns'.format(part)], scalars['{}.count'.format(part)])
+
+            arrays['{}.times'.format(part)] = times
+            arrays['{}.values'.format(part)] = values
+
+        magnitude, units = header['external temp']
+
+        return cls(path, MotorConfig(**header['config']), constants.ureg.Quantity(magnitude, units), scalars, arrays)
+
+    def restore(self, simulation):
+        """Moves a freshly built simulation of this checkpoint's structure to the saved state
+        """
+
+        check_checkpointable(simulation)
+
+        for part, state in parts(simulation).items():
+            for name in state_attributes[part]:
+                key = '{}.{}'.format(part, name)
+
+                if key in self.arrays:
+                    if getattr(state, name).shape != self.arrays[key].shape:
+                        raise ValueError('The checkpoint {} does not fit this simulation'.format(key))
+
+                    setattr(state, name, self.arrays[key].copy())
+                elif key in self.scalars:
+                    setattr(state, name, self.scalars[key])
+
+        if 'nozzle.chamber' in self.scalars:
+            nozzle = simulation.nozzle
+            T, P = self.scalars['nozzle.chamber']
+
+            # Rebuilds the chamber, exit and chemistry state the last step left, from its T, P and O/F
+            nozzle.combustion_thermo.set_state(T, P)
+            nozzle.set_chamber_pressure(P)
+            nozzle.combustion_state = nozzle.combustion_state_function()
+
+        for part in recorder_parts:
+            recorder = getattr(simulation, part)
+
+            times = self.arrays['{}.times'.format(part)]
+            values = self.arrays['{}.values'.format(part)]
+
+            if values.shape[0] != recorder.values.shape[0]:
+                raise ValueError('The checkpoint {} columns do not fit this simulation'.format(part))
+
+            capacity = max(recorder.times.shape[0], len(times))
+
+            recorder.times = np.empty(capacity)
+            recorder.values = np.empty((values.shape[0], capacity))
+
+            recorder.times[:len(times)] = times
+            recorder.values[:, :len(times)] = values
+
+            for name in recorder_attributes:
+                key = '{}.{}'.format(part, name)
+
+                setattr(recorder, name, self.arrays[key].copy() if key in self.arrays else self.scalars[key])
+
+            # The rows files already hold these rows, the next save to this checkpoint appends after them
+            simulation.checkpointed_rows[(self.path, part)] = len(times)
+
+        return simulation
+
+
+def resume(path, table=None, mixture=None, **parameters):
+    """Simulation at the state saved in the checkpoint at path, ready to run() on
+
+    parameters, MotorConfig parameters, branch the burn into a what-if continuation, e.g. another
+    injector_mass_flow_rate or grain_diameter from the saved moment on. The structural_parameters stay.
+    """
+
+    checkpoint = Checkpoint.load(path)
+
+    changed = [name for name in structural_parameters if name in parameters and parameters[name] != getattr(checkpoint.config, name)]
+
+    if changed:
+        raise ValueError('A branch cannot change {}'.format(', '.join(changed)))
+
+    config = checkpoint.config.replace(**parameters)
+
+    simulation = create_simulation(checkpoint.external_temp, config, table=table, mixture=mixture)
+
+    return checkpoint.restore(simulation)
+
+
+def run_branch(path, parameters):
+    """Runs one continuation of a checkpoint in a process warmed up by sweep.warm_up(), returns its results row
+    """
+
+    simulation = resume(path, table=sweep.worker_table, mixture=sweep.worker_mixture, **parameters)
+
+    try:
+        simulation.run()
+        error = None
+    except Exception as e:
+        error = str(e)
+
+    row = simulation.config.magnitudes(list(parameters))
+    row.update(simulation.summary())
+    row['error'] = error
+
+    return row
+
+
+def branch(path, parameter_sets, workers=None, tabulated=False):
+    """Runs a what-if continuation of the checkpoint at path for every parameter set, one results row each
+
+    Every branch starts from the saved state, so the burn up to it is never run again. Rows are laid out
+    like the sweep results, see libraries/sweep.py.
+    """
+
+    parameter_sets = list(parameter_sets)
+
+    external_temp = Checkpoint.load(path).external_temp
+
+    if tabulated:
+        # Built once here so the workers never race to write the table file
+        PropertyTable.load_or_build(Thermochemical(live=False).get_mixture())
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    if workers == 1:
+        sweep.warm_up(tabulated, external_temp)
+
+        rows = [run_branch(path, parameters) for parameters in parameter_sets]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=sweep.warm_up, initargs=(tabulated, external_temp)) as executor:
+            rows = list(executor.map(run_branch, itertools.repeat(path), parameter_sets))
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    # Half way through the default burn, what if the injector flow were turned up or down from there
+    path = os.path.join(tempfile.mkdtemp(), 'half_burn.npz')
+
+    simulation = create_simulation(constants.ureg.Quantity(70, constants.ureg.degF)).run(until=6.0)
+    save_checkpoint(simulation, path, compress=True)
+
+    print('Checkpoint at {:.3f} s, {} bytes'.format(Checkpoint.load(path).time, sum(os.path.getsize(file) for file in checkpoint_files(path))))
+
+    results = branch(path, sweep.parameter_grid(injector_mass_flow_rate=[0.02, 0.0274, 0.035]), tabulated=True)
+
+    print(results.to_string())
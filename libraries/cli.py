@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.sinks import output_formats
+
+# Settings of one job in a motor definition file, parameters are its MotorConfig parameters
+job_settings = ('name', 'motor', 'ideal', 'external_temp', 'reference', 'tabulated', 'cached', 'summary_page', 'parameters')
+
+# The job python simulate_motor.py runs without any files
+default_job = {'name': 'default', 'ideal': True, 'external_temp': 70, 'parameters': {}}
+
+# Per-process state set up once by warm_up(), shared by every job the process runs
+worker_mixture = None
+worker_table = None
+
+
+def load_document(path):
+    """The contents of a JSON, YAML or TOML file, by its extension
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.json':
+        with open(path) as f:
+            return json.load(f)
+
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('YAML motor definitions need PyYAML installed')
+
+        with open(path) as f:
+            return yaml.safe_load(f)
+
+    if extension == '.toml':
+        import tomllib
+
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+
+    raise ValueError('Unknown motor definition format: {}, use .json, .yaml or .toml'.format(path))
+
+
+def check_job(job, path):
+    unknown = set(job) - set(job_settings)
+
+    if unknown:
+        raise ValueError('Unknown job settings in {}: {}'.format(path, ', '.join(sorted(unknown))))
+
+    # Fail on a misspelt parameter before running anything
+    MotorConfig(**job.get('parameters', {}))
+
+    return job
+
+
+def merge(base, job):
+    """job over base, their parameters merged the same way
+    """
+
+    merged = dict(base, **job)
+    merged['parameters'] = dict(base.get('parameters', {}), **job.get('parameters', {}))
+
+    return merged
+
+
+def resolve(job, directory):
+    """job on top of the motor definition it names, if any, a path relative to directory
+    """
+
+    if 'motor' not in job:
+        return job
+
+    path = os.path.join(directory, job['motor'])
+    motor = load_document(path)
+
+    if 'jobs' in motor:
+        raise ValueError('{} is a manifest, a job can only build on a single motor definition'.format(path))
+
+    job = merge(check_job(motor, path), job)
+    job.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+
+    del job['motor']
+
+    return job
+
+
+def load_jobs(path):
+    """The jobs of a motor definition file, or of a manifest of them
+
+    A motor definition holds the settings of one job, its MotorConfig parameters under parameters. A
+    manifest lists jobs under jobs, each a motor definition of its own or one building on the file named
+    by its motor setting, with any defaults applied to every job.
+    """
+
+    document = load_document(path)
+    directory = os.path.dirname(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    if 'jobs' not in document:
+        job = resolve(check_job(document, path), directory)
+        job.setdefault('name', stem)
+
+        return [job]
+
+    unknown = set(document) - {'jobs', 'defaults'}
+
+    if unknown:
+        raise ValueError('Unknown manifest settings in {}: {}'.format(path, ', '.join(sorted(unknown))))
+
+    defaults = check_job(document.get('defaults', {}), path)
+
+    jobs = []
+
+    for i, job in enumerate(document['jobs']):
+        job = resolve(check_job(job, path), directory)
+        job = merge(defaults, job)
+        job.setdefault('name', '{}-{}'.format(stem, i))
+
+        jobs.append(job)
+
+    return jobs
+
+
+def external_temp(value):
+    """A number in degF or text with its own units
+    """
+
+    if isinstance(value, str):
+        return constants.parse_quantity(value)
+
+    return constants.ureg.Quantity(value, constants.ureg.degF)
+
+
+def warm_up(tabulated):
+    """Loads the mixture and the property table once per process, every job the process runs then shares them
+
+    The mixture is a MixtureState, simulate() makes a thermo Mixture of it for the jobs that read their gas
+    properties live, so thermo is imported by the first of them and not at all when every job is a cache hit.
+    """
+
+    global worker_mixture, worker_table
+
+    from libraries.property_table import PropertyTable
+    from libraries.thermochemical import Thermochemical
+
+    worker_mixture = Thermochemical(live=False).get_mixture()
+
+    if tabulated:
+        worker_table = PropertyTable.load_or_build(worker_mixture)
+    else:
+        worker_table = None
+
+
+def run_job(job, results_dir, report=True, workers=None, output_format='csv', cached=True, instrument=False, profile=False, checkpoint=False):
+    """Runs one job with the warmed up state of this process, returns its row of the batch results
+    """
+
+    from libraries.run import simulate
+
+    row = {'name': job['name'], 'results dir': results_dir, 'error': None}
+
+    try:
+        os.makedirs(results_dir, exist_ok=True)
+
+        nozzle_results = simulate(
+            job.get('ideal', True),
+            external_temp(job.get('external_temp', 70)),
+            reference=job.get('reference', False),
+            tabulated=job.get('tabulated', False),
+            config=MotorConfig(**job.get('parameters', {})),
+            report=report,
+            workers=workers,
+            summary_page=job.get('summary_page', False),
+            results_dir=results_dir,
+            cached=cached and job.get('cached', True),
+            instrument=instrument,
+            profile=profile,
+            output_format=output_format,
+            mixture=worker_mixture,
+            table=worker_table,
+            checkpoint=os.path.join(results_dir, 'checkpoint.npz') if checkpoint else None
+        )
+    except Exception as e:
+        row['error'] = str(e)
+
+        return row
+
+    for name, value in nozzle_results.items():
+        row[name] = value.to(constants.ureg.inches).magnitude
+
+    return row
+
+
+def run_jobs(jobs, results_dir='results', workers=None, report=True, output_format='csv', cached=True, instrument=False, profile=False, checkpoint=False):
+    """Runs every job in this process or across a pool of workers, one row of results per job
+
+    thermo, the pint registry and the property table are loaded once per process instead of once per job.
+    With more than one job each job's results go in a directory of results_dir named after it.
+    checkpoint saves each numeric burn's state in its results directory as it runs, so jobs stopped part
+    way resume where they were when run again.
+    """
+
+    names = [job['name'] for job in jobs]
+
+    if len(set(names)) != len(names):
+        raise ValueError('Job names must be unique, their results would overwrite each other')
+
+    if len(jobs) == 1:
+        directories = [results_dir]
+    else:
+        directories = [os.path.join(results_dir, name) for name in names]
+
+    tabulated = any(job.get('tabulated', False) for job in jobs)
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    workers = min(workers, len(jobs))
+
+    if workers <= 1:
+        warm_up(tabulated)
+
+        return [
+            run_job(job, directory, report, None, output_format, cached, instrument, profile, checkpoint)
+            for job, directory in zip(jobs, directories)
+        ]
+
+    if tabulated:
+        # Built once here so the workers never race to write the table file
+        warm_up(tabulated)
+
+    # Jobs already run in parallel, so each report draws its figures in its own worker
+    with ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(tabulated,)) as executor:
+        futures = [
+            executor.submit(run_job, job, directory, report, 1, output_format, cached, instrument, profile, checkpoint)
+            for job, directory in zip(jobs, directories)
+        ]
+
+        return [future.result() for future in futures]
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        prog='python simulate_motor.py',
+        description='Simulates hybrid rocket motor burns from motor definition files',
+        epilog=(
+            'A motor definition is a JSON, YAML or TOML file of job settings: name, ideal, external_temp '
+            '(degF, or text with units like "21 degC"), reference, tabulated, cached, summary_page and '
+            'parameters, the MotorConfig parameters, numbers in the units of libraries/constants.py or text '
+            'with units like "2 inch". A manifest lists such jobs under jobs, each may build on a motor '
+            'definition file named by motor, with defaults applied to all of them. Without files the '
+            'default motor of libraries/constants.py is run at 70 degF.'
+        )
+    )
+    parser.add_argument('files', nargs='*', help='motor definitions or manifests of jobs')
+    parser.add_argument('--workers', type=int, help='processes running jobs in parallel, or drawing the report of a single job, default one per CPU')
+    parser.add_argument('--no-report', action='store_true', help='skip the PDF reports')
+    parser.add_argument('--output-format', choices=list(output_formats), default='csv', help='time series file format')
+    parser.add_argument('--results-dir', default='results', help='where results are saved, in a directory per job when there are several')
+    parser.add_argument('--no-cache', action='store_true', help='run every job again instead of reusing cached results')
+    parser.add_argument('--instrument', action='store_true', help='time the phases of every run')
+    parser.add_argument('--profile', action='store_true', help='also run cProfile over every run')
+    parser.add_argument('--checkpoint', action='store_true', help='save each burn\'s state as it runs and resume stopped burns from it')
+
+    arguments = parser.parse_args(arguments)
+
+    try:
+        jobs = [job for path in arguments.files for job in load_jobs(path)] or [default_job]
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    rows = run_jobs(
+        jobs,
+        results_dir=arguments.results_dir,
+        workers=arguments.workers,
+        report=not arguments.no_report,
+        output_format=arguments.output_format,
+        cached=not arguments.no_cache,
+        instrument=arguments.instrument,
+        profile=arguments.profile,
+        checkpoint=arguments.checkpoint
+    )
+
+    for row in rows:
+        if row['error'] is None:
+            print('{}: throat {:.4f} inch, exit {:.4f} inch, diffuser {:.4f} inch, in {}'.format(
+                row['name'],
+                row['nozzle_throat_dia_avg'],
+                row['nozzle_exit_dia_avg'],
+                row['nozzle_diffuser_len_avg'],
+                row['results dir']
+            ))
+        else:
+            print('{}: failed, {}'.format(row['name'], row['error']))
+
+    return 1 if any(row['error'] is not None for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
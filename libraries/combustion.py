@@ -1,13 +1,17 @@
 import math
 
+import numpy as np
+
 import libraries.constants as constants
 
 
 class Combustion:
-    def __init__(self, oxidiser, time_step):
-        self.average_port_diameter = constants.initial_port_diameter
+    def __init__(self, oxidiser, config):
+        self.config = config
+
+        self.average_port_diameter = config.initial_port_diameter
         self.oxidiser = oxidiser
-        self.time_step = time_step
+        self.time_step = config.time_step
 
         self.average_total_mass_flow_rate = self.oxidiser.mass_flow_rate_function()
 
@@ -26,12 +30,12 @@ class Combustion:
 
             self.average_total_mass_flow_rate = self.average_fuel_mass_flow_rate_function() + oxi_mass_flow_rate
 
-            if abs(self.average_total_mass_flow_rate - temp_average_total_mass_flow_rate).magnitude < constants.iteration_precision:
+            if abs(self.average_total_mass_flow_rate - temp_average_total_mass_flow_rate).magnitude < self.config.iteration_precision:
                 break
 
         self.average_port_diameter += 2 * self.average_regression_rate * self.time_step / 100
 
-        if self.average_port_diameter.to_base_units().magnitude > constants.grain_diameter.to_base_units().magnitude:
+        if self.average_port_diameter.to_base_units().magnitude > self.config.grain_diameter.to_base_units().magnitude:
             print('Motor burn through! Fuel grain too thin!')
             raise ValueError('Motor burn through! Fuel grain too thin!')
 
@@ -52,10 +56,10 @@ class Combustion:
         average_total_mass_flux = self.average_total_mass_flux_function().to_base_units()
         average_total_mass_flux_units = average_total_mass_flux.units
 
-        port_length = constants.port_length.to_base_units()
+        port_length = self.config.port_length.to_base_units()
         port_length_units = port_length.units
 
-        self.average_regression_rate = constants.a * (average_total_mass_flux.magnitude ** constants.n) * (port_length.magnitude ** constants.m)
+        self.average_regression_rate = self.config.a * (average_total_mass_flux.magnitude ** self.config.n) * (port_length.magnitude ** self.config.m)
 
         # Now fix the units
         self.average_regression_rate = self.average_regression_rate * port_length_units * average_total_mass_flux_units
@@ -65,7 +69,7 @@ class Combustion:
     def average_fuel_mass_flow_rate_function(self):
         """average_fuel_mass_flow_rate = fuel_density * average_regression_rate * port_surface_area
         """
-        self.average_fuel_mass_flow_rate = constants.fuel_density * self.average_regression_rate_function() * self.average_port_surface_area()
+        self.average_fuel_mass_flow_rate = self.config.fuel_density * self.average_regression_rate_function() * self.average_port_surface_area()
 
         return self.average_fuel_mass_flow_rate
 
@@ -73,7 +77,7 @@ class Combustion:
         """average_port_surface_area = self.average_port_diameter * math.pi *self.port_length
         """
 
-        average_port_surface_area = self.average_port_diameter * math.pi * constants.port_length
+        average_port_surface_area = self.average_port_diameter * math.pi * self.config.port_length
 
         return average_port_surface_area
 
@@ -87,3 +91,312 @@ class Combustion:
             pass
 
         return self.oxi_fuel_ratio
+
+
+class NumericCombustion:
+    """Unit-free twin of Combustion, every value is a plain float in SI base units
+    """
+
+    def __init__(self, oxidiser, config):
+        self.config = config
+
+        self.average_port_diameter = constants.to_si(config.initial_port_diameter)
+        self.oxidiser = oxidiser
+        self.time_step = constants.to_si(config.time_step)
+
+        self.port_length = constants.to_si(config.port_length)
+        self.grain_diameter = constants.to_si(config.grain_diameter)
+        self.fuel_density = constants.to_si(config.fuel_density)
+        self.a = constants.to_si(config.a)
+        self.n = config.n
+        self.m = config.m
+
+        # The reference loop compares magnitudes in the units pint carries for the fuel mass flow rate
+        # (fuel_density * regression_rate * port_diameter * port_length), not in kg/s
+        self.iteration_precision = constants.to_si(
+            config.iteration_precision *
+            config.fuel_density.units *
+            (constants.ureg.m / constants.ureg.sec) *
+            config.initial_port_diameter.units *
+            config.port_length.units
+        )
+
+        self.solver = config.mass_flow_solver
+        self.relative_precision = config.iteration_relative_precision
+        self.absolute_precision = constants.to_si(config.iteration_absolute_precision)
+        self.max_iterations = config.max_iterations
+
+        self.average_total_mass_flow_rate = self.oxidiser.mass_flow_rate_function()
+
+        self.average_total_mass_flux = None
+        self.average_regression_rate = None
+        self.average_fuel_mass_flow_rate = None
+        self.oxi_fuel_ratio = None
+
+        # Solver diagnostics of the last step
+        self.iterations = 0
+        self.residual = 0.0
+
+    def solve_for_average_total_mass_flow_rate(self):
+        oxi_mass_flow_rate = self.oxidiser.mass_flow_rate_function()
+
+        self.solve_total_mass_flow_rate(oxi_mass_flow_rate)
+
+        self.average_port_diameter += 2 * self.average_regression_rate * self.time_step / 100
+
+        if self.average_port_diameter > self.grain_diameter:
+            print('Motor burn through! Fuel grain too thin!')
+            raise ValueError('Motor burn through! Fuel grain too thin!')
+
+        return self.average_total_mass_flow_rate
+
+    def solve_total_mass_flow_rate(self, oxi_mass_flow_rate):
+        """Total mass flow rate at the current port diameter, with the configured solver
+        """
+
+        if self.solver == 'fixed_point':
+            return self.fixed_point_solve(oxi_mass_flow_rate)
+
+        return self.newton_solve(oxi_mass_flow_rate)
+
+    def fixed_point_solve(self, oxi_mass_flow_rate):
+        """Successive substitution, total_mass_flow_rate = oxi_mass_flow_rate + average_fuel_mass_flow_rate(total_mass_flow_rate)
+        """
+
+        self.average_total_mass_flow_rate = oxi_mass_flow_rate
+        self.iterations = 0
+
+        while True:
+            temp_average_total_mass_flow_rate = self.average_total_mass_flow_rate
+
+            self.average_total_mass_flow_rate = self.average_fuel_mass_flow_rate_function() + oxi_mass_flow_rate
+            self.iterations += 1
+
+            if abs(self.average_total_mass_flow_rate - temp_average_total_mass_flow_rate) < self.iteration_precision:
+                break
+
+        self.residual = self.mass_flow_residual(self.average_total_mass_flow_rate, oxi_mass_flow_rate)
+
+        return self.average_total_mass_flow_rate
+
+    def newton_solve(self, oxi_mass_flow_rate):
+        """Safeguarded Newton on residual = total_mass_flow_rate - oxi_mass_flow_rate - average_fuel_mass_flow_rate(total_mass_flow_rate)
+
+        d(average_fuel_mass_flow_rate) / d(total_mass_flow_rate) = n * average_fuel_mass_flow_rate / total_mass_flow_rate
+
+        The residual is convex with a single root above oxi_mass_flow_rate, so starting from the previous
+        step's total every Newton step lands at or above the root and then descends onto it. Where the
+        slope is not positive a substitution step is taken instead.
+        """
+
+        if oxi_mass_flow_rate <= 0:
+            # No oxidiser, the only physical root is no flow at all
+            self.average_total_mass_flow_rate = 0.0
+            self.average_fuel_mass_flow_rate_function()
+
+            self.iterations = 0
+            self.residual = 0.0
+
+            return self.average_total_mass_flow_rate
+
+        total_mass_flow_rate = max(self.average_total_mass_flow_rate, oxi_mass_flow_rate)
+
+        for iterations in range(1, self.max_iterations + 1):
+            self.average_total_mass_flow_rate = total_mass_flow_rate
+
+            fuel_mass_flow_rate = self.average_fuel_mass_flow_rate_function()
+
+            residual = total_mass_flow_rate - oxi_mass_flow_rate - fuel_mass_flow_rate
+
+            if abs(residual) <= self.absolute_precision + self.relative_precision * total_mass_flow_rate:
+                break
+
+            slope = 1 - self.n * fuel_mass_flow_rate / total_mass_flow_rate
+
+            if slope > 0:
+                total_mass_flow_rate = max(total_mass_flow_rate - residual / slope, oxi_mass_flow_rate)
+            else:
+                total_mass_flow_rate = oxi_mass_flow_rate + fuel_mass_flow_rate
+        else:
+            raise ValueError('Mass flow solver did not converge in {} iterations'.format(self.max_iterations))
+
+        self.iterations = iterations
+        self.residual = residual
+
+        return self.average_total_mass_flow_rate
+
+    def mass_flow_residual(self, total_mass_flow_rate, oxi_mass_flow_rate):
+        """residual = total_mass_flow_rate - oxi_mass_flow_rate - fuel_density * a * (total_mass_flow_rate / port_surface_area) ** n * port_length ** m * port_surface_area
+        """
+
+        port_surface_area = self.average_port_surface_area()
+
+        fuel_mass_flow_rate = self.fuel_density * self.a * ((total_mass_flow_rate / port_surface_area) ** self.n) * (self.port_length ** self.m) * port_surface_area
+
+        return total_mass_flow_rate - oxi_mass_flow_rate - fuel_mass_flow_rate
+
+    def average_total_mass_flux_function(self):
+        """average_total_mass_flux = average_total_mass_flow_rate / average_port_surface_area
+        """
+
+        self.average_total_mass_flux = self.average_total_mass_flow_rate / self.average_port_surface_area()
+
+        return self.average_total_mass_flux
+
+    def average_regression_rate_function(self):
+        """average_regression_rate = a * (average_mass_flux ** n) * (port_length ** m)
+        """
+
+        self.average_regression_rate = self.a * (self.average_total_mass_flux_function() ** self.n) * (self.port_length ** self.m)
+
+        return self.average_regression_rate
+
+    def average_fuel_mass_flow_rate_function(self):
+        """average_fuel_mass_flow_rate = fuel_density * average_regression_rate * port_surface_area
+        """
+        self.average_fuel_mass_flow_rate = self.fuel_density * self.average_regression_rate_function() * self.average_port_surface_area()
+
+        return self.average_fuel_mass_flow_rate
+
+    def average_port_surface_area(self):
+        """average_port_surface_area = self.average_port_diameter * math.pi *self.port_length
+        """
+
+        average_port_surface_area = self.average_port_diameter * math.pi * self.port_length
+
+        return average_port_surface_area
+
+    def oxi_fuel_ratio_function(self):
+        """oxi_fuel_ratio = oxidiser.mass_flow_rate / average_fuel_mass_flow_rate
+        """
+
+        try:
+            self.oxi_fuel_ratio = self.oxidiser.mass_flow_rate / self.average_fuel_mass_flow_rate
+        except ZeroDivisionError:
+            pass
+
+        return self.oxi_fuel_ratio
+
+
+class AxialCombustion(NumericCombustion):
+    """NumericCombustion with the grain split into grain_cells cells down the port, each with its own port diameter
+
+    The mass flow picks up each cell's fuel on its way down the port, so the flux and the regression rate
+    grow towards the nozzle and the grain burns through cell by cell. A cell's flux is the flow leaving it
+    over its own port, flow / (pi * port_diameter * port_length), and the port_length ** m term stays the
+    whole port's, as in the lumped law, so a single cell is the lumped model. The average_ values are
+    means over the cells, average_fuel_mass_flow_rate is their total.
+    """
+
+    def __init__(self, oxidiser, config):
+        super().__init__(oxidiser, config)
+
+        self.cells = int(config.grain_cells)
+
+        if self.cells < 1:
+            raise ValueError('An axial grain needs at least one cell')
+
+        self.port_diameters = np.full(self.cells, self.average_port_diameter)
+
+        # Flow leaving each cell over the last two steps, extrapolated for the next step's first guess
+        self.flows = np.full(self.cells, self.average_total_mass_flow_rate)
+        self.previous_flows = self.flows
+
+        self.fuel_mass_flow_rates = np.zeros(self.cells)
+        self.regression_rates = np.zeros(self.cells)
+
+        # fuel_mass_flow_rate = fuel_density * a * (flow / (pi * port_diameter * port_length)) ** n * port_length ** m * pi * port_diameter * port_length / cells
+        #                     = fuel_factor * flow ** n * port_diameter ** (1 - n)
+        self.fuel_factor = self.fuel_density * self.a * (self.port_length ** self.m) * (math.pi * self.port_length) ** (1 - self.n) / self.cells
+
+        # regression_rate = fuel_mass_flow_rate * regression_factor / port_diameter
+        self.regression_factor = self.cells / (self.fuel_density * math.pi * self.port_length)
+
+        self.weights = np.full(self.cells, 1 / self.cells)
+
+    def solve_for_average_total_mass_flow_rate(self):
+        oxi_mass_flow_rate = self.oxidiser.mass_flow_rate_function()
+
+        self.solve_total_mass_flow_rate(oxi_mass_flow_rate)
+
+        self.port_diameters += self.regression_rates * (2 * self.time_step / 100)
+        self.average_port_diameter = float(self.port_diameters.dot(self.weights))
+
+        if self.port_diameters.max() > self.grain_diameter:
+            print('Motor burn through! Fuel grain too thin!')
+            raise ValueError('Motor burn through! Fuel grain too thin!')
+
+        return self.average_total_mass_flow_rate
+
+    def solve_total_mass_flow_rate(self, oxi_mass_flow_rate):
+        """Successive substitution of every cell at once, flow = oxi_mass_flow_rate + cumulative sum of fuel_mass_flow_rate(flow)
+
+        Each pass contracts the error by about n * fuel / flow, starting from the flows extrapolated from
+        the last two steps one or two passes reach the solver precision on the total. Every pass is a few
+        whole array operations, so the cost per step hardly grows with the number of cells.
+        """
+
+        if oxi_mass_flow_rate <= 0:
+            self.flows = np.zeros(self.cells)
+            self.previous_flows = self.flows
+            self.fuel_mass_flow_rates = np.zeros(self.cells)
+
+            self.iterations = 0
+            self.residual = 0.0
+        else:
+            shape = self.fuel_factor * self.port_diameters ** (1 - self.n)
+
+            flows = np.maximum(2 * self.flows - self.previous_flows, oxi_mass_flow_rate)
+
+            for iterations in range(1, self.max_iterations + 1):
+                fuel_mass_flow_rates = shape * flows ** self.n
+
+                new_flows = np.cumsum(fuel_mass_flow_rates)
+                new_flows += oxi_mass_flow_rate
+
+                residual = new_flows[-1] - flows[-1]
+
+                flows = new_flows
+
+                if abs(residual) <= self.absolute_precision + self.relative_precision * flows[-1]:
+                    break
+            else:
+                raise ValueError('Mass flow solver did not converge in {} iterations'.format(self.max_iterations))
+
+            self.previous_flows = self.flows
+            self.flows = flows
+            self.fuel_mass_flow_rates = fuel_mass_flow_rates
+
+            self.iterations = iterations
+            self.residual = residual
+
+        self.average_total_mass_flow_rate = float(self.flows[-1])
+        self.average_fuel_mass_flow_rate = self.average_total_mass_flow_rate - max(oxi_mass_flow_rate, 0.0) if self.average_total_mass_flow_rate > 0 else 0.0
+
+        inverse_port_diameters = 1 / self.port_diameters
+
+        self.regression_rates = self.fuel_mass_flow_rates * inverse_port_diameters
+        self.regression_rates *= self.regression_factor
+
+        # Means as dot products with 1 / cells, several times quicker than mean() on arrays this short
+        self.average_regression_rate = float(self.regression_rates.dot(self.weights))
+        self.average_total_mass_flux = float(self.flows.dot(inverse_port_diameters)) / (self.cells * math.pi * self.port_length)
+
+        return self.average_total_mass_flow_rate
+
+    def port_profile(self):
+        """Port diameter, regression rate and mass flow of each cell, by the distance of its middle from the injector end, in SI units
+        """
+
+        import pandas as pd
+
+        positions = (np.arange(self.cells) + 0.5) * self.port_length / self.cells
+
+        return pd.DataFrame(
+            {
+                'port diameter (meter)': self.port_diameters,
+                'regression rate (meter / second)': self.regression_rates / 100,
+                'mass flow rate (kilogram / second)': self.flows
+            },
+            index=pd.Index(positions, name='position (meter)')
+        )
@@ -1,10 +1,427 @@
+import os
 import math
+import functools
+
+from collections import namedtuple
+
+import numpy as np
 
 import libraries.constants as constants
+import libraries.n2o as n2o
+
+universal_gas_constant = 8.314462618
+
+reference_temperature = 298.15
+reference_pressure = 1e5
+
+# Hottest state composition() starts cold at without a guess
+start_temperature = 2000.0
+
+elements = ('C', 'H', 'O', 'N')
+
+# kg/mol
+atomic_masses = {'C': 12.011e-3, 'H': 1.008e-3, 'O': 15.999e-3, 'N': 14.007e-3}
+
+# Gas phase combustion products, (name, CAS, atoms), CH4 holds the carbon CO cannot on the fuel rich side
+product_species = (
+    ('N2', '7727-37-9', {'N': 2}),
+    ('O2', '7782-44-7', {'O': 2}),
+    ('H2O', '7732-18-5', {'H': 2, 'O': 1}),
+    ('CO2', '124-38-9', {'C': 1, 'O': 2}),
+    ('CO', '630-08-0', {'C': 1, 'O': 1}),
+    ('H2', '1333-74-0', {'H': 2}),
+    ('OH', '3352-57-6', {'O': 1, 'H': 1}),
+    ('H', '12385-13-6', {'H': 1}),
+    ('NO', '10102-43-9', {'N': 1, 'O': 1}),
+    ('CH4', '74-82-8', {'C': 1, 'H': 4})
+)
+
+n2o_cas = '10024-97-2'
+n2o_atoms = {'N': 2, 'O': 1}
+
+ChamberState = namedtuple('ChamberState', [
+    'flame_temperature',
+    'gamma',
+    'molecular_weight',
+    'c_star',
+    'Cp'
+])
+
+
+def molar_mass(atoms):
+    return sum(count * atomic_masses[element] for element, count in atoms.items())
+
+
+class CompoundThermoChemical:
+    """Adiabatic equilibrium combustion of liquid N2O with a CxHy fuel, SI units
+
+    The products minimise Gibbs energy over product_species for the propellant's elements, solved by Newton
+    iteration on the element potentials, and the flame temperature balances their enthalpy against the reactants'.
+    Heat capacities are the NIST WebBook Shomate fits, formation enthalpies and entropies come from chemicals.
+    Condensed carbon is not modelled, so below about O/F 1.5 the products have nowhere to put the carbon.
+
+    Far too slow for the time step loop, it builds a ChemistryTable instead.
+    """
+
+    def __init__(self, fuel_formula=None, fuel_enthalpy_of_formation=None):
+        # Only needed to build a table, chemicals loads its heat capacity databank on the first read of it
+        import chemicals.heat_capacity
+        import chemicals.reaction
+
+        self.fuel_formula = dict(constants.fuel_formula if fuel_formula is None else fuel_formula)
+
+        if fuel_enthalpy_of_formation is None:
+            fuel_enthalpy_of_formation = constants.fuel_enthalpy_of_formation
+
+        self.fuel_enthalpy_of_formation = constants.to_si(fuel_enthalpy_of_formation)
+
+        self.atoms = np.array([[atoms.get(element, 0) for element in elements] for _, _, atoms in product_species], dtype=float)
+
+        self.heat_capacities = [chemicals.heat_capacity.WebBook_Shomate_gases[cas] for _, cas, _ in product_species]
+        self.formation_enthalpies = np.array([chemicals.reaction.Hfg(cas) for _, cas, _ in product_species])
+        self.entropies = np.array([chemicals.reaction.S0g(cas) for _, cas, _ in product_species])
+
+        # Liquid N2O at the reference temperature
+        self.n2o_molar_mass = molar_mass(n2o_atoms)
+        self.n2o_enthalpy = (
+            chemicals.reaction.Hfg(n2o_cas) -
+            float(n2o.enthalpy_of_vaporisation(reference_temperature)) * self.n2o_molar_mass
+        )
+
+        self.fuel_molar_mass = molar_mass(self.fuel_formula)
+
+    def enthalpies(self, T):
+        """H = Hf + integral of Cp from reference_temperature to T, J/mol of each product species
+        """
+
+        return self.formation_enthalpies + np.array([
+            heat_capacity.force_calculate_integral(reference_temperature, T) for heat_capacity in self.heat_capacities
+        ])
+
+    def gibbs_energies(self, T):
+        """G / (R * T) = (H - T * S) / (R * T) of each product species at the reference pressure
+        """
+
+        entropies = self.entropies + np.array([
+            heat_capacity.force_calculate_integral_over_T(reference_temperature, T) for heat_capacity in self.heat_capacities
+        ])
+
+        return (self.enthalpies(T) - T * entropies) / (universal_gas_constant * T)
+
+    def molar_heat_capacities(self, T):
+        return np.array([heat_capacity.force_calculate(T) for heat_capacity in self.heat_capacities])
+
+    def reactants(self, oxi_fuel_ratio):
+        """(moles of each element, enthalpy) of 1 kg of propellant at oxi_fuel_ratio
+        """
+
+        oxidiser_moles = oxi_fuel_ratio / (1 + oxi_fuel_ratio) / self.n2o_molar_mass
+        fuel_moles = 1 / (1 + oxi_fuel_ratio) / self.fuel_molar_mass
+
+        element_moles = np.array([
+            oxidiser_moles * n2o_atoms.get(element, 0) + fuel_moles * self.fuel_formula.get(element, 0)
+            for element in elements
+        ])
+
+        enthalpy = oxidiser_moles * self.n2o_enthalpy + fuel_moles * self.fuel_enthalpy_of_formation
+
+        return element_moles, enthalpy
+
+    def initial_potentials(self, T, P, element_moles):
+        """Element potentials and log total moles of a start for composition(), all N2 with a trace of the rest
+        """
+
+        gibbs = self.gibbs_energies(T) + math.log(P / reference_pressure)
+
+        moles = np.full(len(product_species), 1e-3 * element_moles.sum())
+        moles[0] = element_moles[elements.index('N')] / 2
+
+        potentials = np.linalg.lstsq(self.atoms, gibbs + np.log(moles / moles.sum()), rcond=None)[0]
+
+        return np.append(potentials, math.log(moles.sum()))
+
+    def composition(self, T, P, element_moles, guess=None, max_iterations=200):
+        """(moles of each product species, solution) at equilibrium, solution is the element potentials and log total moles
+
+        guess is a solution at a nearby state, the start of the iteration when given.
+        """
+
+        if guess is not None:
+            # A guess from a far off temperature can run the moles to zero, then start again from scratch
+            try:
+                return self.newton_composition(T, P, element_moles, guess, max_iterations)
+            except (ValueError, np.linalg.LinAlgError):
+                pass
+
+        # Started cold, Newton only converges reliably up to moderate temperatures, so hotter states are walked up to
+        first_T = min(T, start_temperature)
+        steps = int((T - first_T) / 250) + 2
+
+        solution = self.initial_potentials(first_T, P, element_moles)
+
+        for step_T in np.linspace(first_T, T, steps):
+            moles, solution = self.newton_composition(step_T, P, element_moles, solution, max_iterations)
+
+        return moles, solution
+
+    def newton_composition(self, T, P, element_moles, start, max_iterations=200):
+        """ln(n_i) = ln(n) - G_i / (R * T) - ln(P / P0) + sum_j a_ij * potential_j
+
+        Newton iterated until every element balances and the moles add up to n, steps are limited to 2 in log
+        space as in NASA CEA.
+        """
+
+        gibbs = self.gibbs_energies(T) + math.log(P / reference_pressure)
+
+        solution = np.array(start, dtype=float)
+
+        for _ in range(max_iterations):
+            moles = np.exp(np.minimum(solution[-1] - gibbs + self.atoms @ solution[:-1], 700))
+            total = math.exp(solution[-1])
+
+            residual = np.append(self.atoms.T @ moles - element_moles, moles.sum() - total)
+
+            jacobian = np.empty((len(elements) + 1, len(elements) + 1))
+            jacobian[:-1, :-1] = (self.atoms.T * moles) @ self.atoms
+            jacobian[:-1, -1] = self.atoms.T @ moles
+            jacobian[-1, :-1] = self.atoms.T @ moles
+            jacobian[-1, -1] = moles.sum() - total
+
+            step = np.linalg.solve(jacobian, -residual)
+
+            largest = np.abs(step).max()
+
+            if largest > 2:
+                step *= 2 / largest
+
+            solution = solution + step
+
+            if largest < 1e-11:
+                return np.exp(solution[-1] - gibbs + self.atoms @ solution[:-1]), solution
+
+        raise ValueError('Equilibrium composition did not converge at {} K, {} Pa'.format(T, P))
+
+    def chamber_state(self, oxi_fuel_ratio, P, T_min=600.0, T_max=5500.0):
+        """ChamberState of the adiabatic equilibrium products at oxi_fuel_ratio and chamber pressure P
+
+        Cp, gamma and c_star are frozen at the chamber composition, c_star = sqrt(R * T / gamma) * ((gamma + 1) / 2) ** ((gamma + 1) / (2 * (gamma - 1)))
+        """
+
+        from scipy.optimize import brentq
+
+        element_moles, enthalpy = self.reactants(oxi_fuel_ratio)
+
+        solution = [None]
+
+        def enthalpy_balance(T):
+            moles, solution[0] = self.composition(T, P, element_moles, solution[0])
+
+            return moles @ self.enthalpies(T) - enthalpy
+
+        T = brentq(enthalpy_balance, T_min, T_max, xtol=1e-6)
+
+        moles, _ = self.composition(T, P, element_moles, solution[0])
+
+        Cp = moles @ self.molar_heat_capacities(T)
+        R = universal_gas_constant * moles.sum()
+        gamma = Cp / (Cp - R)
+
+        c_star = math.sqrt(R * T / gamma) * ((gamma + 1) / 2) ** ((gamma + 1) / (2 * (gamma - 1)))
+
+        return ChamberState(T, gamma, 1 / moles.sum(), c_star, Cp)
+
+
+class ChemistryTable:
+    """ChamberState tabulated on a uniform O/F x chamber pressure grid (SI units), bilinearly interpolated
+
+    Built offline by CompoundThermoChemical, `python -m libraries.compound`, or on first use.
+    Ratios and pressures off the grid extrapolate from the end cells instead of raising.
+    """
+
+    def __init__(self, ratios, pressures, values, fuel, oxidiser):
+        self.ratios = ratios
+        self.pressures = pressures
+        self.values = values
+        self.fuel = fuel
+        self.oxidiser = oxidiser
+
+        self.ratio_min = ratios[0]
+        self.ratio_step = (ratios[-1] - ratios[0]) / (len(ratios) - 1)
+        self.P_min = pressures[0]
+        self.P_step = (pressures[-1] - pressures[0]) / (len(pressures) - 1)
+
+        # Plain lists are much faster than NumPy for the single-state lookups done every time step
+        self.rows = [values[k].tolist() for k in range(len(ChamberState._fields))]
+
+    @classmethod
+    def build(cls, chemistry, ratios, pressures):
+        values = np.empty((len(ChamberState._fields), len(ratios), len(pressures)))
+
+        for i, oxi_fuel_ratio in enumerate(ratios):
+            for j, P in enumerate(pressures):
+                values[:, i, j] = chemistry.chamber_state(float(oxi_fuel_ratio), float(P))
+
+        fuel = fuel_inputs(chemistry.fuel_formula, chemistry.fuel_enthalpy_of_formation)
+
+        return cls(np.asarray(ratios, dtype=float), np.asarray(pressures, dtype=float), values, fuel, oxidiser_inputs())
+
+    @classmethod
+    def default_grid(cls):
+        return cls.build(CompoundThermoChemical(), *default_axes())
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        np.savez_compressed(
+            path,
+            ratios=self.ratios,
+            pressures=self.pressures,
+            values=self.values,
+            fuel=np.array(self.fuel),
+            oxidiser=np.array(self.oxidiser)
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            # Tables saved before the oxidiser was recorded load without one, and so are rebuilt by load_or_build()
+            oxidiser = data['oxidiser'].item() if 'oxidiser' in data.files else None
+
+            return cls(data['ratios'], data['pressures'], data['values'], data['fuel'].item(), oxidiser)
+
+    @classmethod
+    def load_or_build(cls, path=constants.chemistry_table_path):
+        """Loads the table at path, tabulating and saving it first if it is missing, for another propellant or on another grid
+        """
+
+        ratios, pressures = default_axes()
+
+        if os.path.exists(path):
+            table = cls.load(path)
+
+            same_grid = np.array_equal(table.ratios, ratios) and np.array_equal(table.pressures, pressures)
+            same_propellant = (
+                table.fuel == fuel_inputs(constants.fuel_formula, constants.to_si(constants.fuel_enthalpy_of_formation)) and
+                table.oxidiser == oxidiser_inputs()
+            )
+
+            if same_propellant and same_grid:
+                return table
+
+        table = cls.build(CompoundThermoChemical(), ratios, pressures)
+        table.save(path)
+
+        return table
+
+    def properties(self, oxi_fuel_ratio, P):
+        """ChamberState at a single O/F and chamber pressure
+        """
+
+        x = (oxi_fuel_ratio - self.ratio_min) / self.ratio_step
+        y = (P - self.P_min) / self.P_step
+
+        i = min(max(int(math.floor(x)), 0), len(self.ratios) - 2)
+        j = min(max(int(math.floor(y)), 0), len(self.pressures) - 2)
+
+        u = x - i
+        v = y - j
+
+        w00 = (1 - u) * (1 - v)
+        w01 = (1 - u) * v
+        w10 = u * (1 - v)
+        w11 = u * v
+
+        return ChamberState(*[
+            w00 * rows[i][j] + w01 * rows[i][j + 1] + w10 * rows[i + 1][j] + w11 * rows[i + 1][j + 1]
+            for rows in self.rows
+        ])
+
+    def interpolate(self, oxi_fuel_ratio, P):
+        """ChamberState of arrays shaped like oxi_fuel_ratio and P
+        """
+
+        ratios, P = np.broadcast_arrays(np.asarray(oxi_fuel_ratio, dtype=float), np.asarray(P, dtype=float))
+
+        x = (ratios - self.ratio_min) / self.ratio_step
+        y = (P - self.P_min) / self.P_step
+
+        i = np.clip(np.floor(x).astype(int), 0, len(self.ratios) - 2)
+        j = np.clip(np.floor(y).astype(int), 0, len(self.pressures) - 2)
+
+        u = x - i
+        v = y - j
+
+        return ChamberState(*(
+            (1 - u) * (1 - v) * self.values[:, i, j] +
+            (1 - u) * v * self.values[:, i, j + 1] +
+            u * (1 - v) * self.values[:, i + 1, j] +
+            u * v * self.values[:, i + 1, j + 1]
+        ))
+
+
+def fuel_inputs(fuel_formula, fuel_enthalpy_of_formation):
+    """Stable description of the fuel a table was built for, checked when it is loaded
+    """
+
+    return '{} {!r}'.format(sorted(fuel_formula.items()), float(fuel_enthalpy_of_formation))
+
+
+def oxidiser_inputs():
+    """Stable description of the liquid N2O a table was built for, its enthalpy of vaporisation sets the reactants' enthalpy
+    """
+
+    return '{} {!r}'.format(n2o_cas, float(n2o.enthalpy_of_vaporisation(reference_temperature)))
+
+
+def default_axes():
+    """(ratios, pressures) of the grid set by constants.chemistry_table_ratios and chemistry_table_pressures
+    """
+
+    ratios = np.linspace(*constants.chemistry_table_ratios)
+    pressures = np.linspace(
+        constants.to_si(constants.chemistry_table_pressures[0]),
+        constants.to_si(constants.chemistry_table_pressures[1]),
+        constants.chemistry_table_pressures[2]
+    )
+
+    return ratios, pressures
+
+
+@functools.lru_cache(maxsize=None)
+def default_chemistry_table():
+    """The ChemistryTable at constants.chemistry_table_path, loaded once per process on first use
+    """
+
+    return ChemistryTable.load_or_build()
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    table = ChemistryTable.default_grid()
+    table.save(constants.chemistry_table_path)
+    print('Tabulated {} x {} chamber states in {:.2f} s -> {}'.format(
+        len(table.ratios), len(table.pressures), time.perf_counter() - start, constants.chemistry_table_path
+    ))
+
+    chemistry = CompoundThermoChemical()
+
+    # Cell centres, where bilinear error peaks
+    ratio_centres = (table.ratios[:-1] + table.ratios[1:]) / 2
+    pressure_centres = (table.pressures[:-1] + table.pressures[1:]) / 2
+
+    errors = []
 
-from libraries.thermochemical import BaseThermoChemical
+    for oxi_fuel_ratio in ratio_centres[::10]:
+        for P in pressure_centres[::10]:
+            exact = chemistry.chamber_state(oxi_fuel_ratio, P)
+            errors.append(np.abs(np.array(table.properties(oxi_fuel_ratio, P)) - exact) / np.abs(exact))
 
+    for name, error in zip(ChamberState._fields, np.max(errors, axis=0)):
+        print('{:>18}: max relative error {:.2e}'.format(name, error))
 
-class CompoundThermoChemical(BaseThermoChemical):
-    def __init__(compound_name, a_array,  ):
-        pass
+    start = time.perf_counter()
+    for _ in range(20000):
+        table.properties(4.83, 3447000.0)
+    print('Table {:.2f} us per state'.format((time.perf_counter() - start) / 20000 * 1e6))
@@ -0,0 +1,112 @@
+import libraries.constants as constants
+
+# Motor design inputs that vary per run, their defaults are the module globals of libraries/constants.py
+parameter_names = (
+    'iteration_precision',
+    'mass_flow_solver',
+    'iteration_relative_precision',
+    'iteration_absolute_precision',
+    'max_iterations',
+    'integrator',
+    'integrator_relative_tolerance',
+    'integrator_absolute_tolerance',
+    'recording',
+    'throat_mach',
+    'nozzle_angle',
+    'P_exit',
+    'chamber_pressure_model',
+    'nozzle_throat_diameter',
+    'combustion_model',
+    'initial_oxidiser_volume',
+    'initial_port_diameter',
+    'port_length',
+    'inlet_dia',
+    'time_step',
+    'injector_mass_flow_rate',
+    'num_of_injectors',
+    'oxidiser_model',
+    'tank_ullage',
+    'injector_diameter',
+    'injector_discharge_coefficient',
+    'grain_diameter',
+    'grain_model',
+    'grain_cells',
+    'a',
+    'n',
+    'm',
+    'fuel_density',
+    'ideal_OF_ratio'
+)
+
+
+class MotorConfig:
+    """Per-run motor design inputs, defaulting to the values in libraries/constants.py
+
+    Plain numbers given for a dimensioned parameter are taken in the units of its default, strings such as
+    '2 inch' are parsed with their own units.
+    """
+
+    def __init__(self, **parameters):
+        unknown = set(parameters) - set(parameter_names)
+
+        if unknown:
+            raise ValueError('Unknown motor parameters: {}'.format(', '.join(sorted(unknown))))
+
+        for name in parameter_names:
+            default = getattr(constants, name)
+            value = parameters.get(name, default)
+
+            if isinstance(default, constants.ureg.Quantity) and isinstance(value, str):
+                value = constants.parse_quantity(value)
+
+                if value.dimensionality != default.dimensionality:
+                    raise ValueError('{} needs units of {}, not {}'.format(name, default.units, value.units))
+
+            if isinstance(default, constants.ureg.Quantity) and not isinstance(value, constants.ureg.Quantity):
+                value = constants.ureg.Quantity(value, default.units)
+
+            setattr(self, name, value)
+
+    @property
+    def inlet_area(self):
+        return constants.diameter_to_area(self.inlet_dia)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in parameter_names}
+
+    def replace(self, **parameters):
+        return MotorConfig(**dict(self.as_dict(), **parameters))
+
+    def magnitudes(self, names=parameter_names):
+        """{'name (units)': magnitude} in the units of each default, for tables and reports
+        """
+
+        magnitudes = {}
+
+        for name in names:
+            default = getattr(constants, name)
+            value = getattr(self, name)
+
+            if isinstance(default, constants.ureg.Quantity):
+                magnitudes['{} ({})'.format(name, '{0.units}'.format(default))] = value.to(default.units).magnitude
+            else:
+                magnitudes[name] = value
+
+        return magnitudes
+
+    def plain_values(self):
+        """{name: value} with quantities as magnitudes in the units of each default, MotorConfig(**plain_values()) rebuilds it
+        """
+
+        values = {}
+
+        for name in parameter_names:
+            default = getattr(constants, name)
+            value = getattr(self, name)
+
+            if isinstance(default, constants.ureg.Quantity):
+                values[name] = value.to(default.units).magnitude
+            else:
+                values[name] = value
+
+        return values
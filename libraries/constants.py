@@ -1,16 +1,79 @@
+import os
 import math
 import pint
 
-ureg = pint.UnitRegistry()
+# The one registry of the process, its parsed definitions are cached on disk so building it is cheap
+try:
+    ureg = pint.UnitRegistry(cache_folder=':auto:')
+except OSError:
+    ureg = pint.UnitRegistry()
+
+# Quantities pickled to and from sweep worker processes unpickle into this same registry
+pint.set_application_registry(ureg)
 
 iteration_precision = 0.01
 
+# Total mass flow root solver of the numeric engine, 'newton' or the reference 'fixed_point' substitution
+mass_flow_solver = 'newton'
+iteration_relative_precision = 1e-10
+iteration_absolute_precision = 1e-12 * ureg.kg / ureg.sec
+max_iterations = 50
+
+# Burn integrator, 'euler' steps by time_step, 'rk45' is adaptive Dormand-Prince resampled onto time_step for output
+integrator = 'euler'
+integrator_relative_tolerance = 1e-8
+integrator_absolute_tolerance = 1e-10
+
+# Time series kept by the numeric engine, 'all' columns or only the 'summary' columns Simulation.summary() reads
+recording = 'all'
+
+# Rows the numeric engine holds in memory before writing them to a streaming output sink
+output_chunk_size = 4096
+
+# Steps between the checkpoints of a checkpointed run, see libraries/checkpoint.py
+checkpoint_interval = 1000
+
+# Number of (composition, T, P) gas property states kept by the thermodynamic property cache
+property_cache_size = 4096
+
+# Uniform T x P grid (min, max, points) tabulated for the combustion products by libraries/property_table.py
+property_table_temperatures = (500 * ureg.K, 3600 * ureg.K, 156)
+property_table_pressures = (0.1 * ureg.bar, 80 * ureg.bar, 161)
+property_table_path = os.path.join(os.path.dirname(__file__), 'data', 'combustion_products.npz')
+
+# Combustion chemistry of the numeric engine, the 'frozen' Thermochemical products or 'equilibrium' products
+# interpolated by O/F and chamber pressure from the table libraries/compound.py builds
+combustion_model = 'frozen'
+
+# Uniform O/F x P grid (min, max, points) of the equilibrium chemistry table
+chemistry_table_ratios = (2.0, 12.0, 101)
+chemistry_table_pressures = (1 * ureg.bar, 80 * ureg.bar, 80)
+chemistry_table_path = os.path.join(os.path.dirname(__file__), 'data', 'combustion_chemistry.npz')
+
+# Fuel of the equilibrium chemistry, paraffin wax, atoms per molecule and standard enthalpy of formation
+fuel_formula = {'C': 32, 'H': 66}
+fuel_enthalpy_of_formation = -938.1 * ureg.kJ / ureg.mol
+
+# Finished runs cached by libraries/result_cache.py, least recently used runs go past this many bytes
+result_cache_path = os.path.join(os.path.dirname(__file__), 'data', 'result_cache')
+result_cache_size = 512 * 1024 ** 2
+
+# Timings appended by python -m libraries.benchmark run, kept out of git as they only hold for the machine that ran them,
+# and the slowdown compare flags as a regression
+benchmark_history_path = os.path.join(os.path.dirname(__file__), 'data', 'benchmark_history.json')
+benchmark_regression_threshold = 0.1
+
 throat_mach = 1
 
 nozzle_angle = 15 * ureg.degree
 
 P_exit = (1 * ureg.atmosphere).to_base_units()
 
+# Chamber pressure of the numeric engine, 'fixed' at the Thermochemical pressure or solved each step by a 'throat'
+# mass balance, total mass flow * c* / throat area, through an as built nozzle_throat_diameter
+chamber_pressure_model = 'fixed'
+nozzle_throat_diameter = 0.1725 * ureg.inches
+
 initial_oxidiser_volume = 0.4139 * ureg.L
 
 initial_port_diameter = 1.0 * ureg.inches
@@ -31,8 +94,24 @@ time_step = .001 * ureg.sec
 injector_mass_flow_rate = 0.0274 * ureg.kg / ureg.sec
 
 num_of_injectors = 1
+
+# Oxidiser model of the numeric engine, 'constant' injector_mass_flow_rate or a self-pressurising 'blowdown' tank
+oxidiser_model = 'constant'
+
+# Blowdown tank, initial_oxidiser_volume is the liquid filled at external_temp and the ullage is vapour
+tank_ullage = 0.1
+
+# Blowdown injector orifices, sized for about injector_mass_flow_rate from a 70 F tank into the chamber
+injector_diameter = 0.036 * ureg.inches
+injector_discharge_coefficient = 0.8
+
 grain_diameter = 1.75 * ureg.inches
 
+# Fuel grain regression of the numeric engine, one 'lumped' average port or an 'axial' port of grain_cells cells
+# down its length, each regressing at its own mass flux and burning through on its own
+grain_model = 'lumped'
+grain_cells = 100
+
 a = 0.05 * (ureg.m ** 2) / ureg.kg
 n = 0.65
 m = -0.2
@@ -89,4 +168,33 @@ def diameter_to_area(diameter):
     return area
 
 
+def to_si(quantity):
+    """Magnitude of quantity in SI base units, for the unit-free numeric engine
+    """
+
+    return quantity.to_base_units().magnitude
+
+
+def si_conversion(si_units, units):
+    """value = si_value * scale + offset
+    """
+
+    offset = ureg.Quantity(0, si_units).to(units).magnitude
+    scale = ureg.Quantity(1, si_units).to(units).magnitude - offset
+
+    return scale, offset
+
+
+def parse_quantity(text):
+    """Quantity of text like '2 inch' or '21 degC', the magnitude is split off first so offset units parse too
+    """
+
+    magnitude, _, units = text.strip().partition(' ')
+
+    try:
+        return ureg.Quantity(float(magnitude), units.strip() or 'dimensionless')
+    except ValueError:
+        return ureg.Quantity(text)
+
+
 inlet_area = diameter_to_area(inlet_dia)
@@ -0,0 +1,148 @@
+import os
+import time
+import pstats
+import cProfile
+import functools
+import contextlib
+
+
+class Instrumentation:
+    """Opt-in wall time and counts of the phases of one run, see simulate() in libraries/run.py
+
+    phase() times a block of the run and count() adds to a named count. Phases named 'outer / inner' are
+    parts of the outer phase. wrap() times a method of one object as a phase, so the step loop is only
+    timed when a run is instrumented and costs nothing otherwise. profile also runs cProfile over every
+    phase, its slowest functions are kept in the summary.
+    """
+
+    def __init__(self, profile=False, profile_limit=20):
+        # name: [seconds, calls], in the order the phases started
+        self.phases = {}
+        self.counts = {}
+
+        self.profiler = cProfile.Profile() if profile else None
+        self.profile_limit = profile_limit
+
+        # Phases running inside each other
+        self.depth = 0
+
+    def entry(self, name):
+        return self.phases.setdefault(name, [0.0, 0])
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        entry = self.entry(name)
+
+        # The profiler runs while any phase does
+        if self.profiler is not None and self.depth == 0:
+            self.profiler.enable()
+
+        self.depth += 1
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            entry[0] += time.perf_counter() - start
+            entry[1] += 1
+
+            self.depth -= 1
+
+            if self.profiler is not None and self.depth == 0:
+                self.profiler.disable()
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def wrap(self, owner, method, name):
+        """Replaces owner.method, on that instance only, with one timed as the phase name
+        """
+
+        function = getattr(owner, method)
+        entry = self.entry(name)
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                entry[0] += perf_counter() - start
+                entry[1] += 1
+
+        setattr(owner, method, timed)
+
+    def save_profile(self, path):
+        """Writes the raw cProfile stats, for pstats, snakeviz and the like
+        """
+
+        self.profiler.dump_stats(path)
+
+    def slowest_functions(self):
+        """[(function, calls, own seconds, cumulative seconds)] of the profile_limit functions with the most cumulative time
+        """
+
+        stats = pstats.Stats(self.profiler).stats
+
+        rows = [
+            ('{}:{}({})'.format(file, line, function), calls, own, cumulative)
+            for (file, line, function), (_, calls, own, cumulative, _) in stats.items()
+        ]
+
+        return sorted(rows, key=lambda row: row[3], reverse=True)[:self.profile_limit]
+
+    def total(self):
+        return sum(seconds for name, (seconds, _) in self.phases.items() if ' / ' not in name)
+
+    def summary(self):
+        """The phases, counts and slowest profiled functions as JSON serialisable values
+        """
+
+        summary = {
+            'phases': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.phases.items()},
+            'counts': dict(self.counts)
+        }
+
+        if self.profiler is not None:
+            summary['slowest functions'] = [
+                {'function': function, 'calls': calls, 'own seconds': own, 'cumulative seconds': cumulative}
+                for function, calls, own, cumulative in self.slowest_functions()
+            ]
+
+        return summary
+
+    def lines(self):
+        """The summary as fixed width text lines, for the console and the report
+        """
+
+        total = self.total()
+
+        lines = ['{:<44}{:>10}{:>10}{:>8}'.format('phase', 'seconds', 'calls', 'share')]
+
+        for name, (seconds, calls) in self.phases.items():
+            # Phases still running, like the report a report page is written in
+            if calls == 0:
+                continue
+
+            share = '{:.1%}'.format(seconds / total) if total > 0 else ''
+
+            lines.append('{:<44}{:>10.4f}{:>10}{:>8}'.format(name, seconds, calls, share))
+
+        lines.append('{:<44}{:>10.4f}'.format('total', total))
+
+        if self.counts:
+            lines.append('')
+
+            for name, value in self.counts.items():
+                lines.append('{:<44}{:>10.6g}'.format(name, value))
+
+        if self.profiler is not None:
+            lines.extend(['', '{:<60}{:>10}{:>10}'.format('slowest functions', 'calls', 'seconds')])
+
+            for function, calls, _, cumulative in self.slowest_functions():
+                lines.append('{:<60}{:>10}{:>10.4f}'.format(os.path.basename(function)[:59], calls, cumulative))
+
+        return lines
@@ -0,0 +1,386 @@
+import os
+import math
+import itertools
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import libraries.constants as constants
+
+from libraries import sweep
+from libraries.config import MotorConfig, parameter_names
+from libraries.property_table import PropertyTable
+from libraries.thermochemical import Thermochemical
+
+# Sweep results columns summarised by a dispersion analysis
+outputs = (
+    'impulse (newton * second)',
+    'burn time (second)',
+    'peak thrust (newton)',
+    'average thrust (newton)'
+)
+
+percentiles = (1, 5, 25, 50, 75, 95, 99)
+
+
+class Distribution:
+    """One uncertain motor parameter, sampled in the units of its default in libraries/constants.py
+
+    kind is 'normal' (mean, std), 'lognormal' (mean, sigma, of the log of the value), 'uniform' (low,
+    high), 'triangular' (low, mode, high) or 'choice' (values, optional probabilities). A normal with low
+    or high set draws again until the value is inside them.
+    """
+
+    def __init__(self, kind, **parameters):
+        required = {
+            'normal': ('mean', 'std'),
+            'lognormal': ('mean', 'sigma'),
+            'uniform': ('low', 'high'),
+            'triangular': ('low', 'mode', 'high'),
+            'choice': ('values',)
+        }
+
+        if kind not in required:
+            raise ValueError('Unknown distribution: {}'.format(kind))
+
+        missing = set(required[kind]) - set(parameters)
+
+        if missing:
+            raise ValueError('A {} distribution needs {}'.format(kind, ', '.join(sorted(missing))))
+
+        self.kind = kind
+        self.parameters = parameters
+
+    @classmethod
+    def from_dict(cls, values):
+        """Distribution of {'distribution': kind, parameter: value}, the form of motor definition files
+        """
+
+        values = dict(values)
+
+        return cls(values.pop('distribution'), **values)
+
+    def sample(self, rng):
+        p = self.parameters
+
+        if self.kind == 'normal':
+            low = p.get('low', -math.inf)
+            high = p.get('high', math.inf)
+
+            for _ in range(1000):
+                value = rng.normal(p['mean'], p['std'])
+
+                if low <= value <= high:
+                    return value
+
+            raise ValueError('A normal distribution almost never falls between {} and {}'.format(low, high))
+
+        if self.kind == 'lognormal':
+            return rng.lognormal(p['mean'], p['sigma'])
+
+        if self.kind == 'uniform':
+            return rng.uniform(p['low'], p['high'])
+
+        if self.kind == 'triangular':
+            return rng.triangular(p['low'], p['mode'], p['high'])
+
+        return p['values'][rng.choice(len(p['values']), p=p.get('probabilities'))]
+
+
+def sample_parameters(distributions, seed, index):
+    """{parameter: value} of one sample, drawn from its own stream so it never depends on which worker draws it
+    """
+
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+    return {name: distributions[name].sample(rng) for name in sorted(distributions)}
+
+
+class QuantileSketch:
+    """Quantiles of a stream of values to a relative accuracy, in memory that does not grow with the count
+
+    Values fall into logarithmic buckets, x in bucket ceil(log(x) / log(gamma)) with gamma = (1 + accuracy) /
+    (1 - accuracy), and a quantile is read back as the middle of its bucket (DDSketch). The buckets only
+    grow with the log of the range of the values, and sketches of different workers merge by adding counts.
+    Values at or below zero are counted together as zero.
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+
+        self.buckets = Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        if value > 0:
+            self.buckets[math.ceil(math.log(value) / self.log_gamma)] += 1
+        else:
+            self.zeros += 1
+
+        self.count += 1
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only sketches of the same accuracy merge')
+
+        self.buckets.update(other.buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+
+        rank = q * (self.count - 1)
+
+        seen = self.zeros
+
+        if seen > rank:
+            return 0.0
+
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class RunningStatistics:
+    """Count, mean, variance, extremes and quantiles of a stream of values, mergeable across workers
+
+    Mean and variance are updated one value at a time (Welford) and combined pairwise (Chan et al.).
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value):
+        self.count += 1
+
+        delta = value - self.mean
+
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        self.sketch.add(value)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        self.sketch.merge(other.sketch)
+
+    def std(self):
+        """Sample standard deviation
+        """
+
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+    def summary(self):
+        summary = {'count': self.count, 'mean': self.mean, 'std': self.std(), 'min': self.min}
+
+        for percentile in percentiles:
+            # A bucket's middle can be just past the values in it
+            summary['p{}'.format(percentile)] = min(max(self.sketch.quantile(percentile / 100), self.min), self.max)
+
+        summary['max'] = self.max
+
+        return summary
+
+
+class Dispersion:
+    """Streaming statistics of the outputs of many runs, and how often each motor class and failure came up
+
+    Only these fixed size statistics are kept, never the runs themselves, so memory does not grow with the
+    number of samples. Failed runs, e.g. burn through, are counted apart and left out of the statistics.
+    """
+
+    def __init__(self, relative_accuracy=0.005):
+        self.statistics = {name: RunningStatistics(relative_accuracy) for name in outputs}
+
+        self.motor_classes = Counter()
+        self.errors = Counter()
+
+        self.samples = 0
+
+    def add(self, row):
+        self.samples += 1
+
+        if row['error'] is not None:
+            self.errors[row['error']] += 1
+
+            return
+
+        for name in outputs:
+            value = row[name]
+
+            if value is not None and not math.isnan(value):
+                self.statistics[name].add(value)
+
+        impulse = row['impulse (newton * second)'] * constants.ureg.newton * constants.ureg.second
+
+        self.motor_classes[constants.get_motor_code(impulse)] += 1
+
+    def merge(self, other):
+        for name in outputs:
+            self.statistics[name].merge(other.statistics[name])
+
+        self.motor_classes.update(other.motor_classes)
+        self.errors.update(other.errors)
+
+        self.samples += other.samples
+
+    def failures(self):
+        return sum(self.errors.values())
+
+    def summary(self):
+        """One row of statistics per output
+        """
+
+        return pd.DataFrame({name: self.statistics[name].summary() for name in outputs}).T
+
+    def motor_class_probabilities(self):
+        """Probability of each motor class over the runs that finished, in class order
+        """
+
+        finished = self.samples - self.failures()
+
+        order = list(constants.motor_codes)
+
+        return pd.Series(
+            {code: count / finished for code, count in sorted(self.motor_classes.items(), key=lambda item: order.index(item[0]))},
+            name='probability',
+            dtype=float
+        )
+
+
+def run_chunk(distributions, parameters, seed, indices, external_temp, vectorized, relative_accuracy):
+    """Runs the samples of indices in a worker, returns their Dispersion
+    """
+
+    parameter_sets = [dict(parameters, **sample_parameters(distributions, seed, index)) for index in indices]
+
+    if vectorized:
+        rows = sweep.run_batch(parameter_sets, external_temp)
+    else:
+        rows = [sweep.run_case(parameter_set, external_temp) for parameter_set in parameter_sets]
+
+    dispersion = Dispersion(relative_accuracy)
+
+    for row in rows:
+        dispersion.add(row)
+
+    return dispersion
+
+
+def monte_carlo(distributions, samples, external_temp, seed=0, parameters=None, workers=None, tabulated=False, vectorized=False, chunk_size=32, relative_accuracy=0.005):
+    """Dispersion of samples runs with the distributions, {parameter: Distribution}, sampled across a process pool
+
+    parameters fixes the other MotorConfig parameters of every run. Sample i is drawn from its own random
+    stream of seed and i, so a given seed gives the same samples on any number of workers. Workers run
+    chunk_size samples at a time, the sweep runner does the runs, see libraries/sweep.py. vectorized runs
+    each chunk in lockstep with VectorizedSimulation. Percentiles are within relative_accuracy.
+    """
+
+    parameters = {} if parameters is None else dict(parameters)
+    distributions = {
+        name: distribution if isinstance(distribution, Distribution) else Distribution.from_dict(distribution)
+        for name, distribution in distributions.items()
+    }
+
+    # Fail on a misspelt or fixed-and-sampled parameter before starting any workers
+    MotorConfig(**parameters)
+
+    unknown = set(distributions) - set(parameter_names)
+
+    if unknown:
+        raise ValueError('Unknown motor parameters: {}'.format(', '.join(sorted(unknown))))
+
+    both = set(parameters) & set(distributions)
+
+    if both:
+        raise ValueError('Parameters both fixed and sampled: {}'.format(', '.join(sorted(both))))
+
+    tabulated = tabulated or vectorized
+
+    if tabulated:
+        # Built once here so the workers never race to write the table file
+        PropertyTable.load_or_build(Thermochemical(live=False).get_mixture())
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    chunks = [range(start, min(start + chunk_size, samples)) for start in range(0, samples, chunk_size)]
+
+    arguments = (
+        itertools.repeat(distributions),
+        itertools.repeat(parameters),
+        itertools.repeat(seed),
+        chunks,
+        itertools.repeat(external_temp),
+        itertools.repeat(vectorized),
+        itertools.repeat(relative_accuracy)
+    )
+
+    dispersion = Dispersion(relative_accuracy)
+
+    if workers == 1:
+        sweep.warm_up(tabulated, external_temp)
+
+        for chunk in map(run_chunk, *arguments):
+            dispersion.merge(chunk)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=sweep.warm_up, initargs=(tabulated, external_temp)) as executor:
+            # Merged in chunk order as they come back, only one chunk's runs are ever held at a time
+            for chunk in executor.map(run_chunk, *arguments):
+                dispersion.merge(chunk)
+
+    return dispersion
+
+
+if __name__ == '__main__':
+    # The regression coefficients and injector flow of libraries/constants.py, with the injector flow of
+    # hybrid motor test #1 or test #2
+    result = monte_carlo(
+        {
+            'a': Distribution('normal', mean=0.05, std=0.005, low=0),
+            'n': Distribution('normal', mean=0.65, std=0.03),
+            'm': Distribution('normal', mean=-0.2, std=0.02),
+            'fuel_density': Distribution('normal', mean=3.957, std=0.2, low=0),
+            'injector_mass_flow_rate': Distribution('choice', values=[0.068, 0.0274])
+        },
+        samples=64,
+        external_temp=constants.ureg.Quantity(70, constants.ureg.degF),
+        tabulated=True
+    )
+
+    print(result.summary().to_string())
+    print(result.motor_class_probabilities().to_string())
+    print('Failed runs: {} of {}'.format(result.failures(), result.samples))
@@ -0,0 +1,184 @@
+import math
+import functools
+
+from collections import namedtuple
+
+import numpy as np
+
+# Saturated nitrous oxide from the ESDU 91022 curve fits, SI units, valid from -90 C up to the critical point
+critical_temperature = 309.57
+critical_pressure = 7251e3
+critical_density = 452.0
+
+minimum_temperature = 183.15
+
+# Cp / Cv of the vapour, for the isentropic blowdown of the tank once its liquid is gone
+vapour_heat_capacity_ratio = 1.3
+
+SaturatedN2O = namedtuple('SaturatedN2O', [
+    'vapour_pressure',
+    'liquid_density',
+    'vapour_density',
+    'liquid_enthalpy',
+    'vapour_enthalpy',
+    'enthalpy_of_vaporisation',
+    'liquid_heat_capacity'
+])
+
+
+def reduced_temperature(T):
+    """Tr = T / critical_temperature, for a float or an array of temperatures in K
+    """
+
+    T = np.asarray(T, dtype=float)
+
+    if np.any(T < minimum_temperature) or np.any(T > critical_temperature):
+        raise ValueError('Saturated N2O properties are only fitted from {} K to {} K'.format(minimum_temperature, critical_temperature))
+
+    return T / critical_temperature
+
+
+def vapour_pressure(T):
+    """ln(P / Pc) = (b1 * (1 - Tr) + b2 * (1 - Tr) ** 1.5 + b3 * (1 - Tr) ** 2.5 + b4 * (1 - Tr) ** 5) / Tr
+    """
+
+    Tr = reduced_temperature(T)
+    x = 1 - Tr
+
+    return critical_pressure * np.exp((-6.71893 * x + 1.35966 * x ** 1.5 - 1.3779 * x ** 2.5 - 4.051 * x ** 5) / Tr)
+
+
+def liquid_density(T):
+    """ln(rho_l / rho_c) = b1 * (1 - Tr) ** (1 / 3) + b2 * (1 - Tr) ** (2 / 3) + b3 * (1 - Tr) + b4 * (1 - Tr) ** (4 / 3)
+    """
+
+    x = 1 - reduced_temperature(T)
+
+    return critical_density * np.exp(1.72328 * x ** (1 / 3) - 0.8395 * x ** (2 / 3) + 0.5106 * x - 0.10412 * x ** (4 / 3))
+
+
+def vapour_density(T):
+    """ln(rho_g / rho_c) = b1 * (1 / Tr - 1) ** (1 / 3) + b2 * (1 / Tr - 1) ** (2 / 3) + b3 * (1 / Tr - 1) + b4 * (1 / Tr - 1) ** (4 / 3) + b5 * (1 / Tr - 1) ** (5 / 3)
+    """
+
+    x = 1 / reduced_temperature(T) - 1
+
+    return critical_density * np.exp(
+        -1.009 * x ** (1 / 3) - 6.28792 * x ** (2 / 3) + 7.50332 * x - 7.90463 * x ** (4 / 3) + 0.629427 * x ** (5 / 3)
+    )
+
+
+def liquid_enthalpy(T):
+    """h_l = b1 + b2 * (1 - Tr) ** (1 / 3) + b3 * (1 - Tr) ** (2 / 3) + b4 * (1 - Tr) + b5 * (1 - Tr) ** (4 / 3), in J/kg
+    """
+
+    x = 1 - reduced_temperature(T)
+
+    return 1e3 * (-200 + 116.043 * x ** (1 / 3) - 917.225 * x ** (2 / 3) + 794.779 * x - 589.587 * x ** (4 / 3))
+
+
+def vapour_enthalpy(T):
+    """h_g = b1 + b2 * (1 - Tr) ** (1 / 3) + b3 * (1 - Tr) ** (2 / 3) + b4 * (1 - Tr) + b5 * (1 - Tr) ** (4 / 3), in J/kg
+    """
+
+    x = 1 - reduced_temperature(T)
+
+    return 1e3 * (-200 + 440.055 * x ** (1 / 3) - 459.701 * x ** (2 / 3) + 434.081 * x - 485.338 * x ** (4 / 3))
+
+
+def enthalpy_of_vaporisation(T):
+    """h_vap = h_g - h_l
+    """
+
+    return vapour_enthalpy(T) - liquid_enthalpy(T)
+
+
+def liquid_heat_capacity(T):
+    """cp_l = b1 * (1 + b2 / (1 - Tr) + b3 * (1 - Tr) + b4 * (1 - Tr) ** 2 + b5 * (1 - Tr) ** 3), in J/(kg K)
+    """
+
+    x = 1 - reduced_temperature(T)
+
+    with np.errstate(divide='ignore'):
+        return 1e3 * 2.49973 * (1 + 0.023454 / x - 3.80136 * x + 13.0945 * x ** 2 - 14.518 * x ** 3)
+
+
+@functools.lru_cache(maxsize=4096)
+def saturation(T):
+    """Every saturated property at a single temperature in K, memoized per temperature
+    """
+
+    T = float(T)
+
+    return SaturatedN2O(
+        float(vapour_pressure(T)),
+        float(liquid_density(T)),
+        float(vapour_density(T)),
+        float(liquid_enthalpy(T)),
+        float(vapour_enthalpy(T)),
+        float(enthalpy_of_vaporisation(T)),
+        float(liquid_heat_capacity(T))
+    )
+
+
+def saturation_table(T):
+    """Every saturated property over an array of temperatures in K, as a SaturatedN2O of arrays
+    """
+
+    return SaturatedN2O(
+        vapour_pressure(T),
+        liquid_density(T),
+        vapour_density(T),
+        liquid_enthalpy(T),
+        vapour_enthalpy(T),
+        enthalpy_of_vaporisation(T),
+        liquid_heat_capacity(T)
+    )
+
+
+class SaturationTable:
+    """Saturated properties tabulated on a uniform temperature grid, linearly interpolated
+
+    For the per step tank updates, where evaluating the fits directly would cost more than the step itself.
+    Temperatures off the grid extrapolate from the end cells instead of raising.
+    """
+
+    def __init__(self, temperatures):
+        self.temperatures = np.asarray(temperatures, dtype=float)
+        self.values = np.array(saturation_table(self.temperatures))
+
+        self.T_min = self.temperatures[0]
+        self.T_step = (self.temperatures[-1] - self.temperatures[0]) / (len(self.temperatures) - 1)
+
+        # Plain lists are much faster than NumPy for single temperature lookups
+        self.rows = self.values.tolist()
+
+    def properties(self, T):
+        """SaturatedN2O at a single temperature
+        """
+
+        x = (T - self.T_min) / self.T_step
+
+        i = min(max(int(math.floor(x)), 0), len(self.temperatures) - 2)
+        u = x - i
+
+        return SaturatedN2O(*[row[i] + u * (row[i + 1] - row[i]) for row in self.rows])
+
+    def interpolate(self, T):
+        """SaturatedN2O of arrays shaped like T
+        """
+
+        x = (np.asarray(T, dtype=float) - self.T_min) / self.T_step
+
+        i = np.clip(np.floor(x).astype(int), 0, len(self.temperatures) - 2)
+        u = x - i
+
+        return SaturatedN2O(*(self.values[:, i] + u * (self.values[:, i + 1] - self.values[:, i])))
+
+
+@functools.lru_cache(maxsize=None)
+def default_table(points=2501):
+    """SaturationTable over the whole fitted range, stopping just short of the critical point where cp_l diverges
+    """
+
+    return SaturationTable(np.linspace(minimum_temperature, critical_temperature - 0.05, points))
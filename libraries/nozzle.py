@@ -1,24 +1,59 @@
 import math
 import copy
 
+from collections import namedtuple
+
 import libraries.constants as constants
 
-from libraries.thermodynamic import Thermodynamic
+from libraries.compound import default_chemistry_table
+from libraries.thermodynamic import Thermodynamic, NumericThermodynamic, EquilibriumThermodynamic, property_cache
+
+# Every nozzle quantity of one time step, as returned by Nozzle.evaluate() and NumericNozzle.evaluate()
+NozzleState = namedtuple('NozzleState', [
+    'inlet_velocity',
+    'inlet_mach',
+    'throat_area',
+    'throat_diameter',
+    'naught_temp',
+    'star_temp',
+    'star_pressure',
+    'star_velocity',
+    'star_mach',
+    'exit_mach',
+    'exit_area',
+    'exit_diameter',
+    'nozzle_diffuser_length',
+    'exit_velocity',
+    'thrust'
+])
 
 
 class Nozzle:
-    def __init__(self, mixture):
+    def __init__(self, mixture, config):
         self.original_mixture = mixture
+        self.config = config
 
         self.combustion_thermo = Thermodynamic(copy.deepcopy(mixture))
-        self.star_thermo = Thermodynamic(copy.deepcopy(mixture))
+        self.star_thermo = Thermodynamic(copy.deepcopy(mixture), cache=None)
         self.exit_thermo = Thermodynamic(copy.deepcopy(mixture))
 
+        # The chamber pressure is fixed, so the combustion and exit states never change
+        self.combustion_state = (
+            self.combustion_thermo.K(),
+            self.combustion_thermo.T(),
+            self.combustion_thermo.P(),
+            self.combustion_thermo.Cp(),
+            self.combustion_thermo.density(),
+            self.combustion_thermo.speed_of_sound(),
+            self.star_pressure()
+        )
+        self.exit_speed_of_sound = self.exit_thermo.speed_of_sound()
+
     def inlet_velocity(self, total_mass_flow_rate):
         """inlet_velocity = total_mass_flow_rate / (total_inlet_density * inlet_area)
         """
     
-        inlet_velocity = total_mass_flow_rate / (self.combustion_thermo.density() * constants.inlet_area)
+        inlet_velocity = total_mass_flow_rate / (self.combustion_thermo.density() * self.config.inlet_area)
 
         return inlet_velocity
 
@@ -37,7 +72,7 @@ class Nozzle:
         throat_area = (
             (
                 (
-                    constants.inlet_area * self.inlet_mach(total_mass_flow_rate)
+                    self.config.inlet_area * self.inlet_mach(total_mass_flow_rate)
                 ) / 
                 self.star_mach(total_mass_flow_rate)
             ) *
@@ -111,8 +146,10 @@ class Nozzle:
         """star_velocity = math.sqrt(K() * R() * T())
         """
 
-        self.star_thermo.mixture.T = self.star_temp(total_mass_flow_rate).to(constants.ureg.K).magnitude
-        self.star_thermo.mixture.P = self.star_pressure().to(constants.ureg.Pa).magnitude
+        self.star_thermo.set_state(
+            self.star_temp(total_mass_flow_rate).to(constants.ureg.K).magnitude,
+            self.star_pressure().to(constants.ureg.Pa).magnitude
+        )
 
         star_velocity = math.sqrt(
             (
@@ -141,14 +178,14 @@ class Nozzle:
                     (
                         self.combustion_thermo.P() * 
                         (
-                            (self.combustion_thermo.P() / constants.P_exit) ** (-1 / self.star_thermo.K())
+                            (self.combustion_thermo.P() / self.config.P_exit) ** (-1 / self.star_thermo.K())
                         )
-                    ) - constants.P_exit
+                    ) - self.config.P_exit
                 ).to_base_units().magnitude
             ) / 
             math.sqrt(
                 (
-                    (self.star_thermo.K() * constants.P_exit) - constants.P_exit
+                    (self.star_thermo.K() * self.config.P_exit) - self.config.P_exit
                 ).to_base_units().magnitude
             )
         )
@@ -161,12 +198,12 @@ class Nozzle:
 
         exit_area = (
             (
-                (self.throat_area(total_mass_flow_rate) * constants.throat_mach) / self.exit_mach()
+                (self.throat_area(total_mass_flow_rate) * self.config.throat_mach) / self.exit_mach()
             ) *
             math.sqrt(
                 (
                     (1 + ((self.combustion_thermo.K() - 1) / 2) * self.exit_mach() ** 2) /
-                    (1 + ((self.combustion_thermo.K() - 1) / 2) * constants.throat_mach ** 2)
+                    (1 + ((self.combustion_thermo.K() - 1) / 2) * self.config.throat_mach ** 2)
                 ) ** (
                     (self.combustion_thermo.K() + 1) / (self.combustion_thermo.K() - 1)
                 )
@@ -188,7 +225,7 @@ class Nozzle:
                 self.exit_diameter(total_mass_flow_rate) - self.throat_diameter(total_mass_flow_rate)
             ) / 
             (
-                2 * math.tan(constants.nozzle_angle)
+                2 * math.tan(self.config.nozzle_angle)
             )
         )
 
@@ -198,7 +235,7 @@ class Nozzle:
         """exit_velocity = exit_mach * exit_thermo.speed_of_sound()
         """
 
-        self.exit_thermo.P = constants.P_exit
+        self.exit_thermo.P = self.config.P_exit
 
         exit_velocity = self.exit_mach() * self.exit_thermo.speed_of_sound()
 
@@ -211,3 +248,441 @@ class Nozzle:
         thrust = total_mass_flow_rate * (self.exit_velocity() - self.inlet_velocity(total_mass_flow_rate))
 
         return thrust
+
+    def evaluate(self, total_mass_flow_rate):
+        """Every nozzle quantity at total_mass_flow_rate in one pass, each intermediate computed once
+
+        Same formulas as the single quantity methods above, the star state is set before exit_mach reads star K.
+        """
+
+        K, T, P, Cp, density, speed_of_sound, star_pressure = self.combustion_state
+
+        inlet_velocity = total_mass_flow_rate / (density * self.config.inlet_area)
+        inlet_mach = inlet_velocity / speed_of_sound
+
+        naught_temp = T + ((inlet_velocity ** 2) / (2 * Cp))
+        star_temp = (2 * naught_temp) / (K + 1)
+
+        self.star_thermo.set_state(
+            star_temp.to(constants.ureg.K).magnitude,
+            star_pressure.to(constants.ureg.Pa).magnitude
+        )
+
+        star_velocity = math.sqrt(
+            (
+                self.star_thermo.K() * self.star_thermo.R() * self.star_thermo.T()
+            ).to_base_units().magnitude
+        ) * (constants.ureg.m / constants.ureg.sec)
+        star_mach = star_velocity / self.star_thermo.speed_of_sound()
+
+        throat_area = (
+            ((self.config.inlet_area * inlet_mach) / star_mach) *
+            math.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * star_mach ** 2) /
+                    (1 + ((K - 1) / 2) * inlet_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+        throat_diameter = constants.area_to_diameter(throat_area)
+
+        exit_mach = self.exit_mach()
+        exit_area = (
+            ((throat_area * self.config.throat_mach) / exit_mach) *
+            math.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * exit_mach ** 2) /
+                    (1 + ((K - 1) / 2) * self.config.throat_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+        exit_diameter = constants.area_to_diameter(exit_area)
+
+        nozzle_diffuser_length = (exit_diameter - throat_diameter) / (2 * math.tan(self.config.nozzle_angle))
+
+        exit_velocity = exit_mach * self.exit_speed_of_sound
+
+        thrust = total_mass_flow_rate * (exit_velocity - inlet_velocity)
+
+        return NozzleState(
+            inlet_velocity,
+            inlet_mach,
+            throat_area,
+            throat_diameter,
+            naught_temp,
+            star_temp,
+            star_pressure,
+            star_velocity,
+            star_mach,
+            exit_mach,
+            exit_area,
+            exit_diameter,
+            nozzle_diffuser_length,
+            exit_velocity,
+            thrust
+        )
+
+
+class NumericNozzle:
+    """Unit-free twin of Nozzle, every value is a plain float in SI base units
+    """
+
+    def __init__(self, mixture, config, table=None, chemistry=None):
+        self.original_mixture = mixture
+        self.config = config
+
+        if config.combustion_model == 'frozen':
+            self.chemistry = None
+
+            # Only states that repeat go through the property cache, the throat state is new every step and so is
+            # the combustion state when the chamber pressure follows the flow
+            combustion_cache = None if config.chamber_pressure_model == 'throat' else property_cache
+
+            self.combustion_thermo = NumericThermodynamic(copy.deepcopy(mixture), cache=combustion_cache, table=table)
+            self.star_thermo = NumericThermodynamic(copy.deepcopy(mixture), cache=None, table=table)
+            self.exit_thermo = NumericThermodynamic(copy.deepcopy(mixture), table=table)
+        elif config.combustion_model == 'equilibrium':
+            # The chemistry table is only loaded, or built, once a run asks for it
+            self.chemistry = default_chemistry_table() if chemistry is None else chemistry
+            self.oxi_fuel_ratio = config.ideal_OF_ratio
+
+            chamber_state = self.chemistry.properties(self.oxi_fuel_ratio, mixture.P)
+
+            self.combustion_thermo = EquilibriumThermodynamic(chamber_state, chamber_state.flame_temperature, mixture.P)
+            self.star_thermo = EquilibriumThermodynamic(chamber_state, chamber_state.flame_temperature, mixture.P)
+            self.exit_thermo = EquilibriumThermodynamic(chamber_state, chamber_state.flame_temperature, mixture.P)
+        else:
+            raise ValueError('Unknown combustion model: {}'.format(config.combustion_model))
+
+        self.inlet_area = constants.to_si(config.inlet_area)
+        self.P_exit = constants.to_si(config.P_exit)
+        self.nozzle_angle = constants.to_si(config.nozzle_angle)
+        self.throat_mach = config.throat_mach
+
+        if config.chamber_pressure_model not in ('fixed', 'throat'):
+            raise ValueError('Unknown chamber pressure model: {}'.format(config.chamber_pressure_model))
+
+        self.solve_chamber_pressure = config.chamber_pressure_model == 'throat'
+        self.nozzle_throat_area = math.pi * constants.to_si(config.nozzle_throat_diameter) ** 2 / 4
+        self.relative_precision = config.iteration_relative_precision
+        self.max_iterations = config.max_iterations
+
+        self.variable_chamber = self.solve_chamber_pressure or self.chemistry is not None
+
+        # The exit state never changes, and with a fixed chamber pressure and chemistry neither does the combustion state
+        self.exit_speed_of_sound = self.exit_thermo.speed_of_sound()
+        self.combustion_state = self.combustion_state_function()
+
+    def inlet_velocity(self, total_mass_flow_rate):
+        """inlet_velocity = total_mass_flow_rate / (total_inlet_density * inlet_area)
+        """
+
+        inlet_velocity = total_mass_flow_rate / (self.combustion_thermo.density() * self.inlet_area)
+
+        return inlet_velocity
+
+    def inlet_mach(self, total_mass_flow_rate):
+        """inlet_mach = inlet_velocity / speed_of_sound()
+        """
+
+        inlet_mach = self.inlet_velocity(total_mass_flow_rate) / self.combustion_thermo.speed_of_sound()
+
+        return inlet_mach
+
+    def throat_area(self, total_mass_flow_rate):
+        """throat_area = ((inlet_area * inlet_mach) / star_mach) * sqrt(((1 + ((K() - 1) / 2) * star_mach ** 2) / (1 + ((K() - 1) / 2) * inlet_mach ** 2)) ** ((K() + 1) / (K() - 1)))
+        """
+
+        K = self.combustion_thermo.K()
+        inlet_mach = self.inlet_mach(total_mass_flow_rate)
+        star_mach = self.star_mach(total_mass_flow_rate)
+
+        throat_area = (
+            ((self.inlet_area * inlet_mach) / star_mach) *
+            math.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * star_mach ** 2) /
+                    (1 + ((K - 1) / 2) * inlet_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+
+        return throat_area
+
+    def throat_diameter(self, total_mass_flow_rate):
+        throat_diameter = math.sqrt(4 * self.throat_area(total_mass_flow_rate) / math.pi)
+
+        return throat_diameter
+
+    def naught_temp(self, total_mass_flow_rate):
+        """naught_temp = T() + ((inlet_velocity ** 2) / (2 * Cp()))
+        """
+
+        naught_temp = self.combustion_thermo.T() + (self.inlet_velocity(total_mass_flow_rate) ** 2) / (2 * self.combustion_thermo.Cp())
+
+        return naught_temp
+
+    def star_temp(self, total_mass_flow_rate):
+        """star_temp = (2 * naught_temp) / (K() + 1)
+        """
+
+        star_temp = (2 * self.naught_temp(total_mass_flow_rate)) / (self.combustion_thermo.K() + 1)
+
+        return star_temp
+
+    def star_pressure(self):
+        """star_pressure = P() * ((2 / (K() + 1)) ** (K() / (K() - 1)))
+        """
+
+        K = self.combustion_thermo.K()
+
+        star_pressure = self.combustion_thermo.P() * ((2 / (K + 1)) ** (K / (K - 1)))
+
+        return star_pressure
+
+    def star_velocity(self, total_mass_flow_rate):
+        """star_velocity = math.sqrt(K() * R() * T())
+        """
+
+        self.star_thermo.set_state(self.star_temp(total_mass_flow_rate), self.star_pressure())
+
+        star_velocity = math.sqrt(self.star_thermo.K() * self.star_thermo.R() * self.star_thermo.T())
+
+        return star_velocity
+
+    def star_mach(self, total_mass_flow_rate):
+        """star_mach = star_velocity / speed_of_sound
+        """
+
+        star_mach = self.star_velocity(total_mass_flow_rate) / self.star_thermo.speed_of_sound()
+
+        return star_mach
+
+    def exit_mach(self):
+        """exit_mach = sqrt(2) * sqrt(P() * (P() / P_exit) ** (-1 / K()) - P_exit) / sqrt(K() * P_exit - P_exit)
+        """
+
+        P = self.combustion_thermo.P()
+        K = self.star_thermo.K()
+
+        exit_mach = (
+            math.sqrt(2) *
+            math.sqrt(P * ((P / self.P_exit) ** (-1 / K)) - self.P_exit) /
+            math.sqrt(K * self.P_exit - self.P_exit)
+        )
+
+        return exit_mach
+
+    def exit_area(self, total_mass_flow_rate):
+        """exit_area = ((throat_area * throat_mach) / exit_mach) * sqrt(((1 + ((K() - 1) / 2) * exit_mach ** 2) / (1 + ((K() - 1) / 2) * throat_mach ** 2)) ** ((K() + 1) / (K() - 1)))
+        """
+
+        K = self.combustion_thermo.K()
+        throat_area = self.throat_area(total_mass_flow_rate)
+        exit_mach = self.exit_mach()
+
+        exit_area = (
+            ((throat_area * self.throat_mach) / exit_mach) *
+            math.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * exit_mach ** 2) /
+                    (1 + ((K - 1) / 2) * self.throat_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+
+        return exit_area
+
+    def exit_diameter(self, total_mass_flow_rate):
+        exit_diameter = math.sqrt(4 * self.exit_area(total_mass_flow_rate) / math.pi)
+
+        return exit_diameter
+
+    def nozzle_diffuser_length(self, total_mass_flow_rate):
+        """nozzle_diffuser_length = (exit_diameter - throat_diameter) / (2 * tan(nozzle_angle))
+        """
+
+        nozzle_diffuser_length = (
+            (self.exit_diameter(total_mass_flow_rate) - self.throat_diameter(total_mass_flow_rate)) /
+            (2 * math.tan(self.nozzle_angle))
+        )
+
+        return nozzle_diffuser_length
+
+    def exit_velocity(self):
+        """exit_velocity = exit_mach * exit_thermo.speed_of_sound()
+        """
+
+        exit_velocity = self.exit_mach() * self.exit_thermo.speed_of_sound()
+
+        return exit_velocity
+
+    def thrust(self, total_mass_flow_rate):
+        """thrust = total_mass_flow_rate * (exit_velocity - inlet_velocity)
+        """
+
+        thrust = total_mass_flow_rate * (self.exit_velocity() - self.inlet_velocity(total_mass_flow_rate))
+
+        return thrust
+
+    def combustion_state_function(self):
+        """(K, T, P, Cp, density, speed_of_sound, star_pressure) of the combustion state
+        """
+
+        K = self.combustion_thermo.K()
+
+        return (
+            K,
+            self.combustion_thermo.T(),
+            self.combustion_thermo.P(),
+            self.combustion_thermo.Cp(),
+            self.combustion_thermo.density(),
+            self.combustion_thermo.speed_of_sound(),
+            self.star_pressure()
+        )
+
+    def characteristic_velocity(self):
+        """c_star = sqrt(R() * T() / K()) * ((K() + 1) / 2) ** ((K() + 1) / (2 * (K() - 1)))
+        """
+
+        K = self.combustion_thermo.K()
+
+        c_star = math.sqrt(self.combustion_thermo.R() * self.combustion_thermo.T() / K) * ((K + 1) / 2) ** ((K + 1) / (2 * (K - 1)))
+
+        return c_star
+
+    def chamber_pressure(self, total_mass_flow_rate):
+        """chamber_pressure = total_mass_flow_rate * c_star / nozzle_throat_area
+
+        c_star depends on the chamber pressure through K(), so the combustion state is iterated to a fixed point.
+        """
+
+        for _ in range(self.max_iterations):
+            P = self.combustion_thermo.P()
+            chamber_pressure = total_mass_flow_rate * self.characteristic_velocity() / self.nozzle_throat_area
+
+            self.set_chamber_pressure(chamber_pressure)
+
+            if abs(chamber_pressure - P) <= self.relative_precision * chamber_pressure:
+                return chamber_pressure
+
+        raise ValueError('Chamber pressure did not converge in {} iterations'.format(self.max_iterations))
+
+    def set_chamber_pressure(self, P):
+        """Moves the combustion state to chamber pressure P, with equilibrium chemistry at the current O/F
+        """
+
+        if self.chemistry is None:
+            self.combustion_thermo.set_state(self.combustion_thermo.T(), P)
+
+            return
+
+        chamber_state = self.chemistry.properties(self.oxi_fuel_ratio, P)
+
+        for thermo in (self.combustion_thermo, self.star_thermo, self.exit_thermo):
+            thermo.set_chemistry(chamber_state)
+
+        # As with frozen chemistry the exit state is the chamber's
+        self.combustion_thermo.set_state(chamber_state.flame_temperature, P)
+        self.exit_thermo.set_state(chamber_state.flame_temperature, P)
+
+        self.exit_speed_of_sound = self.exit_thermo.speed_of_sound()
+
+    def set_oxi_fuel_ratio(self, oxi_fuel_ratio):
+        if self.chemistry is not None and oxi_fuel_ratio is not None:
+            self.oxi_fuel_ratio = oxi_fuel_ratio
+
+    def expands(self, total_mass_flow_rate, oxi_fuel_ratio=None):
+        """Whether the chamber pressure at total_mass_flow_rate is above P_exit, below it the nozzle cannot expand the flow
+        """
+
+        if not self.solve_chamber_pressure:
+            return True
+
+        self.set_oxi_fuel_ratio(oxi_fuel_ratio)
+
+        return self.chamber_pressure(total_mass_flow_rate) > self.P_exit
+
+    def evaluate(self, total_mass_flow_rate, oxi_fuel_ratio=None):
+        """Every nozzle quantity at total_mass_flow_rate in one pass, each intermediate computed once
+
+        Same formulas as the single quantity methods above, the star state is set before exit_mach reads star K.
+        With the throat chamber pressure model the chamber pressure is solved first, and with equilibrium chemistry
+        the combustion state follows oxi_fuel_ratio. An unlit motor keeps the last chamber state.
+        """
+
+        if self.variable_chamber and total_mass_flow_rate > 0:
+            self.set_oxi_fuel_ratio(oxi_fuel_ratio)
+
+            if self.solve_chamber_pressure:
+                self.chamber_pressure(total_mass_flow_rate)
+            else:
+                self.set_chamber_pressure(self.combustion_thermo.P())
+
+            self.combustion_state = self.combustion_state_function()
+
+        K, T, P, Cp, density, speed_of_sound, star_pressure = self.combustion_state
+
+        inlet_velocity = total_mass_flow_rate / (density * self.inlet_area)
+        inlet_mach = inlet_velocity / speed_of_sound
+
+        naught_temp = T + (inlet_velocity ** 2) / (2 * Cp)
+        star_temp = (2 * naught_temp) / (K + 1)
+
+        self.star_thermo.set_state(star_temp, star_pressure)
+
+        star_velocity = math.sqrt(self.star_thermo.K() * self.star_thermo.R() * self.star_thermo.T())
+        star_mach = star_velocity / self.star_thermo.speed_of_sound()
+
+        throat_area = (
+            ((self.inlet_area * inlet_mach) / star_mach) *
+            math.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * star_mach ** 2) /
+                    (1 + ((K - 1) / 2) * inlet_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+        throat_diameter = math.sqrt(4 * throat_area / math.pi)
+
+        star_K = self.star_thermo.K()
+
+        exit_mach = (
+            math.sqrt(2) *
+            math.sqrt(P * ((P / self.P_exit) ** (-1 / star_K)) - self.P_exit) /
+            math.sqrt(star_K * self.P_exit - self.P_exit)
+        )
+        exit_area = (
+            ((throat_area * self.throat_mach) / exit_mach) *
+            math.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * exit_mach ** 2) /
+                    (1 + ((K - 1) / 2) * self.throat_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+        exit_diameter = math.sqrt(4 * exit_area / math.pi)
+
+        nozzle_diffuser_length = (exit_diameter - throat_diameter) / (2 * math.tan(self.nozzle_angle))
+
+        exit_velocity = exit_mach * self.exit_speed_of_sound
+
+        thrust = total_mass_flow_rate * (exit_velocity - inlet_velocity)
+
+        return NozzleState(
+            inlet_velocity,
+            inlet_mach,
+            throat_area,
+            throat_diameter,
+            naught_temp,
+            star_temp,
+            star_pressure,
+            star_velocity,
+            star_mach,
+            exit_mach,
+            exit_area,
+            exit_diameter,
+            nozzle_diffuser_length,
+            exit_velocity,
+            thrust
+        )
@@ -0,0 +1,349 @@
+import os
+import math
+import itertools
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import libraries.constants as constants
+
+from libraries import sweep
+from libraries.config import MotorConfig, parameter_names
+from libraries.property_table import PropertyTable
+from libraries.thermochemical import Thermochemical
+
+# Design outputs the surrogate model predicts, a failed run counts as 1 in 'failed'
+surrogate_outputs = ('impulse (newton * second)', 'burn time (second)', 'average oxi fuel ratio', 'failed')
+
+# Objective added per unit of target violation, so any design meeting the targets beats any that does not
+violation_weight = 1000.0
+
+
+def motor_class_impulses(code):
+    """(lowest, highest) total impulse of a motor class letter of constants.motor_codes, in N s
+    """
+
+    if code not in constants.motor_codes:
+        raise ValueError('Unknown motor class: {}'.format(code))
+
+    limits = [limit.to(constants.ureg.newton * constants.ureg.second).magnitude for limit in constants.motor_codes.values()]
+    index = list(constants.motor_codes).index(code)
+
+    return (limits[index - 1] if index > 0 else 0.0, limits[index])
+
+
+def violation(value, bounds, scale):
+    """How far value is outside (low, high), relative to scale, 0 inside
+    """
+
+    if bounds is None:
+        return 0.0
+
+    low, high = bounds
+
+    return max(low - value, 0.0, value - high) / scale
+
+
+class DesignResult:
+    """Best design found by an Optimiser and every design it simulated on the way
+    """
+
+    def __init__(self, parameters, row, grain_mass, feasible, history, simulations, cache_hits, predictions):
+        self.parameters = parameters
+        self.row = row
+        self.grain_mass = grain_mass
+        self.feasible = feasible
+        self.history = history
+
+        self.simulations = simulations
+        self.cache_hits = cache_hits
+        self.predictions = predictions
+
+
+class Optimiser:
+    """Searches motor parameters for the lightest grain that meets impulse, burn time and O/F targets
+
+    variables is {parameter: (low, high)} in the units of each default, e.g. grain_diameter, port_length,
+    initial_port_diameter and injector_mass_flow_rate. The targets are a motor_class letter or an impulse
+    range in N s, a burn_time range in s and an average O/F within oxi_fuel_ratio_tolerance, a fraction,
+    of ideal_OF_ratio. A burn through or a port wider than the grain is never acceptable.
+
+    Candidates are snapped to resolution, a fraction of each variable's range, and memoized, so a design
+    is only ever simulated once. Uncached candidates are simulated together across a process pool of
+    workers with the sweep runner, see libraries/sweep.py. With surrogate, once enough designs have been
+    simulated, a radial basis function model of them ranks each generation and only its most promising
+    surrogate_fraction is simulated, the rest keep their predicted objective.
+    """
+
+    def __init__(self, variables, external_temp, motor_class=None, impulse=None, burn_time=None, oxi_fuel_ratio_tolerance=0.1, parameters=None, workers=None, tabulated=False, surrogate=False, surrogate_fraction=0.25, resolution=1e-3):
+        unknown = set(variables) - set(parameter_names)
+
+        if unknown:
+            raise ValueError('Unknown motor parameters: {}'.format(', '.join(sorted(unknown))))
+
+        if motor_class is not None and impulse is not None:
+            raise ValueError('Target a motor class or an impulse range, not both')
+
+        self.names = list(variables)
+        self.lows = np.array([variables[name][0] for name in self.names], dtype=float)
+        self.highs = np.array([variables[name][1] for name in self.names], dtype=float)
+
+        self.external_temp = external_temp
+        self.parameters = {} if parameters is None else dict(parameters)
+
+        self.impulse = motor_class_impulses(motor_class) if motor_class is not None else impulse
+        self.burn_time = burn_time
+        self.oxi_fuel_ratio_tolerance = oxi_fuel_ratio_tolerance
+
+        self.base = MotorConfig(**self.parameters)
+
+        self.surrogate = surrogate
+        self.surrogate_fraction = surrogate_fraction
+        self.steps = np.maximum((self.highs - self.lows) * resolution, np.finfo(float).tiny)
+
+        self.tabulated = tabulated
+        self.workers = os.cpu_count() if workers is None else workers
+        self.executor = None
+
+        # design (tuple of snapped values): sweep results row, and the surrogate's predicted objectives
+        self.rows = {}
+        self.predicted = {}
+
+        self.cache_hits = 0
+        self.predictions = 0
+
+    def design(self, x):
+        """Snapped parameter values of a candidate, x in [0, 1] per variable
+        """
+
+        values = self.lows + np.clip(x, 0, 1) * (self.highs - self.lows)
+
+        # Rounded again so a design reads back as the value it was snapped to, 0.0399 not 0.039900000000000005
+        return tuple(round(float(value), 12) for value in np.round(values / self.steps) * self.steps)
+
+    def config(self, design):
+        return self.base.replace(**dict(zip(self.names, design)))
+
+    def grain_mass(self, design):
+        """grain_mass = fuel_density * pi / 4 * (grain_diameter ** 2 - initial_port_diameter ** 2) * port_length
+        """
+
+        config = self.config(design)
+
+        grain_diameter = constants.to_si(config.grain_diameter)
+        port_diameter = constants.to_si(config.initial_port_diameter)
+
+        return constants.to_si(config.fuel_density) * math.pi / 4 * (grain_diameter ** 2 - port_diameter ** 2) * constants.to_si(config.port_length)
+
+    def violations(self, design, row):
+        """Sum of how far the outputs are outside the targets, relative to each target, 0 when all are met
+
+        A burn through, or a port wider than the grain, counts as 10.
+        """
+
+        config = self.config(design)
+
+        if config.initial_port_diameter >= config.grain_diameter or row['failed'] > 0.5:
+            return 10.0
+
+        ideal = config.ideal_OF_ratio
+        tolerance = self.oxi_fuel_ratio_tolerance * ideal
+
+        return (
+            violation(row['impulse (newton * second)'], self.impulse, self.impulse[1] if self.impulse else 1.0) +
+            violation(row['burn time (second)'], self.burn_time, self.burn_time[1] if self.burn_time else 1.0) +
+            violation(row['average oxi fuel ratio'], (ideal - tolerance, ideal + tolerance), ideal)
+        )
+
+    def objective(self, design, row):
+        """objective = grain_mass + violation_weight * violations, in kg
+        """
+
+        return self.grain_mass(design) + violation_weight * self.violations(design, row)
+
+    def start(self):
+        if self.tabulated:
+            # Built once here so the workers never race to write the table file
+            PropertyTable.load_or_build(Thermochemical(live=False).get_mixture())
+
+        if self.workers <= 1:
+            sweep.warm_up(self.tabulated, self.external_temp)
+        elif self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=sweep.warm_up,
+                initargs=(self.tabulated, self.external_temp)
+            )
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+            self.executor = None
+
+    def simulate(self, designs):
+        """Simulates the designs not yet in the memo, in parallel
+        """
+
+        designs = [design for design in dict.fromkeys(designs) if design not in self.rows]
+
+        runnable = []
+
+        for design in designs:
+            config = self.config(design)
+
+            if config.initial_port_diameter >= config.grain_diameter:
+                # No grain to burn, nothing to simulate
+                self.rows[design] = {'failed': 1.0, 'error': 'Port wider than the grain'}
+            else:
+                runnable.append(design)
+
+        parameter_sets = [dict(self.parameters, **dict(zip(self.names, design))) for design in runnable]
+
+        if self.executor is None:
+            rows = [sweep.run_case(parameters, self.external_temp) for parameters in parameter_sets]
+        else:
+            rows = list(self.executor.map(sweep.run_case, parameter_sets, itertools.repeat(self.external_temp)))
+
+        for design, row in zip(runnable, rows):
+            row['failed'] = 0.0 if row['error'] is None else 1.0
+
+            self.rows[design] = row
+
+    def surrogate_model(self):
+        """Radial basis function fit of the surrogate_outputs of every simulated design, None until there are enough
+        """
+
+        from scipy.interpolate import RBFInterpolator
+
+        designs = [design for design, row in self.rows.items() if 'impulse (newton * second)' in row]
+
+        if len(designs) < 2 * len(self.names) + 2:
+            return None
+
+        points = (np.array(designs) - self.lows) / (self.highs - self.lows)
+        values = np.array([[np.nan_to_num(self.rows[design][name]) for name in surrogate_outputs] for design in designs])
+
+        return RBFInterpolator(points, values, kernel='thin_plate_spline', smoothing=1e-6)
+
+    def map(self, function, population):
+        """Objective of every candidate of a generation, in the form differential_evolution's workers takes
+
+        function is differential_evolution's wrapper of objective_of(), it is applied once the designs are
+        simulated, or predicted by the surrogate.
+        """
+
+        population = list(population)
+        designs = [self.design(x) for x in population]
+
+        new = [design for design in dict.fromkeys(designs) if design not in self.rows]
+
+        self.cache_hits += len(designs) - len(new)
+
+        model = self.surrogate_model() if self.surrogate and new else None
+
+        if model is not None:
+            points = (np.array(new) - self.lows) / (self.highs - self.lows)
+
+            predicted = [
+                self.objective(design, dict(zip(surrogate_outputs, outputs)))
+                for design, outputs in zip(new, model(points))
+            ]
+
+            ranked = [design for _, design in sorted(zip(predicted, new))]
+            simulated = max(1, int(math.ceil(self.surrogate_fraction * len(new))))
+
+            for objective, design in zip(predicted, new):
+                self.predicted[design] = objective
+
+            self.predictions += len(new) - simulated
+
+            new = ranked[:simulated]
+
+        self.simulate(new)
+
+        return [function(x) for x in population]
+
+    def objective_of(self, x):
+        design = self.design(x)
+
+        if design in self.rows:
+            return self.objective(design, self.rows[design])
+
+        return self.predicted[design]
+
+    def optimise(self, generations=20, population=10, seed=0):
+        """Runs differential evolution over the variables, returns the DesignResult of the best simulated design
+        """
+
+        from scipy.optimize import differential_evolution
+
+        self.start()
+
+        try:
+            differential_evolution(
+                self.objective_of,
+                [(0.0, 1.0)] * len(self.names),
+                maxiter=generations,
+                popsize=population,
+                seed=seed,
+                workers=self.map,
+                updating='deferred',
+                polish=False
+            )
+        finally:
+            self.close()
+
+        return self.result()
+
+    def result(self):
+        """DesignResult of the best design simulated so far, surrogate predictions are never trusted for it
+        """
+
+        history = []
+
+        for design, row in self.rows.items():
+            entry = dict(zip(self.names, design))
+            entry['grain mass (kilogram)'] = self.grain_mass(design)
+            entry['objective'] = self.objective(design, row)
+            entry.update({name: row.get(name) for name in ('impulse (newton * second)', 'burn time (second)', 'average oxi fuel ratio', 'motor code', 'error')})
+
+            history.append(entry)
+
+        history = pd.DataFrame(history).sort_values('objective', ignore_index=True)
+
+        best = min(self.rows, key=lambda design: self.objective(design, self.rows[design]))
+
+        return DesignResult(
+            dict(zip(self.names, best)),
+            self.rows[best],
+            self.grain_mass(best),
+            self.violations(best, self.rows[best]) == 0,
+            history,
+            len(self.rows),
+            self.cache_hits,
+            self.predictions
+        )
+
+
+if __name__ == '__main__':
+    # Lightest grain for a J motor burning 8 to 12 seconds
+    result = Optimiser(
+        {
+            'grain_diameter': (1.25, 2.5),
+            'initial_port_diameter': (0.5, 1.25),
+            'port_length': (8.0, 16.0),
+            'injector_mass_flow_rate': (0.02, 0.07)
+        },
+        constants.ureg.Quantity(70, constants.ureg.degF),
+        motor_class='J',
+        burn_time=(8.0, 12.0),
+        tabulated=True,
+        surrogate=True
+    ).optimise(generations=10)
+
+    print(result.history.head(10).to_string())
+    print('Best: {}, grain mass {:.4f} kg, {}'.format(result.parameters, result.grain_mass, 'meets the targets' if result.feasible else 'misses the targets'))
+    print('Simulated {} designs, {} memoized repeats, {} surrogate predictions'.format(result.simulations, result.cache_hits, result.predictions))
@@ -1,18 +1,23 @@
-from thermo.mixture import Mixture
+import math
+
+import numpy as np
 
 import libraries.constants as constants
+import libraries.n2o as n2o
 
 
 class Oxidiser:
-    def __init__(self, external_temp):
-        self.mass = self.n2o_density(external_temp) * constants.initial_oxidiser_volume
+    def __init__(self, external_temp, config):
+        self.config = config
+
+        self.mass = self.n2o_density(external_temp) * config.initial_oxidiser_volume
         self.mass_flow_rate = 0 * constants.ureg.kg / constants.ureg.sec
 
     def mass_flow_rate_function(self):
-        self.mass -= (constants.injector_mass_flow_rate * constants.num_of_injectors) * constants.time_step
+        self.mass -= (self.config.injector_mass_flow_rate * self.config.num_of_injectors) * self.config.time_step
 
         if self.mass > 0 * constants.ureg.kg:
-            self.mass_flow_rate = constants.injector_mass_flow_rate * constants.num_of_injectors
+            self.mass_flow_rate = self.config.injector_mass_flow_rate * self.config.num_of_injectors
         else:
             self.mass_flow_rate = 0 * constants.ureg.kg / constants.ureg.sec
 
@@ -20,6 +25,227 @@ class Oxidiser:
 
     @staticmethod
     def n2o_density(external_temp):
-        n2o = Mixture(['n2o'], Vfls=[1], T=external_temp.to(constants.ureg.degK).magnitude)
+        """Saturated liquid density at external_temp, from libraries/n2o.py
+        """
+
+        density = n2o.saturation(external_temp.to(constants.ureg.degK).magnitude).liquid_density
+
+        return (density * (constants.ureg.kg / (constants.ureg.m ** 3))).to_base_units()
+
+
+class NumericOxidiser:
+    """Unit-free twin of Oxidiser, mass in kg and mass flow rate in kg/s
+    """
+
+    def __init__(self, external_temp, config):
+        self.initial_mass = constants.to_si(Oxidiser.n2o_density(external_temp) * config.initial_oxidiser_volume)
+        self.mass = self.initial_mass
+        self.mass_flow_rate = 0.0
+
+        self.injector_mass_flow_rate = constants.to_si(config.injector_mass_flow_rate) * config.num_of_injectors
+        self.time_step = constants.to_si(config.time_step)
+
+    def mass_flow_rate_function(self):
+        self.mass -= self.injector_mass_flow_rate * self.time_step
+
+        if self.mass > 0:
+            self.mass_flow_rate = self.injector_mass_flow_rate
+        else:
+            self.mass_flow_rate = 0.0
+
+        return self.mass_flow_rate
+
+
+def injector_flow_coefficient(config):
+    """injector_flow_coefficient = discharge_coefficient * num_of_injectors * pi * injector_diameter ** 2 / 4
+    """
+
+    return config.injector_discharge_coefficient * config.num_of_injectors * math.pi * constants.to_si(config.injector_diameter) ** 2 / 4
+
+
+def initial_tank(external_temp, config):
+    """(temperature, tank volume, mass) of a tank filled with initial_oxidiser_volume of liquid plus its ullage of vapour
+    """
+
+    temperature = external_temp.to(constants.ureg.degK).magnitude
+
+    saturated = n2o.saturation(temperature)
+
+    liquid_volume = constants.to_si(config.initial_oxidiser_volume)
+    volume = liquid_volume / (1 - config.tank_ullage)
+
+    mass = saturated.liquid_density * liquid_volume + saturated.vapour_density * (volume - liquid_volume)
+
+    return temperature, volume, mass
+
+
+class BlowdownOxidiser:
+    """Self-pressurising N2O tank in liquid vapour equilibrium, a drop-in for NumericOxidiser
+
+    The injector flow is driven by the tank to chamber pressure difference, mass_flow_rate = k * sqrt(2 * density * (P - chamber_pressure)).
+    Drawing liquid off boils some of the rest to refill the space with vapour, which cools the liquid and
+    drops its vapour pressure. Once the liquid is gone the vapour left expands isentropically.
+    """
+
+    def __init__(self, external_temp, config, chamber_pressure):
+        self.table = n2o.default_table()
+        self.chamber_pressure = chamber_pressure
+
+        # Set when the chamber pressure is solved from the flow, chamber_pressure = chamber_pressure_per_flow * mass_flow_rate
+        self.chamber_pressure_per_flow = None
+
+        self.temperature, self.volume, self.initial_mass = initial_tank(external_temp, config)
+        self.mass = self.initial_mass
+        self.mass_flow_rate = 0.0
+
+        self.pressure = self.table.properties(self.temperature).vapour_pressure
+        self.liquid = True
+
+        self.flow_coefficient = injector_flow_coefficient(config)
+        self.time_step = constants.to_si(config.time_step)
+
+    def injector_mass_flow_rate(self, density):
+        if self.chamber_pressure_per_flow is not None:
+            # mass_flow_rate ** 2 = 2 * k ** 2 * density * (P - chamber_pressure_per_flow * mass_flow_rate), its positive root
+            a = self.flow_coefficient ** 2 * density * self.chamber_pressure_per_flow
+
+            return math.sqrt(a ** 2 + 2 * self.flow_coefficient ** 2 * density * self.pressure) - a
+
+        if self.pressure <= self.chamber_pressure:
+            return 0.0
+
+        return self.flow_coefficient * math.sqrt(2 * density * (self.pressure - self.chamber_pressure))
+
+    def liquid_mass(self, mass, saturated):
+        """liquid_mass = (volume - mass / vapour_density) / (1 / liquid_density - 1 / vapour_density)
+        """
+
+        return (
+            (self.volume - mass / saturated.vapour_density) /
+            (1 / saturated.liquid_density - 1 / saturated.vapour_density)
+        )
+
+    def mass_flow_rate_function(self):
+        if self.liquid:
+            saturated = self.table.properties(self.temperature)
+
+            self.pressure = saturated.vapour_pressure
+
+            flow = self.injector_mass_flow_rate(saturated.liquid_density)
+
+            liquid_mass = self.liquid_mass(self.mass, saturated)
+
+            self.mass -= flow * self.time_step
+
+            new_liquid_mass = self.liquid_mass(self.mass, saturated)
+
+            if new_liquid_mass > 0:
+                # The liquid that boiled to fill the space drawn off takes its heat of vaporisation from the rest
+                vaporised = liquid_mass - flow * self.time_step - new_liquid_mass
+
+                self.temperature -= vaporised * saturated.enthalpy_of_vaporisation / (new_liquid_mass * saturated.liquid_heat_capacity)
+            else:
+                self.liquid = False
+
+                self.vapour_temperature = self.temperature
+                self.vapour_pressure = self.pressure
+                self.vapour_density = self.mass / self.volume
+        else:
+            density = self.mass / self.volume
+            expansion = density / self.vapour_density
+
+            self.pressure = self.vapour_pressure * expansion ** n2o.vapour_heat_capacity_ratio
+            self.temperature = self.vapour_temperature * expansion ** (n2o.vapour_heat_capacity_ratio - 1)
+
+            flow = self.injector_mass_flow_rate(density)
+
+            self.mass -= flow * self.time_step
+
+        if self.mass > 0 and flow > 0:
+            self.mass_flow_rate = flow
+        else:
+            self.mass_flow_rate = 0.0
+
+        return self.mass_flow_rate
+
+
+class BlowdownTanks:
+    """BlowdownOxidiser for N tanks at once as NumPy arrays, for VectorizedSimulation
+    """
+
+    def __init__(self, external_temps, configs, chamber_pressure, time_step):
+        self.table = n2o.default_table()
+        self.chamber_pressure = chamber_pressure
+        self.time_step = time_step
+
+        tanks = np.array([initial_tank(external_temp, config) for config, external_temp in zip(configs, external_temps)])
+
+        self.temperature = tanks[:, 0]
+        self.volume = tanks[:, 1]
+        self.mass = tanks[:, 2]
+
+        self.pressure = self.table.interpolate(self.temperature).vapour_pressure
+        self.liquid = np.ones(len(configs), dtype=bool)
+
+        self.vapour_temperature = self.temperature.copy()
+        self.vapour_pressure = self.pressure.copy()
+        self.vapour_density = self.mass / self.volume
+
+        self.flow_coefficient = np.array([injector_flow_coefficient(config) for config in configs])
+
+    def liquid_mass(self, mass, saturated):
+        return (self.volume - mass / saturated.vapour_density) / (1 / saturated.liquid_density - 1 / saturated.vapour_density)
+
+    def mass_flow_rate_function(self, mask):
+        """Advances the tanks in mask by one time step, returns every tank's injector mass flow rate
+        """
+
+        saturated = self.table.interpolate(self.temperature)
+
+        density = self.mass / self.volume
+        expansion = density / self.vapour_density
+
+        pressure = np.where(
+            self.liquid,
+            saturated.vapour_pressure,
+            self.vapour_pressure * expansion ** n2o.vapour_heat_capacity_ratio
+        )
+        flow_density = np.where(self.liquid, saturated.liquid_density, density)
+
+        with np.errstate(invalid='ignore'):
+            flow = np.where(
+                pressure > self.chamber_pressure,
+                self.flow_coefficient * np.sqrt(2 * flow_density * (pressure - self.chamber_pressure)),
+                0.0
+            )
+
+        liquid_mass = self.liquid_mass(self.mass, saturated)
+
+        mass = self.mass - flow * self.time_step
+
+        new_liquid_mass = self.liquid_mass(mass, saturated)
+        vaporised = liquid_mass - flow * self.time_step - new_liquid_mass
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cooled = self.temperature - vaporised * saturated.enthalpy_of_vaporisation / (new_liquid_mass * saturated.liquid_heat_capacity)
+
+        still_liquid = self.liquid & (new_liquid_mass > 0)
+        emptied = mask & self.liquid & ~still_liquid
+
+        temperature = np.where(
+            still_liquid,
+            cooled,
+            np.where(self.liquid, self.temperature, self.vapour_temperature * expansion ** (n2o.vapour_heat_capacity_ratio - 1))
+        )
+
+        # Tanks whose liquid ran out this step start their vapour blowdown from the state they emptied at
+        self.vapour_temperature = np.where(emptied, self.temperature, self.vapour_temperature)
+        self.vapour_pressure = np.where(emptied, pressure, self.vapour_pressure)
+        self.vapour_density = np.where(emptied, mass / self.volume, self.vapour_density)
+
+        self.pressure = np.where(mask, pressure, self.pressure)
+        self.temperature = np.where(mask, temperature, self.temperature)
+        self.mass = np.where(mask, mass, self.mass)
+        self.liquid = np.where(mask, still_liquid, self.liquid)
 
-        return (n2o.rhol * (constants.ureg.kg / (constants.ureg.m ** 3))).to_base_units()
+        return np.where((self.mass > 0) & (flow > 0), flow, 0.0)
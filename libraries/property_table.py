@@ -0,0 +1,256 @@
+import os
+import copy
+import math
+
+import numpy as np
+
+import libraries.constants as constants
+
+from libraries.thermochemical import MixtureState
+
+property_names = ('Cp', 'Cv', 'gamma', 'R', 'density')
+
+
+class PropertyTable:
+    """Frozen-composition gas properties tabulated on a uniform T x P grid (SI units)
+
+    Density is stored as density * T, which is exactly linear in P and flat in T for an ideal gas,
+    so bilinear interpolation of it stays accurate across coarse temperature cells.
+    """
+
+    def __init__(self, temperatures, pressures, values, composition):
+        self.temperatures = temperatures
+        self.pressures = pressures
+        self.values = values
+        self.composition = composition
+
+        self.T_min = temperatures[0]
+        self.T_step = (temperatures[-1] - temperatures[0]) / (len(temperatures) - 1)
+        self.P_min = pressures[0]
+        self.P_step = (pressures[-1] - pressures[0]) / (len(pressures) - 1)
+
+        # Plain lists of (Cp, Cv, density * T, R) are much faster than NumPy for the single-state lookups done every time step
+        self.rows = [values[property_names.index(name)].tolist() for name in ('Cp', 'Cv', 'density', 'R')]
+
+    @classmethod
+    def build(cls, mixture, temperatures, pressures):
+        if isinstance(mixture, MixtureState):
+            mixture = mixture.live()
+        else:
+            mixture = copy.deepcopy(mixture)
+
+        values = np.empty((len(property_names), len(temperatures), len(pressures)))
+
+        for i, T in enumerate(temperatures):
+            for j, P in enumerate(pressures):
+                mixture.T = float(T)
+                mixture.P = float(P)
+
+                values[:, i, j] = (
+                    mixture.Cpg,
+                    mixture.Cvg,
+                    mixture.Cpg / mixture.Cvg,
+                    mixture.R_specific,
+                    mixture.rhog * T
+                )
+
+        return cls(np.asarray(temperatures, dtype=float), np.asarray(pressures, dtype=float), values, composition(mixture))
+
+    @classmethod
+    def default_grid(cls, mixture):
+        return cls.build(mixture, *default_axes())
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        np.savez_compressed(
+            path,
+            temperatures=self.temperatures,
+            pressures=self.pressures,
+            values=self.values,
+            cas=np.array(self.composition[0]),
+            zs=np.array(self.composition[1])
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['temperatures'],
+                data['pressures'],
+                data['values'],
+                (tuple(data['cas'].tolist()), tuple(data['zs'].tolist()))
+            )
+
+    @classmethod
+    def load_or_build(cls, mixture, path=constants.property_table_path):
+        """Loads the table at path, tabulating and saving it first if it is missing, for another mixture or on another grid
+        """
+
+        temperatures, pressures = default_axes()
+
+        if os.path.exists(path):
+            table = cls.load(path)
+
+            same_grid = np.array_equal(table.temperatures, temperatures) and np.array_equal(table.pressures, pressures)
+
+            if table.composition == composition(mixture) and same_grid:
+                return table
+
+        table = cls.build(mixture, temperatures, pressures)
+        table.save(path)
+
+        return table
+
+    def properties(self, T, P):
+        """(Cp, Cv, density, R) at a single state, in the order of PropertyCache.lookup()
+        """
+
+        x = (T - self.T_min) / self.T_step
+        y = (P - self.P_min) / self.P_step
+
+        # Clamp the cell, not the fraction, so states just off the grid extrapolate linearly
+        i = min(max(int(math.floor(x)), 0), len(self.temperatures) - 2)
+        j = min(max(int(math.floor(y)), 0), len(self.pressures) - 2)
+
+        u = x - i
+        v = y - j
+
+        w00 = (1 - u) * (1 - v)
+        w01 = (1 - u) * v
+        w10 = u * (1 - v)
+        w11 = u * v
+
+        Cp, Cv, density_T, R = [
+            w00 * rows[i][j] + w01 * rows[i][j + 1] + w10 * rows[i + 1][j] + w11 * rows[i + 1][j + 1]
+            for rows in self.rows
+        ]
+
+        return Cp, Cv, density_T / T, R
+
+    def interpolate(self, T, P):
+        """Vectorized bilinear interpolation, returns a dict of property_names to arrays shaped like T and P
+        """
+
+        T, P = np.broadcast_arrays(np.asarray(T, dtype=float), np.asarray(P, dtype=float))
+
+        x = (T - self.T_min) / self.T_step
+        y = (P - self.P_min) / self.P_step
+
+        i = np.clip(np.floor(x).astype(int), 0, len(self.temperatures) - 2)
+        j = np.clip(np.floor(y).astype(int), 0, len(self.pressures) - 2)
+
+        u = x - i
+        v = y - j
+
+        values = (
+            (1 - u) * (1 - v) * self.values[:, i, j] +
+            (1 - u) * v * self.values[:, i, j + 1] +
+            u * (1 - v) * self.values[:, i + 1, j] +
+            u * v * self.values[:, i + 1, j + 1]
+        )
+
+        results = dict(zip(property_names, values))
+        results['density'] = results['density'] / T
+
+        return results
+
+    def error_report(self, mixture):
+        """Max and mean relative error against live thermo at every cell centre, where bilinear error peaks
+        """
+
+        mixture = copy.deepcopy(mixture)
+
+        T_centres = (self.temperatures[:-1] + self.temperatures[1:]) / 2
+        P_centres = (self.pressures[:-1] + self.pressures[1:]) / 2
+
+        T, P = np.meshgrid(T_centres, P_centres, indexing='ij')
+
+        interpolated = self.interpolate(T, P)
+
+        live = np.empty((len(property_names),) + T.shape)
+
+        for i, cell_T in enumerate(T_centres):
+            for j, cell_P in enumerate(P_centres):
+                mixture.T = float(cell_T)
+                mixture.P = float(cell_P)
+
+                live[:, i, j] = (mixture.Cpg, mixture.Cvg, mixture.Cpg / mixture.Cvg, mixture.R_specific, mixture.rhog)
+
+        report = {}
+
+        for k, name in enumerate(property_names):
+            relative_error = np.abs(interpolated[name] - live[k]) / np.abs(live[k])
+
+            report[name] = (relative_error.max(), relative_error.mean())
+
+        return report
+
+
+def composition(mixture):
+    return tuple(mixture.CASs), tuple(mixture.zs)
+
+
+def default_axes():
+    """(temperatures, pressures) of the grid set by constants.property_table_temperatures and property_table_pressures
+    """
+
+    temperatures = np.linspace(
+        constants.to_si(constants.property_table_temperatures[0]),
+        constants.to_si(constants.property_table_temperatures[1]),
+        constants.property_table_temperatures[2]
+    )
+    pressures = np.linspace(
+        constants.to_si(constants.property_table_pressures[0]),
+        constants.to_si(constants.property_table_pressures[1]),
+        constants.property_table_pressures[2]
+    )
+
+    return temperatures, pressures
+
+
+if __name__ == '__main__':
+    import time
+
+    from libraries.thermochemical import Thermochemical
+
+    mixture = Thermochemical().get_mixture()
+
+    start = time.perf_counter()
+    table = PropertyTable.default_grid(mixture)
+    table.save(constants.property_table_path)
+    print('Tabulated {} x {} states in {:.2f} s -> {}'.format(
+        len(table.temperatures), len(table.pressures), time.perf_counter() - start, constants.property_table_path
+    ))
+
+    for name, (max_error, mean_error) in table.error_report(mixture).items():
+        print('{:>8}: max relative error {:.2e}, mean {:.2e}'.format(name, max_error, mean_error))
+
+    T = mixture.T
+    P = mixture.P
+
+    start = time.perf_counter()
+    for _ in range(10000):
+        mixture.T = T + 1e-9
+        mixture.P = P
+        mixture.Cpg, mixture.Cvg, mixture.rhog, mixture.R_specific
+        mixture.T = T
+        mixture.Cpg, mixture.Cvg, mixture.rhog, mixture.R_specific
+    live_time = (time.perf_counter() - start) / 20000
+
+    start = time.perf_counter()
+    for _ in range(20000):
+        table.properties(T, P)
+    table_time = (time.perf_counter() - start) / 20000
+
+    T_batch = np.full(100000, T)
+    P_batch = np.full(100000, P)
+
+    start = time.perf_counter()
+    table.interpolate(T_batch, P_batch)
+    batch_time = (time.perf_counter() - start) / len(T_batch)
+
+    print('Live thermo {:.2f} us per state'.format(live_time * 1e6))
+    print('Table {:.2f} us per single state ({:.0f}x), {:.3f} us per state vectorized ({:.0f}x)'.format(
+        table_time * 1e6, live_time / table_time, batch_time * 1e6, live_time / batch_time
+    ))
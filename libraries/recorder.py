@@ -0,0 +1,201 @@
+import numpy as np
+
+import libraries.constants as constants
+
+time_header = 'time (second)'
+
+
+class Recorder:
+    """Columnar time series in preallocated NumPy arrays, grown by doubling
+
+    columns is the schema, (name, SI units, reported units, rounding digits) per column, declared once.
+    Values are appended in SI units in schema order and only the columns named in keep are stored.
+    Unit conversion and rounding happen once per column in frame(), which hands the arrays to pandas
+    without copying them.
+
+    Given a sink, the rows are written to it in chunks of capacity rows instead of growing, so memory
+    stays flat however long the burn. The last tail rows always stay in memory and per column sums and
+    peaks of the written rows are kept, so mean() and max() still cover the whole run.
+    """
+
+    def __init__(self, columns, keep=None, capacity=1024, sink=None, tail=2):
+        names = [column[0] for column in columns]
+
+        if keep is None:
+            keep = names
+
+        unknown = set(keep) - set(names)
+
+        if unknown:
+            raise ValueError('Unknown recorded columns: {}'.format(', '.join(sorted(unknown))))
+
+        self.indices = [i for i, name in enumerate(names) if name in keep]
+
+        self.headers = []
+        self.scales = np.ones(len(self.indices))
+        self.offsets = np.zeros(len(self.indices))
+        self.digits = []
+
+        for k, i in enumerate(self.indices):
+            name, si_units, units, digits = columns[i]
+
+            if units is None:
+                self.headers.append(name)
+            else:
+                self.scales[k], self.offsets[k] = constants.si_conversion(si_units, units)
+                self.headers.append('{} ({})'.format(name, '{0.units}'.format(constants.ureg.Quantity(1, units))))
+
+            self.digits.append(digits)
+
+        self.everything = len(self.indices) == len(columns)
+
+        self.sink = sink
+        self.tail = tail
+
+        if sink is not None and capacity <= tail:
+            raise ValueError('A streamed recorder needs more than {} rows of capacity'.format(tail))
+
+        self.times = np.empty(capacity)
+        self.values = np.empty((len(self.indices), capacity))
+        self.count = 0
+
+        # Rows already written to the sink and their rounded, reported unit column sums and peaks
+        self.written = 0
+        self.written_sums = np.zeros(len(self.indices))
+        self.written_peaks = np.full(len(self.indices), -np.inf)
+
+    def __len__(self):
+        return self.written + self.count
+
+    def grow(self):
+        capacity = 2 * self.times.shape[0]
+
+        times = np.empty(capacity)
+        times[:self.count] = self.times[:self.count]
+
+        values = np.empty((len(self.indices), capacity))
+        values[:, :self.count] = self.values[:, :self.count]
+
+        self.times = times
+        self.values = values
+
+    def append(self, time, values):
+        if self.count == self.times.shape[0]:
+            if self.sink is None:
+                self.grow()
+            else:
+                self.flush(self.count - self.tail)
+
+        self.times[self.count] = time
+
+        if self.everything:
+            self.values[:, self.count] = values
+        else:
+            self.values[:, self.count] = [values[i] for i in self.indices]
+
+        self.count += 1
+
+    def flush(self, rows=None):
+        """Writes the first rows held in memory to the sink and drops them, all of them by default
+        """
+
+        if rows is None:
+            rows = self.count
+
+        if rows <= 0:
+            return
+
+        frame = self.frame(rows)
+
+        self.sink.write(frame)
+
+        self.written += rows
+        self.written_sums += frame.to_numpy().sum(axis=0)
+        self.written_peaks = np.maximum(self.written_peaks, frame.to_numpy().max(axis=0))
+
+        remaining = self.count - rows
+
+        self.times[:remaining] = self.times[rows:self.count]
+        self.values[:, :remaining] = self.values[:, rows:self.count]
+        self.count = remaining
+
+    def close(self):
+        """Writes the rows still in memory to the sink and closes it, they stay readable for mean() and max()
+        """
+
+        if self.sink is None:
+            return
+
+        self.sink.write(self.frame())
+        self.sink.close()
+
+        self.sink = None
+
+    def index(self, rows=None):
+        if rows is None:
+            rows = self.count
+
+        import pandas as pd
+
+        return pd.Index(self.times[:rows].copy(), name=time_header)
+
+    def frame(self, rows=None):
+        """Recorded columns in memory in their reported units and rounding, indexed by time
+        """
+
+        if rows is None:
+            rows = self.count
+
+        values = self.values[:, :rows] * self.scales[:, np.newaxis] + self.offsets[:, np.newaxis]
+
+        for k, digits in enumerate(self.digits):
+            if digits is not None:
+                np.round(values[k], digits, out=values[k])
+
+        import pandas as pd
+
+        # values.T is the F-ordered view pandas stores as one block, so the frame shares its memory
+        return pd.DataFrame(values.T, index=self.index(rows), columns=self.headers, copy=False)
+
+    def column(self, header):
+        """One recorded column in memory, in its reported units and rounding
+        """
+
+        k = self.headers.index(header)
+
+        values = self.values[k, :self.count] * self.scales[k] + self.offsets[k]
+
+        if self.digits[k] is not None:
+            values = np.round(values, self.digits[k])
+
+        return values
+
+    def streamed(self):
+        return self.written > 0
+
+    def mean(self, header, drop_last=0):
+        """Mean of a recorded column over every row of the run, leaving out the last drop_last rows
+        """
+
+        if drop_last > self.tail and self.streamed():
+            raise ValueError('Only the last {} streamed rows can be left out of a mean'.format(self.tail))
+
+        rows = len(self) - drop_last
+
+        if rows <= 0:
+            return np.nan
+
+        k = self.headers.index(header)
+
+        return (self.written_sums[k] + self.column(header)[:self.count - drop_last].sum()) / rows
+
+    def max(self, header):
+        if len(self) == 0:
+            return np.nan
+
+        k = self.headers.index(header)
+
+        if self.count == 0:
+            return self.written_peaks[k]
+
+        return max(self.written_peaks[k], self.column(header).max())
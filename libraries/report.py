@@ -0,0 +1,362 @@
+import os
+import sys
+import json
+import hashlib
+import contextlib
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.oxidiser import Oxidiser
+from libraries.recorder import time_header
+from libraries.sinks import output_formats
+from libraries.simulation import suggested_nozzle_dimensions
+
+# Bumped whenever the report layout changes, so unchanged results are rendered again
+report_version = 1
+
+
+def run_name(ideal, external_temp):
+    if ideal:
+        return 'ideal_nozzle_{}F'.format(external_temp.to(constants.ureg.degF).magnitude)
+
+    return 'suggested_nozzle_{}F'.format(external_temp.to(constants.ureg.degF).magnitude)
+
+
+def run_paths(name, results_dir='results', output_format='csv'):
+    """Saved results of one run, its time series, its inputs and scalar results, and its report
+
+    The time series is in one of the output_formats of libraries/sinks.py. An instrumented run also saves
+    its instrumentation summary and, when profiled, its cProfile stats.
+    """
+
+    return {
+        'data': os.path.join(results_dir, '{}_motor_data{}'.format(name, output_formats[output_format])),
+        'run': os.path.join(results_dir, '{}_run.json'.format(name)),
+        'pdf': os.path.join(results_dir, '{}_results.pdf'.format(name)),
+        'instrumentation': os.path.join(results_dir, '{}_instrumentation.json'.format(name)),
+        'profile': os.path.join(results_dir, '{}_profile.prof'.format(name)),
+        'images': os.path.join(results_dir, 'images', name),
+        'stamp': os.path.join(results_dir, 'images', name, 'source.sha256')
+    }
+
+
+def save_run(path, ideal, external_temp, config, time, impulse):
+    """Writes what the report needs besides the time series, so it can be rendered later from saved results
+    """
+
+    run = {
+        'ideal': ideal,
+        'external temp (degree_Fahrenheit)': external_temp.to(constants.ureg.degF).magnitude,
+        'burn time (second)': time,
+        'impulse (newton * second)': impulse,
+        'config': config.plain_values()
+    }
+
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=4)
+
+
+def load_data(path):
+    """The saved time series of a run, in the output format its extension names
+    """
+
+    import pandas as pd
+
+    if path.endswith(output_formats['parquet']):
+        return pd.read_parquet(path)
+
+    if path.endswith(output_formats['hdf5']):
+        return pd.read_hdf(path)
+
+    return pd.read_csv(path, index_col=time_header)
+
+
+def image_name(column):
+    return '_'.join(column.split('(')[0].split())
+
+
+def pyplot():
+    """matplotlib.pyplot, imported on first use so runs without a report never load it
+    """
+
+    import matplotlib
+
+    # Figures only ever go to files, Agg needs no display and is safe to use from worker processes
+    matplotlib.use('Agg')
+
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def save_figure(fig, path):
+    """Saves fig as an opaque RGB PNG, FPDF embeds those as they are but splits an alpha channel pixel by pixel
+    """
+
+    from PIL import Image
+
+    fig.canvas.draw()
+
+    Image.fromarray(np.asarray(fig.canvas.buffer_rgba())).convert('RGB').save(path)
+
+    pyplot().close(fig=fig)
+
+    return path
+
+
+def plot_column(index, values, column, path):
+    """Saves one column vs time figure, runs in a report worker process
+    """
+
+    import pandas as pd
+
+    data = pd.DataFrame({column: values}, index=pd.Index(index, name=time_header))
+
+    # pandas plots through pyplot, which has to be on the Agg backend first
+    pyplot()
+
+    fig = data.plot(
+        y=column,
+        title='{} vs {}'.format(column, time_header),
+        grid=True,
+        use_index=True
+    ).get_figure()
+
+    return save_figure(fig, path)
+
+
+def plot_summary(data, path, columns_per_row=4):
+    """Saves every column on one multi-panel page
+    """
+
+    rows = -(-len(data.columns) // columns_per_row)
+
+    fig, axes = pyplot().subplots(rows, columns_per_row, figsize=(4 * columns_per_row, 2.5 * rows), sharex=True)
+
+    for ax, column in zip(axes.flat, data.columns):
+        ax.plot(data.index, data[column].to_numpy(), linewidth=1)
+        ax.set_title(column, fontsize=8)
+        ax.tick_params(labelsize=6)
+        ax.grid(True)
+
+    for ax in list(axes.flat)[len(data.columns):]:
+        ax.set_visible(False)
+
+    fig.tight_layout()
+
+    return save_figure(fig, path)
+
+
+def source_hash(paths, summary_page):
+    digest = hashlib.sha256()
+
+    for key in ('data', 'run'):
+        with open(paths[key], 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+    digest.update('{} {}'.format(report_version, summary_page).encode())
+
+    return digest.hexdigest()
+
+
+def write_inputs_page(pdf, run, data):
+    external_temp = constants.ureg.Quantity(run['external temp (degree_Fahrenheit)'], constants.ureg.degF)
+    config = MotorConfig(**run['config'])
+
+    time = run['burn time (second)'] * constants.ureg.sec
+    impulse = run['impulse (newton * second)'] * constants.ureg.newton * constants.ureg.second
+
+    pdf.add_page('P')
+
+    pdf.set_font('Arial', '', 14)
+
+    if run['ideal']:
+        pdf.write(10, 'Ideal Nozzle Simulation Inputs:\n')
+    else:
+        pdf.write(10, 'Suggested Nozzle Simulation Inputs:\n')
+
+    pdf.write(5, 'a: {0:.2f}\n'.format(config.a.to((constants.ureg.m ** 2)/constants.ureg.kg)))
+    pdf.write(5, 'n: {}\n'.format(config.n))
+    pdf.write(5, 'm: {}\n'.format(config.m))
+
+    pdf.write(5, '\nOxidiser:\n\n')
+
+    pdf.write(5, 'Initial Volume: {0:.2f}\n'.format(config.initial_oxidiser_volume.to(constants.ureg.liter)))
+
+    oxidiser_density = Oxidiser.n2o_density(external_temp)
+
+    initial_oxi_mass = config.initial_oxidiser_volume * oxidiser_density
+
+    pdf.write(5, 'Initial Mass: {} lbs\n\n'.format(round(initial_oxi_mass.to(constants.ureg.lb).magnitude, 2)))
+
+    pdf.write(5, 'Injector Mass Flow Rate: {0:.3f}\n'.format(config.injector_mass_flow_rate.to(constants.ureg.kg / constants.ureg.second)))
+    pdf.write(5, 'Number of Injectors: {}\n'.format(config.num_of_injectors))
+
+    pdf.write(5, 'Ideal O/F Ratio: {}\n'.format(config.ideal_OF_ratio))
+
+    pdf.write(5, 'External Temp: {}\n'.format(external_temp.to(constants.ureg.degF)))
+
+    pdf.write(5, 'Time Step: {}\n'.format(config.time_step.to_base_units()))
+
+    if config.combustion_model == 'equilibrium':
+        pdf.write(5, 'Combustion Chemistry: equilibrium, by O/F and chamber pressure\n')
+
+    if config.grain_model == 'axial':
+        pdf.write(5, 'Fuel Grain Regression: axial, {} cells\n'.format(config.grain_cells))
+
+    pdf.write(5, '\nSimulation Results:\n\n')
+
+    pdf.write(5, 'Total Burn Time: {}\n\n'.format(round(time, 3)))
+    pdf.write(5, 'Impulse: {}\n'.format(round(impulse, 2)))
+
+    average_trust = data['nozzle thrust (newton)'].mean()
+
+    pdf.write(5, 'Average Thrust: {} newton\n'.format(round(average_trust, 2)))
+
+    motor_code = constants.get_motor_code(impulse)
+
+    pdf.write(5, 'Motor: {}{}\n'.format(motor_code, int(round(average_trust))))
+
+    nozzle_results = suggested_nozzle_dimensions(data)
+
+    pdf.write(5, '\nNozzle Results:\n\n')
+
+    if config.chamber_pressure_model == 'throat':
+        pdf.write(5, 'As Built Throat Diameter: {}\n'.format(config.nozzle_throat_diameter.to(constants.ureg.inches)))
+
+    pdf.write(5, 'Suggested Throat Diameter: {} inch\n'.format(round(nozzle_results['nozzle_throat_dia_avg'].to(constants.ureg.inches).magnitude, 3)))
+    pdf.write(5, 'Suggested Exit Diameter: {} inch\n'.format(round(nozzle_results['nozzle_exit_dia_avg'].to(constants.ureg.inches).magnitude, 3)))
+    pdf.write(5, 'Suggested Diffuser Length: {} inch\n'.format(round(nozzle_results['nozzle_diffuser_len_avg'].to(constants.ureg.inches).magnitude, 3)))
+
+    pdf.write(5, '\nFuel Grain\n\n')
+
+    pdf.write(5, 'Port Length: {}\n'.format(config.port_length.to(constants.ureg.inches)))
+    pdf.write(5, 'Fuel Density: {0:.2f}\n'.format(config.fuel_density.to(constants.ureg.kg / (constants.ureg.m ** 3))))
+
+    pdf.write(5, '\nGrain Diameter: {0:.2f}\n'.format(round(config.grain_diameter.to(constants.ureg.inches), 3)))
+    pdf.write(5, 'Initial Port Diameter: {}\n'.format(config.initial_port_diameter.to(constants.ureg.inches)))
+    pdf.write(5, 'Final Port Diameter: {} inch\n'.format(round(data['average port diameter (inch)'].iloc[-1], 3)))
+
+
+def write_instrumentation_page(pdf, lines):
+    pdf.add_page('P')
+
+    pdf.set_font('Arial', '', 14)
+    pdf.write(10, 'Run Instrumentation:\n')
+
+    # Fixed width, so the columns line up
+    pdf.set_font('Courier', '', 8)
+
+    for line in lines:
+        pdf.write(4, line + '\n')
+
+
+def render_report(name, results_dir='results', workers=None, summary_page=False, force=False, instrumentation=None, output_format='csv'):
+    """Renders the PDF report of a saved run, one figure per column drawn across a process pool
+
+    Images go to results/images/<name>/. Nothing is rendered when the saved time series and inputs are
+    unchanged since the last report, unless force is set. Returns whether the report was rendered.
+    Given the Instrumentation of the run, its summary so far goes on a page after the inputs and the
+    figures and PDF output are timed as parts of it. That page is not part of the stamp, so for unchanged
+    results only the PDF is written again around the figures already drawn. output_format is the format
+    the time series was saved in.
+    """
+
+    paths = run_paths(name, results_dir, output_format)
+
+    if instrumentation is None:
+        instrumentation_lines = ()
+        phase = contextlib.nullcontext
+    else:
+        instrumentation_lines = instrumentation.lines()
+        phase = instrumentation.phase
+
+    digest = source_hash(paths, summary_page)
+
+    # The stamp is the digest, then whether the PDF has an instrumentation page
+    figures_current = False
+    instrumented = False
+
+    if not force and os.path.exists(paths['pdf']) and os.path.exists(paths['stamp']):
+        with open(paths['stamp']) as f:
+            stamp = f.read().split()
+
+        figures_current = stamp[:1] == [digest]
+        instrumented = 'instrumented' in stamp[1:]
+
+    if figures_current and instrumentation is None and not instrumented:
+        return False
+
+    with open(paths['run']) as f:
+        run = json.load(f)
+
+    data = load_data(paths['data'])
+
+    os.makedirs(paths['images'], exist_ok=True)
+
+    image_paths = [os.path.join(paths['images'], image_name(column) + '.png') for column in data.columns]
+    index = data.index.to_numpy()
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    workers = min(workers, len(data.columns))
+
+    summary_path = os.path.join(paths['images'], 'summary.png') if summary_page else None
+
+    # Figures drawn by the last report of these same results are reused
+    if not figures_current:
+        with phase('report / figures'):
+            if workers <= 1:
+                for column, path in zip(data.columns, image_paths):
+                    plot_column(index, data[column].to_numpy(), column, path)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(
+                        plot_column,
+                        [index] * len(data.columns),
+                        [data[column].to_numpy() for column in data.columns],
+                        data.columns,
+                        image_paths
+                    ))
+
+            if summary_page:
+                plot_summary(data, summary_path)
+
+    with phase('report / pdf output'):
+        from fpdf import FPDF
+
+        pdf = FPDF()
+
+        write_inputs_page(pdf, run, data)
+
+        if instrumentation_lines:
+            write_instrumentation_page(pdf, instrumentation_lines)
+
+        if summary_page:
+            pdf.add_page('L')
+            pdf.image(summary_path, w=270)
+
+        for path in image_paths:
+            pdf.add_page('L')
+            pdf.image(path)
+
+        pdf.output(paths['pdf'], 'F')
+
+    with open(paths['stamp'], 'w') as f:
+        f.write(digest + ('\ninstrumented' if instrumentation_lines else ''))
+
+    return True
+
+
+if __name__ == '__main__':
+    # python -m libraries.report ideal_nozzle_70F [results dir]
+    rendered = render_report(*sys.argv[1:3], summary_page=True)
+
+    print('Rendered' if rendered else 'Unchanged, not rendered')
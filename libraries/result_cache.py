@@ -0,0 +1,200 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+import tempfile
+import functools
+import importlib.metadata
+
+import libraries.constants as constants
+
+# Constants that only tune speed, memory or where files go, they never change a result
+unhashed_constants = (
+    'property_cache_size',
+    'property_table_path',
+    'chemistry_table_path',
+    'output_chunk_size',
+    'checkpoint_interval',
+    'result_cache_path',
+    'result_cache_size',
+    'benchmark_history_path',
+    'benchmark_regression_threshold'
+)
+
+# Packages whose version can change a result: the gas properties, the units, the numerics and the saved tables
+result_dependencies = ('thermo', 'chemicals', 'fluids', 'pint', 'numpy', 'scipy', 'pandas')
+
+
+def constant_values():
+    """Every plain value in libraries/constants.py that a result can depend on, as strings
+    """
+
+    values = {}
+
+    for name, value in vars(constants).items():
+        if name.startswith('_') or name in unhashed_constants:
+            continue
+
+        if isinstance(value, (bool, int, float, str, tuple, dict, constants.ureg.Quantity)):
+            values[name] = str(value)
+
+    return values
+
+
+@functools.lru_cache(maxsize=None)
+def dependency_versions():
+    """{package: installed version} of the packages a result depends on, None for one not installed
+
+    Read from the package metadata, so thermo is not imported for it.
+    """
+
+    versions = {}
+
+    for package in result_dependencies:
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return versions
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Digest of the libraries/ source and the dependency versions
+
+    Any change to the model or to a package it runs on invalidates the cache. Read once per process, every
+    input_key() and checkpoint save and load share it.
+    """
+
+    digest = hashlib.sha256()
+
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.py'))):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    digest.update(json.dumps(dependency_versions(), sort_keys=True).encode())
+
+    return digest.hexdigest()
+
+
+def input_key(config, external_temp, mixture, **options):
+    """Stable hash of everything a run's results depend on, options are the engine flags like reference
+    """
+
+    inputs = {
+        'constants': constant_values(),
+        'config': config.plain_values(),
+        'mixture': [list(mixture.CASs), list(mixture.zs), mixture.T, mixture.P],
+        'external temp (kelvin)': external_temp.to(constants.ureg.K).magnitude,
+        'options': options,
+        'code version': code_version()
+    }
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """On disk cache of finished runs, one directory of saved result files per input_key()
+
+    Entries are written to a temporary directory and renamed into place, so a reader never sees half an
+    entry. Least recently used entries are evicted once the cache grows past max_size bytes.
+    """
+
+    def __init__(self, path=constants.result_cache_path, max_size=constants.result_cache_size):
+        self.path = path
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, key):
+        return os.path.join(self.path, key)
+
+    def load(self, key, files):
+        """Copies the cached files of key to files, {name: path}, and returns the cached results, None on a miss
+        """
+
+        entry = self.entry_path(key)
+
+        try:
+            with open(os.path.join(entry, 'results.json')) as f:
+                results = json.load(f)
+
+            for name, path in files.items():
+                shutil.copyfile(os.path.join(entry, name), path)
+        except FileNotFoundError:
+            self.misses += 1
+
+            return None
+
+        # Marks the entry as recently used for eviction
+        os.utime(entry)
+
+        self.hits += 1
+
+        return results
+
+    def store(self, key, files, results):
+        """Caches the files, {name: path}, and the JSON serialisable results of a finished run under key
+        """
+
+        os.makedirs(self.path, exist_ok=True)
+
+        staging = tempfile.mkdtemp(dir=self.path, prefix='.staging-')
+
+        try:
+            for name, path in files.items():
+                shutil.copyfile(path, os.path.join(staging, name))
+
+            with open(os.path.join(staging, 'results.json'), 'w') as f:
+                json.dump(results, f)
+
+            try:
+                os.rename(staging, self.entry_path(key))
+            except OSError:
+                # Another process cached the same inputs first
+                shutil.rmtree(staging)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+
+            raise
+
+        self.evict()
+
+    def entries(self):
+        """[(last used, size in bytes, path)] of every entry, least recently used first
+        """
+
+        entries = []
+
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+
+            if name.startswith('.') or not os.path.isdir(entry):
+                continue
+
+            size = sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+
+            entries.append((os.path.getmtime(entry), size, entry))
+
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+
+            shutil.rmtree(entry, ignore_errors=True)
+
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,181 @@
+import os
+import json
+import contextlib
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.thermochemical import Thermochemical, MixtureState
+from libraries.sinks import create_sink, output_formats
+from libraries.report import run_name, run_paths
+
+
+def simulate(ideal, external_temp, reference=False, tabulated=False, config=None, report=True, workers=None, summary_page=False, results_dir='results', cached=True, instrument=False, profile=False, output_format='csv', mixture=None, table=None, checkpoint=None):
+    """Runs the burn with the unit-free numeric engine, or with the pint engine when reference is set
+
+    tabulated interpolates the numeric engine's gas properties from the precomputed PropertyTable. The
+    time series and run inputs are saved under results_dir, report then renders the PDF from them, see
+    libraries/report.py render_report(). cached reuses the saved results of a finished run with the
+    same inputs from the ResultCache instead of running it again.
+
+    instrument times the phases of the run and counts its steps, solver iterations and property lookups,
+    profile also runs cProfile over it, see libraries/instrumentation.py. The summary is printed, saved
+    next to the results and added to the report.
+
+    output_format is the time series file format, one of libraries/sinks.py output_formats. mixture and
+    table share an already loaded Thermochemical mixture and PropertyTable across runs, see libraries/cli.py.
+
+    checkpoint is a file the numeric engine saves its state to every constants.checkpoint_interval steps,
+    a run stopped part way resumes from it when started again with the same inputs, see
+    libraries/checkpoint.py. A checkpoint of other inputs or of another code version is started over
+    and replaced. The rows are then kept in memory and written once the burn ends.
+    """
+
+    if checkpoint is not None and reference:
+        raise ValueError('Only the numeric engine can be checkpointed')
+
+    if instrument or profile:
+        from libraries.instrumentation import Instrumentation
+
+        instrumentation = Instrumentation(profile=profile)
+        phase = instrumentation.phase
+    else:
+        instrumentation = None
+        phase = contextlib.nullcontext
+
+    config = MotorConfig() if config is None else config
+
+    name = run_name(ideal, external_temp)
+    paths = run_paths(name, results_dir, output_format)
+    files = {'motor_data' + output_formats[output_format]: paths['data'], 'run.json': paths['run']}
+
+    with phase('setup'):
+        if mixture is None:
+            # The result cache key only reads the composition, thermo is imported once a burn reads properties live
+            mixture = Thermochemical(live=False).get_mixture()
+
+    if cached:
+        with phase('result cache lookup'):
+            from libraries.result_cache import ResultCache, input_key
+
+            cache = ResultCache()
+            key = input_key(config, external_temp, mixture, ideal=ideal, reference=reference, tabulated=tabulated, output_format=output_format)
+
+            results = cache.load(key, files)
+
+        if results is not None:
+            if report:
+                with phase('report'):
+                    from libraries.report import render_report
+
+                    render_report(name, results_dir, workers=workers, summary_page=summary_page, instrumentation=instrumentation, output_format=output_format)
+
+            save_instrumentation(instrumentation, paths)
+
+            return {name: value * constants.ureg.inches for name, value in results.items()}
+
+    with phase('setup'):
+        # A result cache hit, above, needs none of the model, nor pandas that it writes its results through
+        from libraries.simulation import create_simulation, suggested_nozzle_dimensions
+
+        if tabulated and table is None:
+            from libraries.property_table import PropertyTable
+
+            table = PropertyTable.load_or_build(mixture)
+        elif not tabulated:
+            table = None
+
+        # thermo is only imported for gas properties read live, not for tabulated or equilibrium ones
+        if isinstance(mixture, MixtureState) and (reference or (table is None and config.combustion_model == 'frozen')):
+            mixture = mixture.live()
+
+        # The numeric engine streams its rows into the output file during the burn, so a crash keeps everything up to it
+        if reference or checkpoint is not None:
+            sink = None
+        else:
+            sink = create_sink(paths['data'], output_format)
+
+        simulation = None
+
+        if checkpoint is not None and os.path.exists(checkpoint):
+            # Imported here, only checkpointed runs need it
+            from libraries.checkpoint import Checkpoint
+
+            try:
+                saved = Checkpoint.load(checkpoint)
+
+                # The checkpoint of a run with other inputs is overwritten by this run's, like sweep.run_case()
+                if saved.config.plain_values() == config.plain_values() and saved.external_temp == external_temp:
+                    simulation = saved.restore(create_simulation(external_temp, config, table=table, mixture=mixture))
+            except ValueError:
+                # Saved by another version of the model, start over
+                simulation = None
+
+        if simulation is None:
+            simulation = create_simulation(external_temp, config, reference=reference, table=table, mixture=mixture, sink=sink)
+
+    finished = False
+
+    try:
+        with phase('burn'):
+            if instrumentation is not None:
+                simulation.instrument(instrumentation)
+
+            simulation.run(checkpoint=checkpoint)
+
+        finished = True
+    except Exception as e:
+        print('Error: {}'.format(e))
+
+        raise e
+
+    finally:
+        with phase('saving results'):
+            from libraries.report import save_run, load_data
+
+            if sink is None:
+                with create_sink(paths['data'], output_format) as sink:
+                    sink.write(simulation.data())
+
+            # A failed burn keeps its last checkpoint to look into
+            if checkpoint is not None and finished:
+                from libraries.checkpoint import remove_checkpoint
+
+                remove_checkpoint(checkpoint)
+
+            save_run(paths['run'], ideal, external_temp, simulation.config, simulation.time, simulation.impulse)
+
+            nozzle_results = suggested_nozzle_dimensions(load_data(paths['data']))
+
+            # Only finished burns are cached, a failed one runs again and reports its error again
+            if cached and finished:
+                cache.store(key, files, {name: value.to(constants.ureg.inches).magnitude for name, value in nozzle_results.items()})
+
+        if instrumentation is not None:
+            simulation.add_counts(instrumentation)
+
+        if report:
+            with phase('report'):
+                from libraries.report import render_report
+
+                render_report(name, results_dir, workers=workers, summary_page=summary_page, instrumentation=instrumentation, output_format=output_format)
+
+        save_instrumentation(instrumentation, paths)
+
+    return nozzle_results
+
+
+def save_instrumentation(instrumentation, paths):
+    """Prints the instrumentation summary and saves it, and the raw profile when there is one, next to the results
+    """
+
+    if instrumentation is None:
+        return
+
+    print('\n'.join(instrumentation.lines()))
+
+    with open(paths['instrumentation'], 'w') as f:
+        json.dump(instrumentation.summary(), f, indent=4)
+
+    if instrumentation.profiler is not None:
+        instrumentation.save_profile(paths['profile'])
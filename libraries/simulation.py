@@ -0,0 +1,586 @@
+import math
+
+import numpy as np
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.combustion import Combustion, NumericCombustion, AxialCombustion
+from libraries.oxidiser import Oxidiser, NumericOxidiser, BlowdownOxidiser
+from libraries.nozzle import Nozzle, NumericNozzle
+from libraries.recorder import Recorder
+from libraries.sinks import DiscardSink
+from libraries.thermochemical import Thermochemical
+
+ureg = constants.ureg
+
+# (name, SI units of the numeric engine value, reported units, rounding digits)
+numeric_columns = [
+    ('average total mass flow rate', ureg.kg / ureg.second, ureg.kg / ureg.second, 10),
+    ('average port diameter', ureg.m, ureg.inches, 4),
+    ('average regression rate', ureg.m / ureg.second, ureg.inches / ureg.second, 5),
+    ('average fuel mass flow rate', ureg.kg / ureg.second, ureg.kg / ureg.second, 7),
+    ('oxidiser mass', ureg.kg, ureg.kg, 4),
+    ('oxidiser mass flow rate', ureg.kg / ureg.second, ureg.kg / ureg.second, 10),
+    ('average total mass flux', ureg.kg / ((ureg.m ** 2) * ureg.second), ureg.kg / ((ureg.inches ** 2) * ureg.second), 10),
+    ('oxi fuel ratio', None, None, 4),
+    ('inlet velocity', ureg.m / ureg.second, ureg.mph, 4),
+    ('inlet mach', None, None, 4),
+    ('nozzle throat area', ureg.m ** 2, ureg.inches ** 2, 6),
+    ('nozzle throat diameter', ureg.m, ureg.inches, 6),
+    ('nozzle naught temp', ureg.K, ureg.degF, 10),
+    ('nozzle star temp', ureg.K, ureg.degF, 10),
+    ('nozzle star pressure', ureg.Pa, ureg.psi, 4),
+    ('nozzle star velocity', ureg.m / ureg.second, ureg.mph, 10),
+    ('nozzle star mach', None, None, 4),
+    ('nozzle exit mach', None, None, 4),
+    ('nozzle exit area', ureg.m ** 2, ureg.inches ** 2, 4),
+    ('nozzle exit diameter', ureg.m, ureg.inches, 4),
+    ('nozzle diffuser length', ureg.m, ureg.inches, 4),
+    ('nozzle exit velocity', ureg.m / ureg.second, ureg.mph, 4),
+    ('nozzle thrust', ureg.newton, ureg.newton, 4)
+]
+
+
+# Columns Simulation.summary() reads, all a run records when config.recording is 'summary'
+summary_columns = (
+    'oxi fuel ratio',
+    'nozzle throat diameter',
+    'nozzle exit diameter',
+    'nozzle diffuser length',
+    'nozzle thrust'
+)
+
+# Mass flow solver diagnostics recorded alongside each numeric engine row
+solver_columns = [
+    ('solver iterations', None, None, None),
+    ('solver residual', ureg.kg / ureg.second, ureg.kg / ureg.second, None)
+]
+
+
+def reference_step(combustion, oxidiser, nozzle, time):
+    combustion.solve_for_average_total_mass_flow_rate()
+
+    average_total_mass_flow_rate = combustion.average_total_mass_flow_rate.to_base_units()
+
+    nozzle_state = nozzle.evaluate(average_total_mass_flow_rate)
+
+    time = time * constants.ureg.sec
+
+    row = {
+        'time ({0.units})'.format(time.to_base_units()): time.to_base_units().magnitude,
+        'average total mass flow rate ({0.units})'.format(average_total_mass_flow_rate.to(constants.ureg.kg / constants.ureg.second)):round(average_total_mass_flow_rate.to(constants.ureg.kg / constants.ureg.seconds).magnitude, 10),
+        'average port diameter ({0.units})'.format(combustion.average_port_diameter.to(constants.ureg.inches)): round(combustion.average_port_diameter.to(constants.ureg.inches).magnitude, 4),
+        'average regression rate ({0.units})'.format(combustion.average_regression_rate.to(constants.ureg.inches / constants.ureg.second)): round(combustion.average_regression_rate.to(constants.ureg.inches / constants.ureg.second).magnitude / 100, 5),
+        'average fuel mass flow rate ({0.units})'.format(combustion.average_fuel_mass_flow_rate.to(constants.ureg.kg / constants.ureg.second)): round(combustion.average_fuel_mass_flow_rate.to(constants.ureg.kg / constants.ureg.second).magnitude, 7),
+        'oxidiser mass ({0.units})'.format(oxidiser.mass.to(constants.ureg.kg)): round(oxidiser.mass.to(constants.ureg.kg).magnitude, 4),
+        'oxidiser mass flow rate ({0.units})'.format(oxidiser.mass_flow_rate.to(constants.ureg.kg / constants.ureg.second)): round(oxidiser.mass_flow_rate.to(constants.ureg.kg / constants.ureg.second).magnitude, 10),
+        'average total mass flux ({0.units})'.format(combustion.average_total_mass_flux.to(constants.ureg.kg / ((constants.ureg.inches **2) * constants.ureg.second))): round(combustion.average_total_mass_flux.to(constants.ureg.kg / ((constants.ureg.inches **2) * constants.ureg.second)).magnitude, 10),
+        'oxi fuel ratio': round(combustion.oxi_fuel_ratio_function().to_base_units().magnitude, 4),
+        'inlet velocity ({0.units})'.format(nozzle_state.inlet_velocity.to(constants.ureg.mph)): round(nozzle_state.inlet_velocity.to(constants.ureg.mph).magnitude, 4),
+        'inlet mach': round(nozzle_state.inlet_mach.to_base_units().magnitude, 4),
+        'nozzle throat area ({0.units})'.format(nozzle_state.throat_area.to(constants.ureg.inches ** 2)): round(nozzle_state.throat_area.to(constants.ureg.inches ** 2).magnitude, 6),
+        'nozzle throat diameter ({0.units})'.format(nozzle_state.throat_diameter.to(constants.ureg.inches)): round(nozzle_state.throat_diameter.to(constants.ureg.inches).magnitude, 6),
+        'nozzle naught temp ({0.units})'.format(nozzle_state.naught_temp.to(constants.ureg.degF)): round(nozzle_state.naught_temp.to(constants.ureg.degF).magnitude, 10),
+        'nozzle star temp ({0.units})'.format(nozzle_state.star_temp.to(constants.ureg.degF)): round(nozzle_state.star_temp.to(constants.ureg.degF).magnitude, 10),
+        'nozzle star pressure ({0.units})'.format(nozzle_state.star_pressure.to(constants.ureg.psi)): round(nozzle_state.star_pressure.to(constants.ureg.psi).magnitude, 4),
+        'nozzle star velocity ({0.units})'.format(nozzle_state.star_velocity.to(constants.ureg.mph)): round(nozzle_state.star_velocity.to(constants.ureg.mph).magnitude, 10),
+        'nozzle star mach': round(nozzle_state.star_mach.to_base_units().magnitude, 4),
+        'nozzle exit mach': round(nozzle_state.exit_mach, 4),
+        'nozzle exit area ({0.units})'.format(nozzle_state.exit_area.to(constants.ureg.inches ** 2)): round(nozzle_state.exit_area.to(constants.ureg.inches ** 2).magnitude, 4),
+        'nozzle exit diameter ({0.units})'.format(nozzle_state.exit_diameter.to(constants.ureg.inches)): round(nozzle_state.exit_diameter.to(constants.ureg.inches).magnitude, 4),
+        'nozzle diffuser length ({0.units})'.format(nozzle_state.nozzle_diffuser_length.to(constants.ureg.inches)): round(nozzle_state.nozzle_diffuser_length.to(constants.ureg.inches).magnitude, 4),
+        'nozzle exit velocity ({0.units})'.format(nozzle_state.exit_velocity.to(constants.ureg.mph)): round(nozzle_state.exit_velocity.to(constants.ureg.mph).magnitude, 4),
+        'nozzle thrust ({0.units})'.format(nozzle_state.thrust.to(constants.ureg.newton)): round(nozzle_state.thrust.to(constants.ureg.newton).magnitude, 4)
+    }
+
+    thrust = nozzle_state.thrust.to(constants.ureg.newton).magnitude
+
+    return row, thrust
+
+
+def numeric_step(combustion, oxidiser, nozzle):
+    combustion.solve_for_average_total_mass_flow_rate()
+
+    if not nozzle.expands(combustion.average_total_mass_flow_rate, combustion.oxi_fuel_ratio_function()):
+        # The chamber pressure has fallen to the exit pressure, this is the burnout row
+        combustion.average_total_mass_flow_rate = 0.0
+
+    return numeric_values(combustion, oxidiser, nozzle)
+
+
+def numeric_values(combustion, oxidiser, nozzle):
+    """SI values of the current combustion state in numeric_columns order, without advancing it
+    """
+
+    average_total_mass_flow_rate = combustion.average_total_mass_flow_rate
+    oxi_fuel_ratio = combustion.oxi_fuel_ratio_function()
+
+    values = [
+        average_total_mass_flow_rate,
+        combustion.average_port_diameter,
+        combustion.average_regression_rate / 100,
+        combustion.average_fuel_mass_flow_rate,
+        oxidiser.mass,
+        oxidiser.mass_flow_rate,
+        combustion.average_total_mass_flux,
+        oxi_fuel_ratio
+    ]
+
+    # NozzleState fields are in numeric_columns order
+    values.extend(nozzle.evaluate(average_total_mass_flow_rate, oxi_fuel_ratio))
+
+    return values
+
+
+def suggested_nozzle_dimensions(data):
+    """Suggested nozzle dimensions, averaged over the burn without the final burnout rows
+    """
+
+    return {
+        'nozzle_throat_dia_avg': data['nozzle throat diameter (inch)'].iloc[:-2].mean() * constants.ureg.inches,
+        'nozzle_exit_dia_avg': data['nozzle exit diameter (inch)'].iloc[:-2].mean() * constants.ureg.inches,
+        'nozzle_diffuser_len_avg': data['nozzle diffuser length (inch)'].iloc[:-2].mean() * constants.ureg.inches
+    }
+
+
+class Simulation:
+    """One motor burn, stepped with the numeric engine or, when reference is set, the pint engine
+
+    table interpolates the numeric engine's gas properties from a PropertyTable, mixture is shared
+    across runs so the thermo chemical database is only loaded once. sink streams the numeric engine's
+    rows out in chunks of output_chunk_size during the burn instead of keeping them all for data().
+    """
+
+    def __init__(self, external_temp, config=None, reference=False, table=None, mixture=None, sink=None):
+        self.external_temp = external_temp
+        self.config = MotorConfig() if config is None else config
+        self.reference = reference
+
+        if mixture is None:
+            # thermo is only imported for gas properties read live, not for tabulated or equilibrium ones
+            live = reference or (table is None and self.config.combustion_model == 'frozen')
+
+            mixture = Thermochemical(live=live).get_mixture()
+
+        if reference and sink is not None:
+            raise ValueError('Streaming output needs the numeric engine')
+
+        if reference and self.config.oxidiser_model != 'constant':
+            raise ValueError('The reference engine only models a constant injector mass flow rate')
+
+        if reference and self.config.chamber_pressure_model != 'fixed':
+            raise ValueError('The reference engine only models a fixed chamber pressure')
+
+        if reference and self.config.combustion_model != 'frozen':
+            raise ValueError('The reference engine only models the frozen Thermochemical products')
+
+        if reference and self.config.grain_model != 'lumped':
+            raise ValueError('The reference engine only models a lumped fuel grain')
+
+        if reference:
+            self.oxidiser = Oxidiser(external_temp, self.config)
+            self.combustion = Combustion(self.oxidiser, self.config)
+            self.nozzle = Nozzle(mixture, self.config)
+
+            self.no_flow = 0 * constants.ureg.kg / constants.ureg.sec
+        else:
+            if self.config.oxidiser_model == 'constant':
+                self.oxidiser = NumericOxidiser(external_temp, self.config)
+            elif self.config.oxidiser_model == 'blowdown':
+                self.oxidiser = BlowdownOxidiser(external_temp, self.config, mixture.P)
+            else:
+                raise ValueError('Unknown oxidiser model: {}'.format(self.config.oxidiser_model))
+
+            if self.config.grain_model == 'lumped':
+                self.combustion = NumericCombustion(self.oxidiser, self.config)
+            elif self.config.grain_model == 'axial':
+                self.combustion = AxialCombustion(self.oxidiser, self.config)
+            else:
+                raise ValueError('Unknown grain model: {}'.format(self.config.grain_model))
+
+            self.nozzle = NumericNozzle(mixture, self.config, table=table)
+
+            # A blowdown injector feeds against a chamber pressure rising with its flow, in the ratio of the previous step
+            self.couple_chamber_pressure = (
+                self.config.oxidiser_model == 'blowdown' and self.config.chamber_pressure_model == 'throat'
+            )
+
+            self.no_flow = 0.0
+
+            if self.config.recording == 'all':
+                keep = None
+            elif self.config.recording == 'summary':
+                keep = summary_columns
+            else:
+                raise ValueError('Unknown recording: {}'.format(self.config.recording))
+
+            if sink is None:
+                self.recorder = Recorder(numeric_columns, keep=keep)
+                self.solver_recorder = Recorder(solver_columns)
+            else:
+                self.recorder = Recorder(numeric_columns, keep=keep, capacity=constants.output_chunk_size, sink=sink)
+                self.solver_recorder = Recorder(solver_columns, capacity=constants.output_chunk_size, sink=DiscardSink())
+
+        self.time_step = constants.to_si(self.config.time_step)
+
+        self.time = 0.0
+        self.count = 0
+        self.impulse = 0.0
+
+        # Rows of the reference engine, the numeric engine records into self.recorder
+        self.raw_data = []
+
+        # Rows of each recorder already in the rows files of a checkpoint, by (checkpoint path, recorder), see libraries/checkpoint.py
+        self.checkpointed_rows = {}
+
+    def burning(self):
+        return self.combustion.average_total_mass_flow_rate > self.no_flow
+
+    def step(self):
+        if self.reference:
+            row, thrust = reference_step(self.combustion, self.oxidiser, self.nozzle, self.time)
+
+            self.raw_data.append(row)
+        else:
+            values = numeric_step(self.combustion, self.oxidiser, self.nozzle)
+            thrust = values[-1]
+
+            self.recorder.append(self.time, values)
+            self.solver_recorder.append(self.time, (self.combustion.iterations, self.combustion.residual))
+
+            if self.couple_chamber_pressure and self.oxidiser.mass_flow_rate > 0:
+                self.oxidiser.chamber_pressure_per_flow = self.nozzle.combustion_thermo.P() / self.oxidiser.mass_flow_rate
+
+        self.impulse += thrust * self.time_step
+
+        self.time += self.time_step
+
+        self.count += 1
+
+    def run(self, checkpoint=None, checkpoint_interval=None, until=None):
+        """Steps the burn to its end, or until that many seconds
+
+        With checkpoint, a path, the complete state is saved there every checkpoint_interval steps, by
+        default constants.checkpoint_interval, so a run that fails or is stopped resumes from the last one,
+        see libraries/checkpoint.py.
+        """
+
+        if checkpoint is not None:
+            # Imported here, libraries/checkpoint.py builds simulations itself
+            from libraries.checkpoint import check_checkpointable, save_checkpoint
+
+            check_checkpointable(self)
+
+            if checkpoint_interval is None:
+                checkpoint_interval = constants.checkpoint_interval
+
+        try:
+            while self.burning() and (until is None or self.time < until):
+                self.step()
+
+                if checkpoint is not None and self.count % checkpoint_interval == 0:
+                    save_checkpoint(self, checkpoint)
+        finally:
+            self.close()
+
+        return self
+
+    def instrument(self, instrumentation):
+        """Times the parts of every step as phases of instrumentation, see libraries/instrumentation.py
+        """
+
+        instrumentation.wrap(self.combustion, 'solve_for_average_total_mass_flow_rate', 'burn / mass flow solve')
+        instrumentation.wrap(self.nozzle, 'evaluate', 'burn / nozzle evaluation')
+
+        if self.reference:
+            return
+
+        self.thermos = [
+            thermo for thermo in (self.nozzle.combustion_thermo, self.nozzle.star_thermo, self.nozzle.exit_thermo)
+            if hasattr(thermo, 'state_properties')
+        ]
+
+        for thermo in self.thermos:
+            instrumentation.wrap(thermo, 'state_properties', 'burn / nozzle evaluation / gas properties')
+
+        # Hits and misses of the shared property caches before the burn
+        self.cache_counts = {id(thermo.cache): (thermo.cache.hits, thermo.cache.misses) for thermo in self.thermos if thermo.cache is not None}
+
+        instrumentation.wrap(self.recorder, 'append', 'burn / recording')
+
+        if self.recorder.sink is not None:
+            instrumentation.wrap(self.recorder.sink, 'write', 'burn / output writing')
+
+    def add_counts(self, instrumentation):
+        """Adds the step, solver iteration and property cache counts of the burn so far to instrumentation
+        """
+
+        instrumentation.count('time steps', self.count)
+
+        if self.reference:
+            return
+
+        iterations = int(round(self.solver_recorder.mean('solver iterations') * len(self.solver_recorder))) if self.count else 0
+
+        instrumentation.count('mass flow solver iterations', iterations)
+
+        if self.count:
+            instrumentation.count('mass flow solver iterations per step', iterations / self.count)
+
+        for thermo in self.thermos:
+            if id(thermo.cache) in self.cache_counts and thermo.table is None:
+                hits, misses = self.cache_counts.pop(id(thermo.cache))
+
+                instrumentation.count('property cache hits', thermo.cache.hits - hits)
+                instrumentation.count('property cache misses', thermo.cache.misses - misses)
+
+    def close(self):
+        """Writes the rows still in memory to the output sink, if there is one, and closes it
+        """
+
+        if not self.reference:
+            self.recorder.close()
+            self.solver_recorder.close()
+
+    def data(self):
+        if not self.reference:
+            if self.recorder.streamed():
+                raise ValueError('The rows were streamed to the output sink, read them back from there')
+
+            return self.recorder.frame()
+
+        import pandas as pd
+
+        data = pd.DataFrame(self.raw_data)
+
+        data.set_index(
+            'time (second)',
+            drop=True,
+            inplace=True
+        )
+
+        return data
+
+    def diagnostics(self):
+        """Mass flow solver iterations and residual per time step of the numeric engine, the last rows only when streamed
+        """
+
+        return self.solver_recorder.frame().astype({'solver iterations': int})
+
+    def summary(self, data=None):
+        """Scalar results of the burn so far, one row of a sweep results table
+
+        The numeric engine's columns come from the recorder's running statistics, so they cover
+        streamed rows too.
+        """
+
+        if data is None and not self.reference:
+            rows = len(self.recorder)
+            mean = self.recorder.mean
+            peak = self.recorder.max
+        else:
+            if data is None:
+                data = self.data()
+
+            rows = len(data)
+
+            def mean(header, drop_last=0):
+                return data[header].iloc[:len(data) - drop_last].mean()
+
+            def peak(header):
+                return data[header].max()
+
+        impulse = self.impulse * constants.ureg.newton * constants.ureg.second
+
+        summary = {
+            'burn time (second)': self.time,
+            'impulse (newton * second)': self.impulse,
+            'average thrust (newton)': None,
+            'motor code': None,
+            'nozzle throat diameter (inch)': None,
+            'nozzle exit diameter (inch)': None,
+            'nozzle diffuser length (inch)': None,
+            'peak thrust (newton)': None,
+            'average oxi fuel ratio': None
+        }
+
+        if rows > 0:
+            summary['peak thrust (newton)'] = peak('nozzle thrust (newton)')
+            summary['average oxi fuel ratio'] = mean('oxi fuel ratio')
+
+        if rows > 2:
+            average_thrust = mean('nozzle thrust (newton)')
+
+            summary['average thrust (newton)'] = average_thrust
+            summary['motor code'] = '{}{}'.format(constants.get_motor_code(impulse), int(round(average_thrust)))
+
+            # Averaged without the final burnout rows, like suggested_nozzle_dimensions()
+            for header in ('nozzle throat diameter (inch)', 'nozzle exit diameter (inch)', 'nozzle diffuser length (inch)'):
+                summary[header] = mean(header, drop_last=2)
+
+        return summary
+
+
+class AdaptiveSimulation(Simulation):
+    """Numeric engine burn integrated with adaptive Runge-Kutta (Dormand-Prince RK45) instead of fixed Euler steps
+
+    The ODE state is port diameter, oxidiser mass and impulse. Oxidiser depletion ends the burn and grain
+    burn through raises like the Euler loop, both as terminal events located inside the step. The result
+    is resampled onto the time_step grid so the CSV and plots keep their usual layout.
+    """
+
+    def __init__(self, external_temp, config=None, reference=False, table=None, mixture=None, sink=None):
+        if reference:
+            raise ValueError('The adaptive integrator only runs the numeric engine')
+
+        super().__init__(external_temp, config, table=table, mixture=mixture, sink=sink)
+
+        if self.config.oxidiser_model != 'constant':
+            raise ValueError('The adaptive integrator only models a constant injector mass flow rate')
+
+        if self.config.grain_model != 'lumped':
+            raise ValueError('The adaptive integrator only models a lumped fuel grain')
+
+        self.injector_mass_flow_rate = self.oxidiser.injector_mass_flow_rate
+        self.grain_diameter = self.combustion.grain_diameter
+
+        self.solution = None
+
+    def oxidiser_mass_flow_rate(self, oxidiser_mass):
+        if oxidiser_mass > 0:
+            return self.injector_mass_flow_rate
+
+        return 0.0
+
+    def set_state(self, port_diameter, oxidiser_mass, oxi_mass_flow_rate):
+        """Moves combustion and oxidiser to a point of the ODE solution and solves its total mass flow rate
+        """
+
+        # Plain floats keep the numeric engine's ZeroDivisionError handling for the burnout row
+        self.combustion.average_port_diameter = float(port_diameter)
+
+        self.oxidiser.mass = float(oxidiser_mass)
+        self.oxidiser.mass_flow_rate = oxi_mass_flow_rate
+
+        return self.combustion.solve_total_mass_flow_rate(oxi_mass_flow_rate)
+
+    def derivatives(self, time, state):
+        """d(port_diameter)/dt = 2 * average_regression_rate / 100, d(oxidiser_mass)/dt = -oxi_mass_flow_rate, d(impulse)/dt = thrust
+
+        The / 100 matches the port diameter update of the Euler loop. The injector keeps flowing past an
+        empty tank so the right-hand side stays smooth across the step that the depletion event ends the burn in.
+        """
+
+        port_diameter, oxidiser_mass, _ = state
+
+        total_mass_flow_rate = self.set_state(port_diameter, oxidiser_mass, self.injector_mass_flow_rate)
+
+        return [
+            2 * self.combustion.average_regression_rate / 100,
+            -self.oxidiser.mass_flow_rate,
+            self.nozzle.evaluate(total_mass_flow_rate, self.combustion.oxi_fuel_ratio_function()).thrust
+        ]
+
+    def oxidiser_depleted(self, time, state):
+        return state[1]
+
+    oxidiser_depleted.terminal = True
+    oxidiser_depleted.direction = -1
+
+    def burn_through(self, time, state):
+        return state[0] - self.grain_diameter
+
+    burn_through.terminal = True
+    burn_through.direction = 1
+
+    def run(self, checkpoint=None, checkpoint_interval=None, until=None):
+        if checkpoint is not None or until is not None:
+            raise ValueError('The adaptive integrator always runs the whole burn, it cannot be checkpointed or stopped early')
+
+        try:
+            return self.integrate()
+        finally:
+            self.close()
+
+    def integrate(self):
+        # Imported here, scipy.integrate is slow to import and only the adaptive integrator needs it
+        from scipy.integrate import solve_ivp
+
+        initial_state = [self.combustion.average_port_diameter, self.oxidiser.initial_mass, 0.0]
+
+        # Upper bound on the burn, the depletion event ends it well before
+        end_time = 2 * self.oxidiser.initial_mass / self.injector_mass_flow_rate + self.time_step
+
+        self.solution = solve_ivp(
+            self.derivatives,
+            (0.0, end_time),
+            initial_state,
+            method='RK45',
+            rtol=self.config.integrator_relative_tolerance,
+            atol=self.config.integrator_absolute_tolerance,
+            events=[self.oxidiser_depleted, self.burn_through],
+            dense_output=True
+        )
+
+        if not self.solution.success:
+            raise ValueError('Burn integration failed: {}'.format(self.solution.message))
+
+        self.time = self.solution.t[-1]
+        self.impulse = self.solution.y[2, -1]
+
+        burned_through = len(self.solution.t_events[1]) > 0
+
+        self.resample(burned_through)
+
+        if burned_through:
+            print('Motor burn through! Fuel grain too thin!')
+            raise ValueError('Motor burn through! Fuel grain too thin!')
+
+        return self
+
+    def resample(self, burned_through):
+        """Output rows on the uniform time_step grid, plus the burnout row at the end of the burn
+        """
+
+        times = self.time_step * np.arange(int(math.floor(self.time / self.time_step)) + 1)
+
+        if not burned_through and times[-1] < self.time:
+            times = np.append(times, self.time)
+
+        states = self.solution.sol(times)
+
+        # The events land on the boundary, pin it so the burnout row has no flow and burn through has no row
+        if not burned_through:
+            states[1, -1] = 0.0
+        elif times[-1] >= self.time:
+            times = times[:-1]
+            states = states[:, :-1]
+
+        for time, (port_diameter, oxidiser_mass, _) in zip(times, states.T):
+            self.set_state(port_diameter, oxidiser_mass, self.oxidiser_mass_flow_rate(oxidiser_mass))
+
+            self.recorder.append(time, numeric_values(self.combustion, self.oxidiser, self.nozzle))
+            self.solver_recorder.append(time, (self.combustion.iterations, self.combustion.residual))
+
+        self.count = len(self.recorder)
+
+    def integration_steps(self):
+        """Accepted integrator step sizes, to check how the step adapts through the burn
+        """
+
+        import pandas as pd
+
+        return pd.Series(np.diff(self.solution.t), index=pd.Index(self.solution.t[:-1], name='time (second)'), name='step size (second)')
+
+
+def create_simulation(external_temp, config=None, reference=False, table=None, mixture=None, sink=None):
+    """Simulation for config.integrator, Euler stepping or the adaptive RK45 integrator
+    """
+
+    config = MotorConfig() if config is None else config
+
+    if config.integrator == 'rk45':
+        return AdaptiveSimulation(external_temp, config, reference=reference, table=table, mixture=mixture, sink=sink)
+
+    return Simulation(external_temp, config, reference=reference, table=table, mixture=mixture, sink=sink)
@@ -0,0 +1,200 @@
+import os
+
+# File extension of every output format
+output_formats = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'hdf5': '.h5'
+}
+
+
+class CsvSink:
+    """Appends time series chunks to one CSV file, the header is written with the first chunk
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        make_parent(path)
+
+        self.file = open(path, 'w', newline='')
+        self.rows = 0
+
+    def write(self, frame):
+        frame.to_csv(self.file, header=self.rows == 0)
+
+        self.file.flush()
+
+        self.rows += len(frame)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class ParquetSink:
+    """Appends time series chunks to one Parquet file as row groups, needs pyarrow
+    """
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError('Parquet output needs pyarrow installed')
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+
+        self.path = path
+
+        make_parent(path)
+
+        self.writer = None
+        self.rows = 0
+
+    def write(self, frame):
+        table = self.pyarrow.Table.from_pandas(frame, preserve_index=True)
+
+        # The schema comes from the first chunk, so the file is opened on the first write
+        if self.writer is None:
+            self.writer = self.parquet.ParquetWriter(self.path, table.schema)
+
+        self.writer.write_table(table)
+
+        self.rows += len(frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class Hdf5Sink:
+    """Appends time series chunks to one table of an HDF5 file through pandas, needs PyTables
+    """
+
+    def __init__(self, path, key='data'):
+        try:
+            import tables
+        except ImportError:
+            raise ValueError('HDF5 output needs PyTables (tables) installed')
+
+        import pandas as pd
+
+        self.path = path
+        self.key = key
+
+        make_parent(path)
+
+        self.store = pd.HDFStore(path, mode='w')
+        self.rows = 0
+
+    def write(self, frame):
+        self.store.append(self.key, frame, format='table', index=False)
+
+        self.store.flush()
+
+        self.rows += len(frame)
+
+    def close(self):
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class DiscardSink:
+    """Drops every chunk, for a streamed recorder whose rows are only needed while in memory
+    """
+
+    rows = 0
+
+    def write(self, frame):
+        self.rows += len(frame)
+
+    def close(self):
+        pass
+
+
+def make_parent(path):
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def create_sink(path, output_format='csv'):
+    if output_format == 'csv':
+        return CsvSink(path)
+
+    if output_format == 'parquet':
+        return ParquetSink(path)
+
+    if output_format == 'hdf5':
+        return Hdf5Sink(path)
+
+    raise ValueError('Unknown output format: {}'.format(output_format))
+
+
+def partition_path(root, parameters, output_format='csv'):
+    """root/name=value/.../data.<ext>, one hive style partition of a sweep dataset per set of parameter magnitudes
+
+    Parquet partitions read back as one dataset with pyarrow.dataset.dataset(root, partitioning='hive').
+    """
+
+    directories = ['{}={}'.format(name, str(parameters[name]).replace(os.sep, '_')) for name in sorted(parameters)]
+
+    return os.path.join(root, *directories, 'data' + output_formats[output_format])
+
+
+def read_dataset(root, output_format='csv'):
+    """Every partition under root in one DataFrame, with the partition keys as columns
+    """
+
+    import pandas as pd
+
+    extension = output_formats[output_format]
+    frames = []
+
+    for directory, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            if not name.endswith(extension):
+                continue
+
+            path = os.path.join(directory, name)
+
+            if output_format == 'csv':
+                frame = pd.read_csv(path)
+            elif output_format == 'parquet':
+                frame = pd.read_parquet(path).reset_index()
+            else:
+                frame = pd.read_hdf(path).reset_index()
+
+            keys = os.path.relpath(directory, root).split(os.sep)
+
+            for key in keys:
+                if '=' in key:
+                    name, value = key.split('=', 1)
+
+                    try:
+                        frame[name] = float(value)
+                    except ValueError:
+                        frame[name] = value
+
+            frames.append(frame)
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
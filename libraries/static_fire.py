@@ -0,0 +1,452 @@
+import os
+import json
+import itertools
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import libraries.constants as constants
+
+from libraries import sweep
+from libraries.config import MotorConfig, parameter_names
+from libraries.property_table import PropertyTable
+from libraries.simulation import create_simulation
+from libraries.thermochemical import Thermochemical
+
+# Coefficients of the regression law, average_regression_rate = a * G ** n * L ** m, and the injector flow
+fitted_parameters = ('a', 'n', 'm', 'injector_mass_flow_rate')
+
+# Search bounds of the fitted parameters, in the units of each default in libraries/constants.py
+fit_bounds = {
+    'a': (0.005, 0.5),
+    'n': (0.3, 0.9),
+    'm': (-0.5, 0.0),
+    'injector_mass_flow_rate': (0.005, 0.2)
+}
+
+
+class BinnedMeans:
+    """Means of channels of samples over consecutive time bins of period, accumulated a chunk at a time
+    """
+
+    def __init__(self, channels, period):
+        self.period = period
+        self.start = None
+
+        self.counts = np.zeros(0)
+        self.sums = np.zeros((channels, 0))
+
+    def add(self, times, values):
+        """times (samples,) and values (channels, samples) of one chunk, samples with a NaN are skipped
+        """
+
+        keep = np.isfinite(times) & np.isfinite(values).all(axis=0)
+        times = times[keep]
+        values = values[:, keep]
+
+        if len(times) == 0:
+            return
+
+        if self.start is None:
+            self.start = times[0]
+
+        bins = np.floor((times - self.start) / self.period).astype(np.int64)
+
+        keep = bins >= 0
+        bins = bins[keep]
+        values = values[:, keep]
+
+        size = max(bins.max() + 1, len(self.counts)) if len(bins) else len(self.counts)
+
+        if size > len(self.counts):
+            self.counts = np.pad(self.counts, (0, size - len(self.counts)))
+            self.sums = np.pad(self.sums, ((0, 0), (0, size - self.sums.shape[1])))
+
+        self.counts += np.bincount(bins, minlength=size)
+
+        for k in range(len(self.sums)):
+            self.sums[k] += np.bincount(bins, weights=values[k], minlength=size)
+
+    def means(self):
+        """Bin centre times and the channel means of the bins holding any samples
+        """
+
+        filled = self.counts > 0
+
+        times = self.start + (np.flatnonzero(filled) + 0.5) * self.period
+
+        return times, self.sums[:, filled] / self.counts[filled]
+
+
+def read_chunks(path, columns, chunk_size):
+    """(samples, len(columns)) arrays of a log, chunk_size samples at a time
+
+    A CSV is memory mapped and parsed a chunk at a time, columns are its headers. A .npy array of samples by
+    channels is memory mapped and sliced, columns are channel indices.
+    """
+
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.npy':
+        samples = np.load(path, mmap_mode='r')
+
+        for start in range(0, len(samples), chunk_size):
+            yield np.asarray(samples[start:start + chunk_size, columns], dtype=float)
+    elif extension in ('.csv', '.txt'):
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size, memory_map=True):
+            yield chunk[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    else:
+        raise ValueError('Unknown test log format: {}, use .csv or .npy'.format(path))
+
+
+def low_pass(values, sample_rate, cutoff, order=4):
+    """Zero phase Butterworth low pass filter of each row of values
+    """
+
+    from scipy.signal import butter, sosfiltfilt
+
+    if cutoff is None or cutoff >= sample_rate / 2:
+        return values
+
+    sos = butter(order, cutoff, fs=sample_rate, output='sos')
+
+    # sosfiltfilt pads with 3 * (2 * sections + 1) samples each side
+    if values.shape[1] <= 3 * (2 * len(sos) + 1):
+        return values
+
+    return sosfiltfilt(sos, values, axis=1)
+
+
+class TestBurn:
+    """A static fire thrust curve, and chamber pressure if it was logged, from ignition, in SI units
+
+    external_temp is the oxidiser temperature of the test, parameters its MotorConfig parameters that are
+    known, e.g. the grain it burned.
+    """
+
+    def __init__(self, name, time, thrust, external_temp, pressure=None, parameters=None):
+        self.name = name
+        self.time = time
+        self.thrust = thrust
+        self.pressure = pressure
+
+        self.external_temp = external_temp
+        self.parameters = {} if parameters is None else dict(parameters)
+
+    def impulse(self):
+        """impulse = integral of thrust dt
+        """
+
+        return np.trapz(self.thrust, self.time)
+
+    def frame(self):
+        data = {'thrust (newton)': self.thrust}
+
+        if self.pressure is not None:
+            data['pressure (pascal)'] = self.pressure
+
+        return pd.DataFrame(data, index=pd.Index(self.time, name='time (second)'))
+
+
+def load_test_burn(path, external_temp, parameters=None, name=None, time_column='time (second)', thrust_column='thrust (newton)', pressure_column=None, time_units='second', thrust_units='newton', pressure_units='psi', sample_rate=50.0, cutoff=10.0, ignition_fraction=0.05, tail=2.0, chunk_size=1000000):
+    """TestBurn of a static fire log, read chunk_size samples at a time so the log never has to fit in memory
+
+    The samples are averaged down to sample_rate, in Hz, low pass filtered at cutoff and the thrust is
+    zeroed on its median before ignition. Ignition and burnout are where thrust crosses ignition_fraction of
+    its peak, the burn is kept from ignition to tail seconds past burnout. The simulated burn starts at full
+    flow, so time 0 is where thrust first reaches half its peak, the middle of the ignition transient.
+    """
+
+    columns = [column for column in (time_column, thrust_column, pressure_column) if column is not None]
+
+    # Logged units to SI, si = value * scale + offset
+    conversions = [
+        constants.si_conversion(units, constants.ureg.Quantity(1, units).to_base_units().units)
+        for units in [time_units, thrust_units] + ([pressure_units] if pressure_column is not None else [])
+    ]
+
+    binned = BinnedMeans(len(columns) - 1, 1 / sample_rate)
+
+    for chunk in read_chunks(path, columns, chunk_size):
+        values = chunk.T * np.array([scale for scale, _ in conversions])[:, np.newaxis]
+        values += np.array([offset for _, offset in conversions])[:, np.newaxis]
+
+        binned.add(values[0], values[1:])
+
+    if binned.start is None:
+        raise ValueError('No samples in {}'.format(path))
+
+    time, channels = binned.means()
+    channels = low_pass(channels, sample_rate, cutoff)
+
+    thrust = channels[0]
+
+    # Load cell offset, the median before thrust first rises
+    first = np.argmax(thrust > ignition_fraction * thrust.max())
+
+    if first > 0:
+        thrust = thrust - np.median(thrust[:first])
+
+    burning = np.flatnonzero(thrust > ignition_fraction * thrust.max())
+
+    if len(burning) == 0:
+        raise ValueError('No burn in {}'.format(path))
+
+    ignition, burnout = burning[0], burning[-1]
+    start = np.argmax(thrust > 0.5 * thrust.max())
+
+    kept = slice(ignition, min(len(time), burnout + 1 + int(round(tail * sample_rate))))
+
+    return TestBurn(
+        name if name is not None else os.path.splitext(os.path.basename(path))[0],
+        time[kept] - time[start],
+        thrust[kept],
+        external_temp,
+        pressure=channels[1][kept] if pressure_column is not None else None,
+        parameters=parameters
+    )
+
+
+def simulated_thrust(burn, parameters):
+    """Thrust of the numeric engine at the times of burn, 0 before it starts and once it is over
+
+    Runs on the mixture and property table sweep.warm_up() loaded into this process, recording only the
+    summary columns. A burn through ends the thrust where the grain burned through.
+    """
+
+    values = dict({'recording': 'summary'}, **burn.parameters)
+    values.update(parameters)
+
+    simulation = create_simulation(burn.external_temp, MotorConfig(**values), table=sweep.worker_table, mixture=sweep.worker_mixture)
+
+    try:
+        simulation.run()
+    except ValueError:
+        pass
+
+    if len(simulation.recorder) == 0:
+        return np.zeros_like(burn.time)
+
+    times = simulation.recorder.times[:simulation.recorder.count]
+
+    return np.interp(burn.time, times, simulation.recorder.column('nozzle thrust (newton)'), left=0.0, right=0.0)
+
+
+def unpack(x, layout, lows, highs, burns):
+    """[{parameter: value}] for each of burns burns of a point x in [0, 1] per fitted value
+
+    layout holds (parameter, burn index) per fitted value, a burn index of None shares it across burns.
+    """
+
+    values = lows + np.clip(x, 0, 1) * (highs - lows)
+
+    parameters = [{} for _ in range(burns)]
+
+    for (name, index), value in zip(layout, values):
+        for burn in (range(burns) if index is None else [index]):
+            parameters[burn][name] = float(value)
+
+    return parameters
+
+
+def residuals(x, burns, layout, lows, highs):
+    """Simulated minus measured thrust of every burn, over its peak thrust and the root of its length, so each burn weighs the same
+    """
+
+    parameters = unpack(x, layout, lows, highs, len(burns))
+
+    return np.concatenate([
+        (simulated_thrust(burn, values) - burn.thrust) / (burn.thrust.max() * np.sqrt(len(burn.thrust)))
+        for burn, values in zip(burns, parameters)
+    ])
+
+
+def run_restart(x0, burns, layout, lows, highs, diff_step, max_evaluations):
+    """One bounded least squares fit from x0, in a process warmed up by sweep.warm_up()
+    """
+
+    from scipy.optimize import least_squares
+
+    result = least_squares(
+        residuals,
+        x0,
+        bounds=(0.0, 1.0),
+        diff_step=diff_step,
+        max_nfev=max_evaluations,
+        args=(burns, layout, lows, highs)
+    )
+
+    return result.x, result.cost, result.nfev, result.message
+
+
+class FitResult:
+    """Fitted MotorConfig parameters of each test burn, and how every restart of the fit ended
+    """
+
+    def __init__(self, burns, parameters, cost, restarts, tabulated):
+        self.burns = burns
+        self.parameters = parameters
+        self.cost = cost
+        self.restarts = restarts
+        self.tabulated = tabulated
+
+    def rms_error(self):
+        """{burn name: root mean square thrust error in N} of the fitted parameters, needs a warmed up process
+        """
+
+        return {
+            burn.name: float(np.sqrt(np.mean((simulated_thrust(burn, parameters) - burn.thrust) ** 2)))
+            for burn, parameters in zip(self.burns, self.parameters)
+        }
+
+    def motor_definition(self, index):
+        """Job settings of a burn with its fitted parameters, the motor definition python simulate_motor.py runs
+        """
+
+        burn = self.burns[index]
+        temperature = burn.external_temp.to(constants.ureg.degF)
+
+        parameters = dict(burn.parameters, **self.parameters[index])
+        values = MotorConfig(**parameters).plain_values()
+
+        return {
+            'name': burn.name,
+            'external_temp': '{} degF'.format(round(temperature.magnitude, 6)),
+            'tabulated': self.tabulated,
+            'parameters': {name: values[name] for name in parameters}
+        }
+
+    def write(self, directory):
+        """Writes each burn's motor definition as directory/<name>.json, returns their paths
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        paths = []
+
+        for index, burn in enumerate(self.burns):
+            path = os.path.join(directory, '{}.json'.format(burn.name))
+
+            with open(path, 'w') as f:
+                json.dump(self.motor_definition(index), f, indent=4)
+
+            paths.append(path)
+
+        return paths
+
+
+def fit_test_burns(burns, shared=('a', 'n', 'm'), individual=('injector_mass_flow_rate',), bounds=None, restarts=4, workers=None, tabulated=True, seed=0, diff_step=1e-2, max_evaluations=200):
+    """Least squares fit of MotorConfig parameters to the thrust curves of test burns, from restarts starting points in parallel
+
+    shared parameters, by default the regression law coefficients, take one value across all the burns,
+    individual ones, by default the injector flow, one value per burn. bounds, {parameter: (low, high)} in
+    the units of each default, overrides fit_bounds. The first restart starts from each burn's parameters
+    or the libraries/constants.py defaults, the rest from random points within the bounds. Every objective
+    evaluation runs the numeric engine recording only the summary columns, from the property table unless
+    tabulated is off. diff_step, a fraction of each range, is kept well above a time step's worth of burn
+    time so the finite difference Jacobian sees through the burnout moving in whole time steps.
+    """
+
+    burns = list(burns)
+
+    unknown = (set(shared) | set(individual)) - set(parameter_names)
+
+    if unknown:
+        raise ValueError('Unknown motor parameters: {}'.format(', '.join(sorted(unknown))))
+
+    both = set(shared) & set(individual)
+
+    if both:
+        raise ValueError('Parameters both shared and individual: {}'.format(', '.join(sorted(both))))
+
+    bounds = dict(fit_bounds, **({} if bounds is None else bounds))
+
+    missing = (set(shared) | set(individual)) - set(bounds)
+
+    if missing:
+        raise ValueError('Fitted parameters need bounds: {}'.format(', '.join(sorted(missing))))
+
+    layout = [(name, None) for name in shared] + [(name, i) for i in range(len(burns)) for name in individual]
+
+    lows = np.array([bounds[name][0] for name, _ in layout], dtype=float)
+    highs = np.array([bounds[name][1] for name, _ in layout], dtype=float)
+
+    # Each burn's known parameters, or the defaults, in the units of the defaults
+    starts = [MotorConfig(**burns[0 if index is None else index].parameters).plain_values()[name] for name, index in layout]
+
+    rng = np.random.default_rng(seed)
+
+    x0s = [np.clip((np.array(starts, dtype=float) - lows) / (highs - lows), 0, 1)]
+    x0s += [rng.uniform(0, 1, len(layout)) for _ in range(restarts - 1)]
+
+    if tabulated:
+        # Built once here so the workers never race to write the table file
+        PropertyTable.load_or_build(Thermochemical(live=False).get_mixture())
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    workers = min(workers, len(x0s))
+
+    arguments = (
+        x0s,
+        itertools.repeat(burns),
+        itertools.repeat(layout),
+        itertools.repeat(lows),
+        itertools.repeat(highs),
+        itertools.repeat(diff_step),
+        itertools.repeat(max_evaluations)
+    )
+
+    if workers <= 1:
+        sweep.warm_up(tabulated, burns[0].external_temp)
+
+        results = list(map(run_restart, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=sweep.warm_up, initargs=(tabulated, burns[0].external_temp)) as executor:
+            results = list(executor.map(run_restart, *arguments))
+
+    rows = []
+
+    for i, (x, cost, evaluations, message) in enumerate(results):
+        row = {'restart': i, 'cost': cost, 'evaluations': evaluations, 'message': message}
+        row.update({name if index is None else '{} ({})'.format(name, burns[index].name): value for (name, index), value in zip(layout, lows + x * (highs - lows))})
+
+        rows.append(row)
+
+    restarts = pd.DataFrame(rows).sort_values('cost', ignore_index=True)
+
+    best = min(results, key=lambda result: result[1])
+
+    return FitResult(burns, unpack(best[0], layout, lows, highs, len(burns)), best[1], restarts, tabulated)
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    # A synthetic 2 kHz log of a burn with known coefficients and injector flow, a load cell offset, noise and
+    # a second of waiting before ignition, then fitted from the defaults of libraries/constants.py
+    external_temp = constants.ureg.Quantity(70, constants.ureg.degF)
+    truth = {'a': 0.06, 'n': 0.6, 'm': -0.2, 'injector_mass_flow_rate': 0.03}
+
+    sweep.warm_up(True, external_temp)
+
+    rng = np.random.default_rng(0)
+    time = np.arange(0, 16, 1 / 2000)
+    thrust = simulated_thrust(TestBurn('truth', time - 1, time, external_temp), truth)
+    thrust[time < 1] = 0
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'synthetic_test.csv')
+
+    pd.DataFrame({'time (second)': time, 'thrust (newton)': thrust + 3 + rng.normal(0, 2, len(time))}).to_csv(path, index=False)
+
+    burn = load_test_burn(path, external_temp, chunk_size=100000)
+    result = fit_test_burns([burn], shared=('a', 'n'), restarts=2)
+
+    print(result.restarts.to_string())
+    print('True: {}'.format(truth))
+    print('Fitted: {}, thrust rms error {}'.format(result.parameters[0], result.rms_error()))
+    print('Motor definitions: {}'.format(result.write(directory)))
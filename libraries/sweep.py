@@ -0,0 +1,259 @@
+import os
+import json
+import hashlib
+import itertools
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.oxidiser import Oxidiser
+from libraries.property_table import PropertyTable
+from libraries.sinks import create_sink, partition_path
+from libraries.simulation import create_simulation
+from libraries.thermochemical import Thermochemical
+from libraries.vectorized import VectorizedSimulation
+
+# Per-process state set up once by warm_up(), shared by every case the worker runs
+worker_mixture = None
+worker_table = None
+
+
+def parameter_grid(**values):
+    """[{name: value}] for every combination of the given lists of parameter values
+    """
+
+    names = list(values)
+
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def warm_up(tabulated, external_temp):
+    """Process pool initializer, loads the mixture, the pint registry and the property table once
+
+    thermo is only imported when the gas properties are read live, not when they are tabulated.
+    """
+
+    global worker_mixture, worker_table
+
+    worker_mixture = Thermochemical(live=not tabulated).get_mixture()
+
+    if tabulated:
+        worker_table = PropertyTable.load_or_build(worker_mixture)
+    else:
+        worker_table = None
+
+    Oxidiser.n2o_density(external_temp)
+
+
+def case_key(parameters, external_temp):
+    """Stable text key of a design at an external temperature, for progress files and checkpoint names
+    """
+
+    return json.dumps({'parameters': parameters, 'external temp': str(external_temp)}, sort_keys=True, default=str)
+
+
+def json_value(value):
+    """NumPy scalars of a results row as plain values, anything else as text, for json.dumps(default=)
+    """
+
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def run_case(parameters, external_temp, output=None, output_format='csv', checkpoints=None):
+    """Runs one design, returns its row of the sweep results table
+
+    With an output directory the time series is streamed into the design's partition of the dataset there.
+    With a checkpoints directory the run is checkpointed there and resumes from its checkpoint if an earlier
+    sweep was stopped during it, the checkpoint is removed once the burn finishes.
+    """
+
+    if output is None:
+        # Only the scalar summary is kept, so only its columns are recorded unless asked otherwise
+        config = MotorConfig(**dict({'recording': 'summary'}, **parameters))
+        sink = None
+    else:
+        config = MotorConfig(**parameters)
+        keys = dict(zip(parameters, config.magnitudes(list(parameters)).values()))
+        sink = create_sink(partition_path(output, keys, output_format), output_format)
+
+    simulation = None
+    checkpoint = None
+
+    if checkpoints is not None:
+        # Imported here, libraries/checkpoint.py runs its branches with this module's workers
+        from libraries.checkpoint import resume, remove_checkpoint
+
+        checkpoint = os.path.join(checkpoints, hashlib.sha256(case_key(parameters, external_temp).encode()).hexdigest()[:16] + '.npz')
+
+        if os.path.exists(checkpoint):
+            try:
+                simulation = resume(checkpoint, table=worker_table, mixture=worker_mixture)
+            except ValueError:
+                # Saved by another version of the model, start over
+                simulation = None
+
+    if simulation is None:
+        simulation = create_simulation(external_temp, config, table=worker_table, mixture=worker_mixture, sink=sink)
+
+    try:
+        simulation.run(checkpoint=checkpoint)
+        error = None
+    except Exception as e:
+        error = str(e)
+
+    # A failed burn keeps its last checkpoint to replay or branch from
+    if checkpoint is not None and error is None:
+        remove_checkpoint(checkpoint)
+
+    row = config.magnitudes(list(parameters))
+    row.update(simulation.summary())
+    row['error'] = error
+
+    return row
+
+
+def load_progress(path):
+    """{case_key(): results row} of the designs a stopped sweep finished, from its progress file
+    """
+
+    rows = {}
+
+    if not os.path.exists(path):
+        return rows
+
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The last line of a sweep killed while writing it
+                continue
+
+            rows[record['key']] = record['row']
+
+    return rows
+
+
+def run_batch(parameter_sets, external_temp, output=None, output_format='csv', checkpoints=None):
+    """Runs a chunk of designs in lockstep with VectorizedSimulation, returns their rows of the sweep results table
+
+    output, output_format and checkpoints keep the run_case() signature, sweep() rejects them for vectorized batches.
+    """
+
+    configs = [MotorConfig(**parameters) for parameters in parameter_sets]
+
+    summary = VectorizedSimulation(configs, external_temp, table=worker_table, mixture=worker_mixture).run().summary()
+
+    rows = []
+
+    for config, parameters, results in zip(configs, parameter_sets, summary.to_dict('records')):
+        row = config.magnitudes(list(parameters))
+        row.update(results)
+
+        rows.append(row)
+
+    return rows
+
+
+def sweep(parameter_sets, external_temp, workers=None, tabulated=False, vectorized=False, output=None, output_format='csv', progress=None, checkpoints=None):
+    """Runs every parameter set as its own motor design across a process pool, one results row per design
+
+    parameter_sets is a list of {MotorConfig parameter: value} dicts, e.g. from parameter_grid(). A design
+    that fails, for example on burn through, keeps its partial results and the error message.
+
+    vectorized splits the designs into one lockstep VectorizedSimulation batch per worker instead of
+    running them one by one, the star state gas properties then always come from the property table.
+
+    output is a directory each design streams its time series into, as one partition of a dataset keyed
+    by its parameters (see libraries/sinks.py read_dataset()).
+
+    progress is a JSON lines file every finished design's row is appended to as it comes back, a sweep
+    run again with it skips the designs already there. checkpoints is a directory each design is
+    checkpointed in while it runs, so a stopped sweep picks its designs up where they were, see run_case().
+    """
+
+    parameter_sets = list(parameter_sets)
+
+    if vectorized and output is not None:
+        raise ValueError('Vectorized sweeps only keep scalar summaries, they have no time series to write')
+
+    if checkpoints is not None and (vectorized or output is not None):
+        raise ValueError('Only designs run one by one in memory can be checkpointed, not vectorized or streamed ones')
+
+    # Fail on a misspelt parameter before starting any workers
+    for parameters in parameter_sets:
+        MotorConfig(**parameters)
+
+    keys = [case_key(parameters, external_temp) for parameters in parameter_sets]
+
+    finished = {} if progress is None else load_progress(progress)
+
+    pending = list({key: parameters for key, parameters in zip(keys, parameter_sets) if key not in finished}.values())
+
+    tabulated = tabulated or vectorized
+
+    if tabulated and pending:
+        # Built once here so the workers never race to write the table file
+        PropertyTable.load_or_build(Thermochemical(live=False).get_mixture())
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    if vectorized:
+        batch_size = max(1, -(-len(pending) // workers))
+
+        tasks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        task = run_batch
+    else:
+        tasks = pending
+        task = run_case
+
+    log = None if progress is None else open(progress, 'a')
+
+    def record(parameters, result):
+        for parameters, row in (zip(parameters, result) if vectorized else [(parameters, result)]):
+            key = case_key(parameters, external_temp)
+
+            finished[key] = row
+
+            if log is not None:
+                log.write(json.dumps({'key': key, 'row': row}, default=json_value) + '\n')
+                log.flush()
+
+    try:
+        if workers == 1 or not tasks:
+            warm_up(tabulated, external_temp)
+
+            for parameters in tasks:
+                record(parameters, task(parameters, external_temp, output, output_format, checkpoints))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(tabulated, external_temp)) as executor:
+                futures = {
+                    executor.submit(task, parameters, external_temp, output, output_format, checkpoints): parameters
+                    for parameters in tasks
+                }
+
+                # Recorded as they finish, so a stopped sweep loses only the designs still running
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+    finally:
+        if log is not None:
+            log.close()
+
+    return pd.DataFrame([finished[key] for key in keys])
+
+
+if __name__ == '__main__':
+    results = sweep(
+        parameter_grid(
+            grain_diameter=[1.75, 2.0],
+            injector_mass_flow_rate=[0.0274, 0.042, 0.068]
+        ),
+        external_temp=constants.ureg.Quantity(70, constants.ureg.degF)
+    )
+
+    print(results.to_string())
@@ -1,9 +1,57 @@
-from thermo.mixture import Mixture
+# Frozen combustion products, N2, H2O and CO2 by name and CAS number, their mole fractions and the chamber T and P
+product_species = ['n2', 'h2o', 'co2']
+product_CASs = ['7727-37-9', '7732-18-5', '124-38-9']
+product_mole_fractions = [.599, .224, .178]
+chamber_temperature = 3000
+chamber_pressure = 3447000
+
+
+class MixtureState:
+    """Composition, T and P of a mixture without thermo, all a Mixture is read for when its gas properties are tabulated
+    """
+
+    def __init__(self, CASs, zs, T, P):
+        self.CASs = list(CASs)
+
+        # Normalised as thermo normalises a Mixture's mole fractions
+        total = sum(zs)
+        self.zs = [z / total for z in zs]
+
+        self.T = T
+        self.P = P
+
+    def live(self):
+        """A thermo Mixture at this state
+        """
+
+        return live_mixture(self.CASs, self.zs, self.T, self.P)
+
+
+def live_mixture(species, zs, T, P):
+    # Imported here, thermo alone takes most of a short run's start up
+    from thermo.mixture import Mixture
+
+    mixture = Mixture(species, zs=zs, T=T, P=P)
+
+    # thermo only selects the SIMPLE gas volume method for the first Mixture made in a process, pin it so
+    # every run (and every sweep worker) sees the same density as a single standalone run
+    mixture.VolumeGasMixture.method = 'SIMPLE'
+
+    return mixture
 
 
 class Thermochemical:
-    def __init__(self):
-        self.mixture = Mixture(['n2', 'h2o', 'co2'], zs=[.599, .224, .178], T=3000, P=3447000)
+    """The frozen combustion products, a thermo Mixture unless live is off
+
+    Without live, get_mixture() is a MixtureState and thermo is never imported, enough for runs whose gas
+    properties come from a PropertyTable or the equilibrium chemistry table.
+    """
+
+    def __init__(self, live=True):
+        if live:
+            self.mixture = live_mixture(product_species, product_mole_fractions, chamber_temperature, chamber_pressure)
+        else:
+            self.mixture = MixtureState(product_CASs, product_mole_fractions, chamber_temperature, chamber_pressure)
 
     def get_mixture(self):
         return self.mixture
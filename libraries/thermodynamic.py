@@ -1,29 +1,189 @@
 import math
 
+from collections import OrderedDict
+
 import libraries.constants as constants
 
+from libraries.compound import universal_gas_constant
+
+
+class PropertyCache:
+    """Bounded LRU cache of frozen-composition gas properties keyed on (composition, T, P)
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, composition, mixture):
+        key = (composition, mixture.T, mixture.P)
+
+        try:
+            properties = self.entries[key]
+        except KeyError:
+            self.misses += 1
+
+            properties = (mixture.Cpg, mixture.Cvg, mixture.rhog, mixture.R_specific)
+
+            self.entries[key] = properties
+
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+
+            self.entries.move_to_end(key)
+
+        return properties
+
+    def clear(self):
+        self.entries.clear()
+
+        self.hits = 0
+        self.misses = 0
+
+
+property_cache = PropertyCache(constants.property_cache_size)
+
+
+class NumericThermodynamic:
+    """Unit-free twin of Thermodynamic, every value is a plain float in SI base units
+
+    cache is shared by the states that repeat, the combustion and exit states of every run. None reads thermo
+    directly, for the throat state, which is new every time step and would only churn the cache.
+    """
 
-class Thermodynamic:
-    def __init__(self, mixture):
+    def __init__(self, mixture, cache=property_cache, table=None):
         self.mixture = mixture
+        self.cache = cache
+        self.table = table
+
+        self.composition = (tuple(mixture.CASs), tuple(mixture.zs))
+        self.properties = None
+
+    def set_state(self, T, P):
+        # The chamber pressure solve sets the state it converged on again, keep what was read at it
+        if self.properties is not None and T == self.mixture.T and P == self.mixture.P:
+            return
+
+        self.mixture.T = T
+        self.mixture.P = P
+
+        self.properties = None
+
+    def state_properties(self):
+        """(Cpg, Cvg, rhog, R_specific) at the current state, looked up once per set_state()
+
+        Interpolated from a PropertyTable when one is given, otherwise read from thermo through the cache, if any
+        """
+
+        if self.properties is None:
+            if self.table is not None:
+                self.properties = self.table.properties(self.mixture.T, self.mixture.P)
+            elif self.cache is not None:
+                self.properties = self.cache.lookup(self.composition, self.mixture)
+            else:
+                self.properties = (self.mixture.Cpg, self.mixture.Cvg, self.mixture.rhog, self.mixture.R_specific)
+
+        return self.properties
+
+    def K(self):
+        Cpg, Cvg, _, _ = self.state_properties()
+
+        return Cpg / Cvg
+
+    def P(self):
+        return self.mixture.P
+
+    def R(self):
+        return self.state_properties()[3]
+
+    def T(self):
+        return self.mixture.T
+
+    def Cp(self):
+        return self.state_properties()[0]
+
+    def density(self):
+        return self.state_properties()[2]
+
+    def speed_of_sound(self):
+        """speed_of_sound = sqrt(K(temp) * R() * temp)
+        """
+
+        speed_of_sound = math.sqrt(self.K() * self.R() * self.T())
+
+        return speed_of_sound
+
+
+class EquilibriumThermodynamic:
+    """NumericThermodynamic of equilibrium combustion products, frozen at the chamber composition
+
+    Cp, K and R come from a ChamberState of libraries/compound.py through set_chemistry(), set_state() then
+    moves T and P at that composition.
+    """
+
+    def __init__(self, chamber_state, T, P):
+        self.set_chemistry(chamber_state)
+        self.set_state(T, P)
+
+    def set_chemistry(self, chamber_state):
+        self.gamma = chamber_state.gamma
+        self.heat_capacity = chamber_state.Cp
+        self.gas_constant = universal_gas_constant / chamber_state.molecular_weight
+
+    def set_state(self, T, P):
+        self.temperature = T
+        self.pressure = P
 
     def K(self):
-        return self.mixture.Cpg / self.mixture.Cvg
+        return self.gamma
+
+    def P(self):
+        return self.pressure
+
+    def R(self):
+        return self.gas_constant
+
+    def T(self):
+        return self.temperature
+
+    def Cp(self):
+        return self.heat_capacity
+
+    def density(self):
+        """density = P / (R * T)
+        """
+
+        return self.pressure / (self.gas_constant * self.temperature)
+
+    def speed_of_sound(self):
+        """speed_of_sound = sqrt(K(temp) * R() * temp)
+        """
+
+        speed_of_sound = math.sqrt(self.K() * self.R() * self.T())
+
+        return speed_of_sound
+
 
+class Thermodynamic(NumericThermodynamic):
     def P(self):
-        return (self.mixture.P * constants.ureg.Pa).to_base_units()
+        return (super().P() * constants.ureg.Pa).to_base_units()
 
     def R(self):
-        return (self.mixture.R_specific * (constants.ureg.J / constants.ureg.kg / constants.ureg.K)).to_base_units()
+        return (super().R() * (constants.ureg.J / constants.ureg.kg / constants.ureg.K)).to_base_units()
 
     def T(self):
-        return (self.mixture.T * constants.ureg.K).to_base_units()
+        return (super().T() * constants.ureg.K).to_base_units()
 
     def Cp(self):
-        return (self.mixture.Cpg * (constants.ureg.J / constants.ureg.kg / constants.ureg.K)).to_base_units()
+        return (super().Cp() * (constants.ureg.J / constants.ureg.kg / constants.ureg.K)).to_base_units()
 
     def density(self):
-        return (self.mixture.rhog * (constants.ureg.kg / (constants.ureg.m ** 3))).to_base_units()
+        return (super().density() * (constants.ureg.kg / (constants.ureg.m ** 3))).to_base_units()
 
     def speed_of_sound(self):
         """speed_of_sound = sqrt(K(temp) * R() * temp)
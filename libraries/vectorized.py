@@ -0,0 +1,419 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.oxidiser import Oxidiser, BlowdownTanks
+from libraries.property_table import PropertyTable
+from libraries.thermochemical import Thermochemical
+from libraries.thermodynamic import NumericThermodynamic
+
+burn_through_error = 'Motor burn through! Fuel grain too thin!'
+
+
+class VectorizedSimulation:
+    """N motor burns advanced in lockstep as NumPy arrays, one Python loop for the whole batch
+
+    Follows NumericCombustion, NumericOxidiser and NumericNozzle step for step. Each motor stops on its
+    own through the burnout (no total mass flow) and burn through (port wider than the grain) masks.
+    The combustion and star state gas properties come from the PropertyTable, the combustion state is shared and fixed.
+    """
+
+    def __init__(self, configs, external_temps, table=None, mixture=None):
+        self.configs = [MotorConfig() if config is None else config for config in configs]
+
+        if isinstance(external_temps, constants.ureg.Quantity) and np.ndim(external_temps.magnitude) == 0:
+            external_temps = [external_temps] * len(self.configs)
+
+        time_steps = {constants.to_si(config.time_step) for config in self.configs}
+
+        if len(time_steps) != 1:
+            raise ValueError('Motors advanced in lockstep must share one time step')
+
+        self.time_step = time_steps.pop()
+
+        # Every gas property comes from the table, so thermo is only imported if the table has to be built
+        if mixture is None:
+            mixture = Thermochemical(live=False).get_mixture()
+
+        if table is None:
+            table = PropertyTable.load_or_build(mixture)
+
+        self.table = table
+
+        def parameter(name):
+            return np.array([constants.to_si(getattr(config, name)) for config in self.configs], dtype=float)
+
+        self.port_length = parameter('port_length')
+        self.grain_diameter = parameter('grain_diameter')
+        self.fuel_density = parameter('fuel_density')
+        self.a = parameter('a')
+        self.n = np.array([config.n for config in self.configs], dtype=float)
+        self.m = np.array([config.m for config in self.configs], dtype=float)
+        self.inlet_area = np.array([constants.to_si(config.inlet_area) for config in self.configs])
+        self.P_exit = parameter('P_exit')
+        self.nozzle_angle = parameter('nozzle_angle')
+        self.throat_mach = np.array([config.throat_mach for config in self.configs], dtype=float)
+        self.injector_mass_flow_rate = parameter('injector_mass_flow_rate') * np.array([config.num_of_injectors for config in self.configs])
+
+        solvers = {config.mass_flow_solver for config in self.configs}
+
+        if len(solvers) != 1:
+            raise ValueError('Motors advanced in lockstep must share one mass flow solver')
+
+        self.solver = solvers.pop()
+        self.relative_precision = np.array([config.iteration_relative_precision for config in self.configs], dtype=float)
+        self.absolute_precision = parameter('iteration_absolute_precision')
+        self.max_iterations = max(config.max_iterations for config in self.configs)
+
+        # Same tolerance units as NumericCombustion.iteration_precision
+        self.iteration_precision = np.array([
+            constants.to_si(
+                config.iteration_precision *
+                config.fuel_density.units *
+                (constants.ureg.m / constants.ureg.sec) *
+                config.initial_port_diameter.units *
+                config.port_length.units
+            )
+            for config in self.configs
+        ])
+
+        if any(config.chamber_pressure_model != 'fixed' or config.combustion_model != 'frozen' for config in self.configs):
+            raise ValueError('Motors advanced in lockstep share one fixed chamber pressure and frozen chemistry')
+
+        if any(config.grain_model != 'lumped' for config in self.configs):
+            raise ValueError('Motors advanced in lockstep only model a lumped fuel grain')
+
+        oxidiser_models = {config.oxidiser_model for config in self.configs}
+
+        if len(oxidiser_models) != 1:
+            raise ValueError('Motors advanced in lockstep must share one oxidiser model')
+
+        self.oxidiser_model = oxidiser_models.pop()
+
+        if self.oxidiser_model == 'constant':
+            self.oxidiser_mass = np.array([
+                constants.to_si(Oxidiser.n2o_density(external_temp) * config.initial_oxidiser_volume)
+                for config, external_temp in zip(self.configs, external_temps)
+            ])
+        elif self.oxidiser_model == 'blowdown':
+            self.tanks = BlowdownTanks(external_temps, self.configs, mixture.P, self.time_step)
+            self.oxidiser_mass = self.tanks.mass
+        else:
+            raise ValueError('Unknown oxidiser model: {}'.format(self.oxidiser_model))
+        self.average_port_diameter = parameter('initial_port_diameter')
+
+        # Combustion and exit states never change, read them once
+        combustion_thermo = NumericThermodynamic(mixture, table=self.table)
+
+        self.combustion_K = combustion_thermo.K()
+        self.combustion_T = combustion_thermo.T()
+        self.combustion_P = combustion_thermo.P()
+        self.combustion_Cp = combustion_thermo.Cp()
+        self.combustion_density = combustion_thermo.density()
+        self.combustion_speed_of_sound = combustion_thermo.speed_of_sound()
+
+        self.star_pressure = self.combustion_P * ((2 / (self.combustion_K + 1)) ** (self.combustion_K / (self.combustion_K - 1)))
+
+        size = len(self.configs)
+
+        self.oxidiser_mass_flow_rate = np.zeros(size)
+        self.average_total_mass_flow_rate = np.zeros(size)
+        self.average_total_mass_flux = np.zeros(size)
+        self.average_regression_rate = np.zeros(size)
+        self.average_fuel_mass_flow_rate = np.zeros(size)
+        self.oxi_fuel_ratio = np.full(size, np.nan)
+
+        self.time = np.zeros(size)
+        self.count = np.zeros(size, dtype=int)
+        self.impulse = np.zeros(size)
+
+        # Solver diagnostics, passes of the batch loop and per motor iteration totals and worst residual
+        self.iterations = 0
+        self.solver_iterations = np.zeros(size, dtype=int)
+        self.max_residual = np.zeros(size)
+
+        self.thrust_sum = np.zeros(size)
+        self.thrust_peak = np.zeros(size)
+        self.oxi_fuel_ratio_sum = np.zeros(size)
+
+        # Nozzle dimension sums plus the last two rows, which the scalar summary leaves out of its averages
+        self.nozzle_sums = np.zeros((3, size))
+        self.nozzle_last = np.zeros((2, 3, size))
+
+        self.burned_through = np.zeros(size, dtype=bool)
+
+        self.oxidiser_mass_flow_rate_function(np.ones(size, dtype=bool))
+        self.average_total_mass_flow_rate = self.oxidiser_mass_flow_rate.copy()
+
+        self.active = self.average_total_mass_flow_rate > 0
+
+    def oxidiser_mass_flow_rate_function(self, mask):
+        if self.oxidiser_model == 'blowdown':
+            flow = self.tanks.mass_flow_rate_function(mask)
+
+            self.oxidiser_mass = self.tanks.mass
+            self.oxidiser_mass_flow_rate = np.where(mask, flow, self.oxidiser_mass_flow_rate)
+
+            return self.oxidiser_mass_flow_rate
+
+        self.oxidiser_mass = np.where(mask, self.oxidiser_mass - self.injector_mass_flow_rate * self.time_step, self.oxidiser_mass)
+
+        self.oxidiser_mass_flow_rate = np.where(
+            mask,
+            np.where(self.oxidiser_mass > 0, self.injector_mass_flow_rate, 0.0),
+            self.oxidiser_mass_flow_rate
+        )
+
+        return self.oxidiser_mass_flow_rate
+
+    def solve_for_average_total_mass_flow_rate(self):
+        active = self.active
+
+        oxi_mass_flow_rate = self.oxidiser_mass_flow_rate_function(active)
+
+        port_surface_area = self.average_port_diameter * math.pi * self.port_length
+
+        if self.solver == 'fixed_point':
+            total, residual = self.fixed_point_solve(active, oxi_mass_flow_rate, port_surface_area)
+        else:
+            total, residual = self.newton_solve(active, oxi_mass_flow_rate, port_surface_area)
+
+        self.average_total_mass_flow_rate = total
+        self.max_residual = np.where(active, np.maximum(self.max_residual, np.abs(residual)), self.max_residual)
+
+        self.average_port_diameter = np.where(
+            active,
+            self.average_port_diameter + 2 * self.average_regression_rate * self.time_step / 100,
+            self.average_port_diameter
+        )
+
+        burn_through = active & (self.average_port_diameter > self.grain_diameter)
+
+        self.burned_through |= burn_through
+
+        return active & ~burn_through
+
+    def fuel_mass_flow_rate(self, total_mass_flow_rate, port_surface_area):
+        """average_total_mass_flux, average_regression_rate and average_fuel_mass_flow_rate at total_mass_flow_rate
+        """
+
+        flux = total_mass_flow_rate / port_surface_area
+        regression_rate = self.a * (flux ** self.n) * (self.port_length ** self.m)
+        fuel_mass_flow_rate = self.fuel_density * regression_rate * port_surface_area
+
+        return flux, regression_rate, fuel_mass_flow_rate
+
+    def store(self, mask, flux, regression_rate, fuel_mass_flow_rate):
+        self.average_total_mass_flux = np.where(mask, flux, self.average_total_mass_flux)
+        self.average_regression_rate = np.where(mask, regression_rate, self.average_regression_rate)
+        self.average_fuel_mass_flow_rate = np.where(mask, fuel_mass_flow_rate, self.average_fuel_mass_flow_rate)
+
+    def fixed_point_solve(self, active, oxi_mass_flow_rate, port_surface_area):
+        """NumericCombustion.fixed_point_solve for every active motor
+        """
+
+        total = np.where(active, oxi_mass_flow_rate, self.average_total_mass_flow_rate)
+
+        unconverged = active.copy()
+
+        # Every motor keeps the values of the iteration it converged on, exactly like the scalar loop
+        while unconverged.any():
+            self.iterations += 1
+            self.solver_iterations += unconverged
+
+            flux, regression_rate, fuel_mass_flow_rate = self.fuel_mass_flow_rate(total, port_surface_area)
+
+            new_total = fuel_mass_flow_rate + oxi_mass_flow_rate
+
+            self.store(unconverged, flux, regression_rate, fuel_mass_flow_rate)
+
+            converged = np.abs(new_total - total) < self.iteration_precision
+
+            total = np.where(unconverged, new_total, total)
+
+            unconverged &= ~converged
+
+        residual = total - oxi_mass_flow_rate - self.fuel_mass_flow_rate(total, port_surface_area)[2]
+
+        return total, residual
+
+    def newton_solve(self, active, oxi_mass_flow_rate, port_surface_area):
+        """NumericCombustion.newton_solve for every active motor, warm started from each motor's previous total
+        """
+
+        total = np.where(
+            oxi_mass_flow_rate > 0,
+            np.maximum(self.average_total_mass_flow_rate, oxi_mass_flow_rate),
+            0.0
+        )
+        residual = np.zeros(len(total))
+
+        unconverged = active.copy()
+
+        for _ in range(self.max_iterations):
+            if not unconverged.any():
+                break
+
+            self.iterations += 1
+            self.solver_iterations += unconverged & (oxi_mass_flow_rate > 0)
+
+            flux, regression_rate, fuel_mass_flow_rate = self.fuel_mass_flow_rate(total, port_surface_area)
+
+            self.store(unconverged, flux, regression_rate, fuel_mass_flow_rate)
+
+            step_residual = total - oxi_mass_flow_rate - fuel_mass_flow_rate
+            residual = np.where(unconverged, step_residual, residual)
+
+            converged = np.abs(step_residual) <= self.absolute_precision + self.relative_precision * total
+
+            slope = 1 - self.n * fuel_mass_flow_rate / total
+
+            new_total = np.where(
+                slope > 0,
+                np.maximum(total - step_residual / slope, oxi_mass_flow_rate),
+                oxi_mass_flow_rate + fuel_mass_flow_rate
+            )
+
+            unconverged &= ~converged
+
+            total = np.where(unconverged, new_total, total)
+
+        if unconverged.any():
+            raise ValueError('Mass flow solver did not converge in {} iterations'.format(self.max_iterations))
+
+        return total, residual
+
+    def nozzle(self, total_mass_flow_rate):
+        """throat diameter, exit diameter, diffuser length and thrust of every motor, as in NumericNozzle
+        """
+
+        K = self.combustion_K
+
+        inlet_velocity = total_mass_flow_rate / (self.combustion_density * self.inlet_area)
+        inlet_mach = inlet_velocity / self.combustion_speed_of_sound
+
+        naught_temp = self.combustion_T + (inlet_velocity ** 2) / (2 * self.combustion_Cp)
+        star_temp = (2 * naught_temp) / (K + 1)
+
+        star_properties = self.table.interpolate(star_temp, self.star_pressure)
+
+        star_K = star_properties['Cp'] / star_properties['Cv']
+
+        # The throat is sonic, NumericNozzle's star velocity and star speed of sound are both sqrt(K * R * T)
+        star_mach = np.ones_like(star_temp)
+
+        throat_area = (
+            ((self.inlet_area * inlet_mach) / star_mach) *
+            np.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * star_mach ** 2) /
+                    (1 + ((K - 1) / 2) * inlet_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+
+        P = self.combustion_P
+
+        exit_mach = (
+            math.sqrt(2) *
+            np.sqrt(P * ((P / self.P_exit) ** (-1 / star_K)) - self.P_exit) /
+            np.sqrt(star_K * self.P_exit - self.P_exit)
+        )
+
+        exit_area = (
+            ((throat_area * self.throat_mach) / exit_mach) *
+            np.sqrt(
+                (
+                    (1 + ((K - 1) / 2) * exit_mach ** 2) /
+                    (1 + ((K - 1) / 2) * self.throat_mach ** 2)
+                ) ** ((K + 1) / (K - 1))
+            )
+        )
+
+        throat_diameter = np.sqrt(4 * throat_area / math.pi)
+        exit_diameter = np.sqrt(4 * exit_area / math.pi)
+        nozzle_diffuser_length = (exit_diameter - throat_diameter) / (2 * np.tan(self.nozzle_angle))
+
+        exit_velocity = exit_mach * self.combustion_speed_of_sound
+
+        thrust = total_mass_flow_rate * (exit_velocity - inlet_velocity)
+
+        return throat_diameter, exit_diameter, nozzle_diffuser_length, thrust
+
+    def step(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            recorded = self.solve_for_average_total_mass_flow_rate()
+
+            total = self.average_total_mass_flow_rate
+
+            # NumericCombustion.oxi_fuel_ratio_function keeps the previous ratio when there is no fuel flow
+            self.oxi_fuel_ratio = np.where(
+                recorded & (self.average_fuel_mass_flow_rate != 0),
+                self.oxidiser_mass_flow_rate / self.average_fuel_mass_flow_rate,
+                self.oxi_fuel_ratio
+            )
+
+            throat_diameter, exit_diameter, nozzle_diffuser_length, thrust = self.nozzle(total)
+
+        dimensions = np.array([throat_diameter, exit_diameter, nozzle_diffuser_length])
+
+        self.impulse += np.where(recorded, thrust * self.time_step, 0.0)
+        self.thrust_sum += np.where(recorded, thrust, 0.0)
+        self.thrust_peak = np.where(recorded, np.maximum(self.thrust_peak, thrust), self.thrust_peak)
+        self.oxi_fuel_ratio_sum += np.where(recorded, self.oxi_fuel_ratio, 0.0)
+        self.nozzle_sums += np.where(recorded, dimensions, 0.0)
+        self.nozzle_last = np.where(recorded, np.array([self.nozzle_last[1], dimensions]), self.nozzle_last)
+
+        self.time += np.where(recorded, self.time_step, 0.0)
+        self.count += recorded
+
+        self.active = recorded & (total > 0)
+
+    def run(self):
+        while self.active.any():
+            self.step()
+
+        return self
+
+    def summary(self):
+        """One row per motor with the columns of Simulation.summary(), plus peak thrust and average O/F
+        """
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            has_averages = self.count > 2
+
+            average_thrust = np.where(self.count > 0, self.thrust_sum / self.count, np.nan)
+            average_oxi_fuel_ratio = np.where(self.count > 0, self.oxi_fuel_ratio_sum / self.count, np.nan)
+
+            # Averages over all rows but the last two, like suggested_nozzle_dimensions()
+            nozzle_averages = np.where(
+                has_averages,
+                (self.nozzle_sums - self.nozzle_last[0] - self.nozzle_last[1]) / (self.count - 2),
+                np.nan
+            )
+
+        inches = constants.si_conversion(constants.ureg.m, constants.ureg.inches)[0]
+
+        motor_codes = [
+            '{}{}'.format(constants.get_motor_code(impulse * constants.ureg.newton * constants.ureg.second), int(round(thrust))) if valid else None
+            for impulse, thrust, valid in zip(self.impulse, average_thrust, has_averages)
+        ]
+
+        return pd.DataFrame({
+            'burn time (second)': self.time,
+            'impulse (newton * second)': self.impulse,
+            'average thrust (newton)': np.where(has_averages, average_thrust, np.nan),
+            'motor code': motor_codes,
+            'nozzle throat diameter (inch)': nozzle_averages[0] * inches,
+            'nozzle exit diameter (inch)': nozzle_averages[1] * inches,
+            'nozzle diffuser length (inch)': nozzle_averages[2] * inches,
+            'peak thrust (newton)': self.thrust_peak,
+            'average oxi fuel ratio': average_oxi_fuel_ratio,
+            'solver iterations per step': np.where(self.count > 0, self.solver_iterations / np.maximum(self.count, 1), np.nan),
+            'max solver residual (kilogram / second)': self.max_residual,
+            'error': [burn_through_error if failed else None for failed in self.burned_through]
+        })
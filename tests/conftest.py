@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The repository root, so the tests import libraries/ as the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import libraries.constants as constants
+
+
+@pytest.fixture
+def external_temp():
+    return constants.ureg.Quantity(70, constants.ureg.degF)
+
+
+@pytest.fixture(scope='session')
+def table():
+    """The default PropertyTable, built with thermo the first time it is missing
+    """
+
+    from libraries.property_table import PropertyTable
+    from libraries.thermochemical import Thermochemical
+
+    if not os.path.exists(constants.property_table_path):
+        pytest.importorskip('thermo')
+
+    return PropertyTable.load_or_build(Thermochemical(live=False).get_mixture())
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+
+from libraries.config import MotorConfig
+from libraries.checkpoint import Checkpoint, save_checkpoint, resume, rows_path
+from libraries.simulation import create_simulation
+
+configs = [
+    MotorConfig(),
+    MotorConfig(oxidiser_model='blowdown', grain_model='axial')
+]
+
+
+def assert_same_burn(actual, expected):
+    assert actual.time == expected.time
+    assert actual.count == expected.count
+    assert actual.impulse == expected.impulse
+
+    assert actual.data().equals(expected.data())
+    assert actual.diagnostics().equals(expected.diagnostics())
+
+
+@pytest.mark.parametrize('config', configs, ids=['lumped', 'axial blowdown'])
+def test_resumed_burn_is_bit_identical(tmp_path, external_temp, table, config):
+    path = str(tmp_path / 'checkpoint.npz')
+
+    uninterrupted = create_simulation(external_temp, config, table=table).run()
+
+    create_simulation(external_temp, config, table=table).run(checkpoint=path, checkpoint_interval=100, until=4.0)
+
+    # Resumed, checkpointed again to the same files, then resumed once more to the end
+    resume(path, table=table).run(checkpoint=path, checkpoint_interval=100, until=8.0)
+
+    assert_same_burn(resume(path, table=table).run(), uninterrupted)
+
+
+def test_rows_of_an_unfinished_save_are_ignored(tmp_path, external_temp, table):
+    path = str(tmp_path / 'checkpoint.npz')
+
+    simulation = create_simulation(external_temp, table=table).run(until=2.0)
+    save_checkpoint(simulation, path)
+
+    # A save that appended its rows but crashed before renaming its .npz into place
+    with open(rows_path(path, 'recorder'), 'ab') as f:
+        f.write(np.ones(10 * (simulation.recorder.values.shape[0] + 1)).tobytes())
+
+    checkpoint = Checkpoint.load(path)
+
+    assert checkpoint.time == simulation.time
+    assert len(checkpoint.arrays['recorder.times']) == simulation.recorder.count
+
+    assert_same_burn(
+        resume(path, table=table).run(checkpoint=path),
+        create_simulation(external_temp, table=table).run()
+    )
+
+
+def test_checkpoint_missing_rows_is_rejected(tmp_path, external_temp, table):
+    path = str(tmp_path / 'checkpoint.npz')
+
+    save_checkpoint(create_simulation(external_temp, table=table).run(until=1.0), path)
+
+    os.remove(rows_path(path, 'solver_recorder'))
+
+    with pytest.raises(ValueError):
+        Checkpoint.load(path)
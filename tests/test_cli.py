@@ -0,0 +1,88 @@
+import os
+import json
+
+import pytest
+
+from libraries.cli import load_jobs, main
+
+
+def write(path, document):
+    with open(path, 'w') as f:
+        json.dump(document, f)
+
+    return str(path)
+
+
+def test_motor_definition_is_one_job_named_after_its_file(tmp_path):
+    path = write(tmp_path / 'small.json', {'external_temp': '21 degC', 'parameters': {'grain_diameter': '2 inch'}})
+
+    assert load_jobs(path) == [{'name': 'small', 'external_temp': '21 degC', 'parameters': {'grain_diameter': '2 inch'}}]
+
+
+def test_manifest_jobs_build_on_defaults_and_motor_definitions(tmp_path):
+    write(tmp_path / 'small.json', {'tabulated': True, 'parameters': {'grain_diameter': 2.0, 'port_length': 10.0}})
+
+    (tmp_path / 'batch.toml').write_text(
+        '[defaults]\n'
+        'external_temp = 40\n'
+        'parameters = { a = 0.06 }\n'
+        '\n'
+        '[[jobs]]\n'
+        'motor = "small.json"\n'
+        'parameters = { port_length = 12.0 }\n'
+        '\n'
+        '[[jobs]]\n'
+        'external_temp = 90\n'
+    )
+
+    small, default = load_jobs(str(tmp_path / 'batch.toml'))
+
+    assert small == {
+        'name': 'small',
+        'external_temp': 40,
+        'tabulated': True,
+        'parameters': {'a': 0.06, 'grain_diameter': 2.0, 'port_length': 12.0}
+    }
+    assert default == {'name': 'batch-1', 'external_temp': 90, 'parameters': {'a': 0.06}}
+
+
+def test_misspelt_settings_are_rejected_before_running(tmp_path, capsys):
+    with pytest.raises(ValueError, match='grain_diamter'):
+        load_jobs(write(tmp_path / 'motor.json', {'parameters': {'grain_diamter': 2.0}}))
+
+    with pytest.raises(ValueError, match='tabulate'):
+        load_jobs(write(tmp_path / 'motor.json', {'tabulate': True}))
+
+    with pytest.raises(ValueError, match='manifest'):
+        load_jobs(write(tmp_path / 'batch.json', {'jobs': [{'motor': 'batch.json'}]}))
+
+    # Reported as a usage error
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / 'motor.json')])
+
+    assert 'tabulate' in capsys.readouterr().err
+
+
+def test_batch_runs_every_job_into_its_own_directory(tmp_path, table, capsys):
+    manifest = write(tmp_path / 'batch.json', {
+        'defaults': {'tabulated': True},
+        'jobs': [
+            {'name': 'default'},
+            {'name': 'colder', 'external_temp': 40},
+            {'name': 'thin', 'parameters': {'grain_diameter': 1.05}}
+        ]
+    })
+
+    results_dir = str(tmp_path / 'results')
+
+    # The thin grain burns through, which fails its job but not the others
+    assert main([manifest, '--workers', '1', '--no-report', '--no-cache', '--results-dir', results_dir]) == 1
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert any(line.startswith('default: throat 0.17') for line in lines)
+    assert any(line.startswith('colder: throat') for line in lines)
+    assert any(line.startswith('thin: failed') for line in lines)
+
+    assert sorted(os.listdir(os.path.join(results_dir, 'default'))) == ['ideal_nozzle_70F_motor_data.csv', 'ideal_nozzle_70F_run.json']
+    assert os.path.exists(os.path.join(results_dir, 'colder', 'ideal_nozzle_40F_motor_data.csv'))
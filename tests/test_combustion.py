@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.simulation import create_simulation
+from libraries.vectorized import VectorizedSimulation
+
+fuel_column = 'average fuel mass flow rate (kilogram / second)'
+
+
+@pytest.fixture(scope='module')
+def runs(table):
+    external_temp = constants.ureg.Quantity(70, constants.ureg.degF)
+
+    return {
+        'lumped': create_simulation(external_temp, table=table).run(),
+        'axial': create_simulation(external_temp, MotorConfig(grain_model='axial'), table=table).run()
+    }
+
+
+def test_single_cell_is_the_lumped_model(runs, external_temp, table):
+    single = create_simulation(external_temp, MotorConfig(grain_model='axial', grain_cells=1), table=table).run()
+
+    assert single.impulse == pytest.approx(runs['lumped'].impulse, rel=1e-9)
+
+    np.testing.assert_allclose(single.data()[fuel_column], runs['lumped'].data()[fuel_column], rtol=1e-7, atol=1e-12)
+
+
+def test_port_opens_up_towards_the_nozzle(runs):
+    combustion = runs['axial'].combustion
+    profile = combustion.port_profile()
+
+    assert len(profile) == constants.grain_cells
+    assert np.all(np.diff(profile['port diameter (meter)']) > 0)
+    assert profile.index[-1] < combustion.port_length
+
+    # Fuel picked up down the port raises the flux over the cells behind, so less is burnt than with the lumped average
+    assert runs['axial'].impulse < runs['lumped'].impulse
+    assert combustion.average_port_diameter < runs['lumped'].combustion.average_port_diameter
+
+
+def test_fuel_burnt_is_the_grain_lost(runs):
+    initial_port_diameter = constants.to_si(runs['lumped'].config.initial_port_diameter)
+
+    lumped = runs['lumped'].combustion.average_port_diameter ** 2 - initial_port_diameter ** 2
+    axial = (runs['axial'].combustion.port_diameters ** 2 - initial_port_diameter ** 2).mean()
+
+    # Against the lumped run, the grain volume lost per cell is pi / 4 * (port_diameter ** 2 - initial_port_diameter ** 2) * port_length / cells
+    burnt = runs['axial'].data()[fuel_column].sum() / runs['lumped'].data()[fuel_column].sum()
+
+    assert burnt == pytest.approx(axial / lumped, rel=1e-4)
+
+
+def test_thin_grain_burns_through(external_temp, table):
+    simulation = create_simulation(external_temp, MotorConfig(grain_model='axial', grain_diameter=1.05), table=table)
+
+    with pytest.raises(ValueError, match='burn through'):
+        simulation.run()
+
+    with pytest.raises(ValueError):
+        create_simulation(external_temp, MotorConfig(grain_model='axial', grain_cells=0), table=table)
+
+    with pytest.raises(ValueError):
+        VectorizedSimulation([MotorConfig(grain_model='axial')], external_temp, table=table)
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import libraries.constants as constants
+
+from libraries.compound import ChemistryTable, CompoundThermoChemical
+from libraries.config import MotorConfig
+from libraries.simulation import create_simulation
+from libraries.vectorized import VectorizedSimulation
+
+chamber_pressure = 3447000.0
+
+
+@pytest.fixture(scope='module')
+def chemistry():
+    pytest.importorskip('chemicals')
+
+    return CompoundThermoChemical()
+
+
+@pytest.fixture
+def small_grid(monkeypatch):
+    """A 3 x 2 table grid, quick to build
+    """
+
+    monkeypatch.setattr(constants, 'chemistry_table_ratios', (2.0, 12.0, 3))
+    monkeypatch.setattr(constants, 'chemistry_table_pressures', (1 * constants.ureg.bar, 80 * constants.ureg.bar, 2))
+
+
+def test_products_balance_the_reactants(chemistry):
+    state = chemistry.chamber_state(5.0, chamber_pressure)
+
+    element_moles, enthalpy = chemistry.reactants(5.0)
+    moles, _ = chemistry.composition(state.flame_temperature, chamber_pressure, element_moles)
+
+    np.testing.assert_allclose(chemistry.atoms.T @ moles, element_moles, rtol=1e-9)
+
+    # Adiabatic, the products hold the reactants' enthalpy at the flame temperature
+    assert moles @ chemistry.enthalpies(state.flame_temperature) == pytest.approx(enthalpy, rel=1e-6, abs=1e-3)
+    assert state.molecular_weight == pytest.approx(1 / moles.sum())
+    assert 1 < state.gamma < 1.4
+
+
+def test_flame_is_hottest_near_stoichiometric(chemistry):
+    temperatures = {ratio: chemistry.chamber_state(ratio, chamber_pressure).flame_temperature for ratio in (3.0, 5.0, 9.0, 12.0)}
+
+    # C32H66 + 97 N2O burns to CO2 and H2O at O/F 9.5
+    assert temperatures[3.0] < temperatures[5.0] < temperatures[9.0]
+    assert temperatures[12.0] < temperatures[9.0]
+
+
+def test_table_interpolates_the_solver(chemistry):
+    # Cells the size of the default grid's
+    ratios = np.linspace(4.4, 4.6, 3)
+    pressures = np.linspace(3.4e6, 3.6e6, 3)
+
+    table = ChemistryTable.build(chemistry, ratios, pressures)
+
+    assert table.properties(4.5, 3.5e6) == chemistry.chamber_state(4.5, 3.5e6)
+
+    np.testing.assert_allclose(table.properties(4.45, 3.45e6), chemistry.chamber_state(4.45, 3.45e6), rtol=2e-3)
+    np.testing.assert_allclose(np.array(table.interpolate([4.45], [3.45e6]))[:, 0], table.properties(4.45, 3.45e6), rtol=1e-12)
+
+
+def test_saved_table_is_rebuilt_for_another_grid_or_propellant(chemistry, small_grid, tmp_path, monkeypatch):
+    path = str(tmp_path / 'combustion_chemistry.npz')
+
+    table = ChemistryTable.load_or_build(path)
+
+    assert len(table.ratios) == 3
+    assert ChemistryTable.load(path).oxidiser == table.oxidiser
+
+    np.testing.assert_array_equal(ChemistryTable.load_or_build(path).values, table.values)
+
+    monkeypatch.setattr(constants, 'chemistry_table_ratios', (2.0, 12.0, 5))
+
+    wider = ChemistryTable.load_or_build(path)
+
+    assert len(wider.ratios) == 5
+
+    monkeypatch.setattr(constants, 'fuel_enthalpy_of_formation', -900 * constants.ureg.kJ / constants.ureg.mol)
+
+    rebuilt = ChemistryTable.load_or_build(path)
+
+    assert rebuilt.fuel != wider.fuel
+    assert ChemistryTable.load(path).fuel == rebuilt.fuel
+
+    # A fuel with more enthalpy burns hotter
+    assert np.all(rebuilt.values[0] > wider.values[0])
+
+
+def test_equilibrium_burn_follows_the_oxi_fuel_ratio(external_temp, table):
+    pytest.importorskip('chemicals')
+
+    frozen = create_simulation(external_temp, table=table).run()
+    equilibrium = create_simulation(external_temp, MotorConfig(combustion_model='equilibrium'), table=table).run()
+
+    data = equilibrium.data().iloc[:-1]
+
+    # The port opens up so the burn runs fuel richer, and cooler, as it goes
+    assert data['oxi fuel ratio'].iloc[0] > data['oxi fuel ratio'].iloc[-1]
+    assert data['nozzle naught temp (degree_Fahrenheit)'].iloc[0] > data['nozzle naught temp (degree_Fahrenheit)'].iloc[-1]
+
+    assert equilibrium.impulse == pytest.approx(frozen.impulse, rel=0.05)
+    assert equilibrium.impulse != frozen.impulse
+
+    with pytest.raises(ValueError):
+        VectorizedSimulation([MotorConfig(combustion_model='equilibrium')], external_temp, table=table)
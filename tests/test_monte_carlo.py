@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from libraries.monte_carlo import Distribution, QuantileSketch, RunningStatistics, monte_carlo, sample_parameters
+
+
+def test_sketch_quantiles_are_within_their_relative_accuracy():
+    values = np.random.default_rng(1).lognormal(7, 0.5, 10000)
+
+    whole = QuantileSketch(0.005)
+    halves = [QuantileSketch(0.005), QuantileSketch(0.005)]
+
+    for k, value in enumerate(values):
+        whole.add(value)
+        halves[k % 2].add(value)
+
+    halves[0].merge(halves[1])
+
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        # Read at the same rank as the sketch, the lower of the two values around it
+        exact = np.quantile(values, q, method='lower')
+
+        assert whole.quantile(q) == pytest.approx(exact, rel=0.005)
+        assert halves[0].quantile(q) == whole.quantile(q)
+
+    with pytest.raises(ValueError):
+        whole.merge(QuantileSketch(0.01))
+
+
+def test_merged_statistics_match_one_pass():
+    values = np.random.default_rng(2).normal(1200, 40, 1000)
+
+    parts = [RunningStatistics() for _ in range(3)]
+
+    for k, value in enumerate(values):
+        parts[k % 3].add(value)
+
+    merged = RunningStatistics()
+
+    for part in parts:
+        merged.merge(part)
+
+    assert merged.count == 1000
+    assert merged.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert merged.std() == pytest.approx(values.std(ddof=1), rel=1e-10)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+
+
+def test_each_sample_has_its_own_stream():
+    distributions = {'a': Distribution('normal', mean=0.05, std=0.05, low=0), 'n': Distribution('uniform', low=0.6, high=0.7)}
+
+    samples = [sample_parameters(distributions, 7, index) for index in range(200)]
+
+    assert sample_parameters(distributions, 7, 150) == samples[150]
+    assert sample_parameters(distributions, 8, 150) != samples[150]
+
+    assert min(sample['a'] for sample in samples) >= 0
+    assert all(0.6 <= sample['n'] <= 0.7 for sample in samples)
+
+    with pytest.raises(ValueError):
+        Distribution('normal', mean=0.05)
+
+    with pytest.raises(ValueError):
+        Distribution('beta', a=1, b=2)
+
+
+def test_dispersion_is_the_same_on_any_number_of_workers(external_temp, table):
+    distributions = {
+        'injector_mass_flow_rate': {'distribution': 'uniform', 'low': 0.025, 'high': 0.03},
+        # A thin grain burns through, those runs are counted apart
+        'grain_diameter': {'distribution': 'choice', 'values': [1.05, 2.0], 'probabilities': [0.25, 0.75]}
+    }
+
+    serial = monte_carlo(distributions, 8, external_temp, seed=3, workers=1, tabulated=True, chunk_size=3)
+    parallel = monte_carlo(distributions, 8, external_temp, seed=3, workers=2, tabulated=True, chunk_size=3)
+
+    pd.testing.assert_frame_equal(serial.summary(), parallel.summary())
+
+    grains = Distribution.from_dict(distributions['grain_diameter'])
+    thin = sum(sample_parameters({'grain_diameter': grains}, 3, index)['grain_diameter'] == 1.05 for index in range(8))
+
+    assert serial.samples == 8
+    assert 0 < serial.failures() == thin < 8
+    assert serial.summary().loc['impulse (newton * second)', 'count'] == 8 - thin
+    assert serial.motor_class_probabilities().sum() == pytest.approx(1)
+
+
+def test_parameters_are_checked_before_running(external_temp):
+    with pytest.raises(ValueError, match='grain_diamter'):
+        monte_carlo({'grain_diamter': Distribution('uniform', low=1, high=2)}, 4, external_temp)
+
+    with pytest.raises(ValueError, match='both fixed and sampled'):
+        monte_carlo({'a': Distribution('uniform', low=0.04, high=0.06)}, 4, external_temp, parameters={'a': 0.05})
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from libraries import n2o
+
+
+@pytest.mark.parametrize('T, expected', [
+    # ESDU 91022 fits at -90 C, -40 C, 0 C, 70 F and 30 C: vapour pressure, liquid and vapour density, liquid and
+    # vapour enthalpy, enthalpy of vaporisation and liquid heat capacity
+    (183.15, (92286.7, 1220.58, 2.73845, -472842, -96331.9, 376510, 1750.01)),
+    (233.15, (941730, 1068.78, 24.529, -383254, -72851.1, 310403, 1840.25)),
+    (273.15, (3.1266e6, 907.407, 84.8624, -303847, -71657.0, 232190, 2274.10)),
+    (294.26111111111106, (5.18894e6, 777.803, 164.371, -252380, -87754.5, 164626, 3291.04)),
+    (303.15, (6.31487e6, 687.985, 236.707, -224230, -107561, 116669, 5143.47)),
+])
+def test_fit_values(T, expected):
+    np.testing.assert_allclose(n2o.saturation(T), expected, rtol=1e-5)
+
+
+def test_fits_meet_at_the_critical_point():
+    properties = n2o.saturation(n2o.critical_temperature)
+
+    assert properties.vapour_pressure == n2o.critical_pressure
+    assert properties.liquid_density == n2o.critical_density
+    assert properties.vapour_density == n2o.critical_density
+    assert properties.enthalpy_of_vaporisation == 0
+
+
+def test_fits_are_monotonic():
+    table = n2o.saturation_table(np.linspace(n2o.minimum_temperature, n2o.critical_temperature - 0.01, 1000))
+
+    assert np.all(np.diff(table.vapour_pressure) > 0)
+    assert np.all(np.diff(table.liquid_density) < 0)
+    assert np.all(np.diff(table.vapour_density) > 0)
+    assert np.all(np.diff(table.enthalpy_of_vaporisation) < 0)
+
+
+def test_table_matches_single_temperatures():
+    temperatures = np.array([200.0, 250.0, 294.26, 305.0])
+
+    table = n2o.saturation_table(temperatures)
+
+    for k, T in enumerate(temperatures):
+        np.testing.assert_allclose([values[k] for values in table], n2o.saturation(T), rtol=1e-14)
+
+
+def test_interpolated_table_error():
+    temperatures = np.linspace(n2o.minimum_temperature, 300.0, 997)
+
+    exact = n2o.saturation_table(temperatures)
+    interpolated = n2o.default_table().interpolate(temperatures)
+
+    for name in ('vapour_pressure', 'liquid_density', 'vapour_density'):
+        np.testing.assert_allclose(getattr(interpolated, name), getattr(exact, name), rtol=1e-5, err_msg=name)
+
+
+@pytest.mark.parametrize('T', [n2o.minimum_temperature - 1, n2o.critical_temperature + 1])
+def test_outside_the_fitted_range_is_rejected(T):
+    with pytest.raises(ValueError):
+        n2o.saturation(T)
@@ -0,0 +1,65 @@
+import pytest
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.nozzle import NumericNozzle
+from libraries.simulation import create_simulation
+from libraries.thermochemical import Thermochemical
+from libraries.vectorized import VectorizedSimulation
+
+throat = MotorConfig(chamber_pressure_model='throat')
+
+
+def test_chamber_pressure_balances_the_throat_flow(table):
+    nozzle = NumericNozzle(Thermochemical(live=False).get_mixture(), throat, table=table)
+
+    for total_mass_flow_rate in (0.01, 0.035, 0.06):
+        chamber_pressure = nozzle.chamber_pressure(total_mass_flow_rate)
+
+        # Pc * throat area = mass flow * c*, with c* at the chamber pressure solved for
+        assert chamber_pressure * nozzle.nozzle_throat_area == pytest.approx(
+            total_mass_flow_rate * nozzle.characteristic_velocity(), rel=2 * throat.iteration_relative_precision
+        )
+        assert nozzle.combustion_thermo.P() == chamber_pressure
+
+    assert not nozzle.expands(1e-6)
+    assert nozzle.expands(0.035)
+
+
+def test_burn_recovers_the_as_built_throat(external_temp, table):
+    fixed = create_simulation(external_temp, table=table).run().summary()
+    default = create_simulation(external_temp, throat, table=table).run().summary()
+    wider = create_simulation(external_temp, throat.replace(nozzle_throat_diameter=0.25), table=table).run().summary()
+
+    assert default['nozzle throat diameter (inch)'] == pytest.approx(0.1725, rel=2e-3)
+    assert wider['nozzle throat diameter (inch)'] == pytest.approx(0.25, rel=2e-3)
+
+    # The default throat is the one the fixed chamber pressure motor suggests, so the burns match
+    assert default['impulse (newton * second)'] == pytest.approx(fixed['impulse (newton * second)'], rel=1e-3)
+
+    # A wider throat holds a lower chamber pressure, which expands the flow less
+    assert wider['impulse (newton * second)'] < 0.9 * fixed['impulse (newton * second)']
+
+
+def test_blowdown_burn_ends_at_the_exit_pressure(external_temp, table):
+    simulation = create_simulation(external_temp, throat.replace(oxidiser_model='blowdown'), table=table).run()
+
+    P_exit = constants.to_si(throat.P_exit)
+
+    # The burnout row's flow would have left the chamber below the exit pressure, with the tank not yet empty
+    assert simulation.data()['average total mass flow rate (kilogram / second)'].iloc[-1] == 0
+    assert simulation.nozzle.combustion_thermo.P() == pytest.approx(P_exit, rel=1e-3)
+    assert simulation.nozzle.combustion_thermo.P() <= P_exit
+    assert simulation.oxidiser.mass > 0
+
+
+def test_only_the_numeric_engine_solves_the_chamber_pressure(external_temp, table):
+    with pytest.raises(ValueError):
+        create_simulation(external_temp, throat, reference=True, mixture=Thermochemical(live=False).get_mixture())
+
+    with pytest.raises(ValueError):
+        VectorizedSimulation([throat], external_temp, table=table)
+
+    with pytest.raises(ValueError):
+        create_simulation(external_temp, MotorConfig(chamber_pressure_model='ideal'), table=table)
@@ -0,0 +1,86 @@
+import math
+
+import pytest
+
+import libraries.constants as constants
+
+from libraries.optimiser import Optimiser, motor_class_impulses
+
+
+def test_motor_class_impulse_ranges():
+    assert motor_class_impulses('1/8A') == (0.0, pytest.approx(0.3125))
+    assert motor_class_impulses('A') == (pytest.approx(1.25), pytest.approx(2.5))
+    assert motor_class_impulses('J') == (pytest.approx(640), pytest.approx(1280))
+
+    with pytest.raises(ValueError):
+        motor_class_impulses('Z')
+
+
+def test_designs_are_snapped_and_scored_against_the_targets(external_temp):
+    optimiser = Optimiser({'grain_diameter': (1.25, 2.5), 'port_length': (8.0, 16.0)}, external_temp, motor_class='J', burn_time=(8.0, 12.0))
+
+    design = optimiser.design([0.50004, 1.2])
+
+    assert design == (1.875, 16.0)
+    assert optimiser.design([0.5, 1.0]) == design
+
+    # grain_mass = fuel_density * pi / 4 * (grain_diameter ** 2 - initial_port_diameter ** 2) * port_length
+    config = optimiser.config(design)
+    expected = (
+        constants.to_si(config.fuel_density) * math.pi / 4 *
+        (constants.to_si(config.grain_diameter) ** 2 - constants.to_si(config.initial_port_diameter) ** 2) *
+        constants.to_si(config.port_length)
+    )
+
+    assert optimiser.grain_mass(design) == pytest.approx(expected)
+
+    row = {'impulse (newton * second)': 1000.0, 'burn time (second)': 10.0, 'average oxi fuel ratio': 4.83, 'failed': 0.0}
+
+    assert optimiser.violations(design, row) == 0
+    assert optimiser.objective(design, row) == optimiser.grain_mass(design)
+
+    # 100 N s short of the J class is 100 / 1280 of it
+    assert optimiser.violations(design, dict(row, **{'impulse (newton * second)': 540.0})) == pytest.approx(100 / 1280)
+    assert optimiser.violations(design, dict(row, failed=1.0)) == 10.0
+    assert optimiser.violations((1.25, 8.0), dict(row)) == 0
+
+    with pytest.raises(ValueError):
+        Optimiser({'grain_diamter': (1.25, 2.5)}, external_temp)
+
+    with pytest.raises(ValueError):
+        Optimiser({'grain_diameter': (1.25, 2.5)}, external_temp, motor_class='J', impulse=(600, 1300))
+
+
+def test_lightest_design_meeting_the_targets(external_temp, table):
+    # Shorter grains are lighter, down to the ones that burn through
+    optimiser = Optimiser(
+        {'port_length': (8.0, 16.0)},
+        external_temp,
+        motor_class='J',
+        oxi_fuel_ratio_tolerance=0.4,
+        workers=1,
+        tabulated=True,
+        surrogate=True,
+        resolution=0.01
+    )
+
+    result = optimiser.optimise(generations=3, population=5, seed=1)
+
+    assert result.feasible
+    assert result.row['error'] is None
+    assert result.grain_mass == pytest.approx(optimiser.grain_mass((result.parameters['port_length'],)))
+
+    history = result.history
+
+    assert len(history) == result.simulations
+    assert history['objective'].iloc[0] == pytest.approx(result.grain_mass)
+    assert (history['port_length'] < result.parameters['port_length']).any()
+
+    # Every shorter design simulated missed the targets
+    shorter = history[history['port_length'] < result.parameters['port_length']]
+
+    assert (shorter['objective'] > result.grain_mass + 1).all()
+
+    # Later generations were ranked by the surrogate, and repeated designs never simulated twice
+    assert result.predictions > 0
+    assert result.simulations + result.predictions + result.cache_hits == 5 * 4
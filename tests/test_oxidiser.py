@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+import libraries.constants as constants
+import libraries.n2o as n2o
+
+from libraries.config import MotorConfig
+from libraries.oxidiser import BlowdownOxidiser, BlowdownTanks
+from libraries.simulation import create_simulation
+
+config = MotorConfig(oxidiser_model='blowdown')
+chamber_pressure = 2e6
+
+
+def test_tank_starts_full_at_its_vapour_pressure(external_temp):
+    tank = BlowdownOxidiser(external_temp, config, chamber_pressure)
+
+    saturated = n2o.saturation(external_temp.to(constants.ureg.degK).magnitude)
+
+    assert tank.pressure == pytest.approx(saturated.vapour_pressure, rel=1e-6)
+    assert tank.volume == pytest.approx(constants.to_si(config.initial_oxidiser_volume) / (1 - config.tank_ullage))
+    assert tank.liquid_mass(tank.mass, saturated) == pytest.approx(saturated.liquid_density * constants.to_si(config.initial_oxidiser_volume))
+
+
+def test_liquid_draw_chills_the_tank_until_the_flow_stops(external_temp):
+    tank = BlowdownOxidiser(external_temp, config, chamber_pressure)
+
+    flows = []
+    temperatures = []
+
+    while not flows or flows[-1] > 0:
+        flows.append(tank.mass_flow_rate_function())
+        temperatures.append(tank.temperature)
+
+    # Everything the injector drew came out of the tank
+    assert sum(flows) * tank.time_step == pytest.approx(tank.initial_mass - tank.mass, rel=1e-12)
+
+    assert np.all(np.diff(flows[:-1]) < 0)
+    assert np.all(np.diff(temperatures[:-1]) < 0)
+
+    # Boiling the liquid cooled it until its vapour pressure met the chamber's, before the liquid ran out
+    assert tank.liquid
+    assert tank.pressure == pytest.approx(chamber_pressure, rel=1e-6)
+
+
+def test_vapour_left_expands_isentropically(external_temp):
+    tank = BlowdownOxidiser(external_temp, config, chamber_pressure)
+
+    # Only the last of the liquid left
+    saturated = tank.table.properties(tank.temperature)
+    tank.mass = saturated.vapour_density * tank.volume * 1.0001
+
+    assert tank.mass_flow_rate_function() > 0
+    assert not tank.liquid
+
+    start_density = tank.vapour_density
+
+    for _ in range(10):
+        assert tank.mass_flow_rate_function() > 0
+
+    # The pressure and temperature are set from the density before this step's draw
+    expansion = (tank.mass + tank.mass_flow_rate * tank.time_step) / tank.volume / start_density
+
+    assert expansion < 1
+    assert tank.pressure == pytest.approx(tank.vapour_pressure * expansion ** n2o.vapour_heat_capacity_ratio)
+    assert tank.temperature == pytest.approx(tank.vapour_temperature * expansion ** (n2o.vapour_heat_capacity_ratio - 1))
+
+
+def test_batched_tanks_step_like_single_tanks(external_temp):
+    colder = constants.ureg.Quantity(40, constants.ureg.degF)
+    configs = [config, config.replace(injector_diameter=0.05)]
+    time_step = constants.to_si(config.time_step)
+
+    tanks = BlowdownTanks([external_temp, colder], configs, chamber_pressure, time_step)
+    singles = [BlowdownOxidiser(temp, c, chamber_pressure) for temp, c in zip([external_temp, colder], configs)]
+
+    for step in range(2000):
+        # The second tank sits out the first half
+        mask = np.array([True, step >= 1000])
+
+        flows = tanks.mass_flow_rate_function(mask)
+
+        for k, single in enumerate(singles):
+            if not mask[k]:
+                continue
+
+            assert flows[k] == pytest.approx(single.mass_flow_rate_function(), rel=1e-9)
+            assert tanks.temperature[k] == pytest.approx(single.temperature, rel=1e-9)
+
+    assert tanks.mass[1] == pytest.approx(singles[1].mass, rel=1e-9)
+    assert tanks.mass[1] > tanks.mass[0]
+
+
+def test_blowdown_burn_draws_the_tank_down(external_temp, table):
+    constant = create_simulation(external_temp, table=table).run()
+    blowdown = create_simulation(external_temp, config, table=table).run()
+
+    flow = blowdown.data()['oxidiser mass flow rate (kilogram / second)'].to_numpy()
+
+    # The flow falls with the tank pressure, and the burn ends with vapour and cold liquid left in the tank
+    assert np.all(np.diff(flow[:-1]) <= 0)
+    assert flow[-1] == 0
+    assert flow[0] > 10 * flow[-2]
+
+    assert blowdown.oxidiser.mass > 0
+    assert blowdown.impulse < constant.impulse
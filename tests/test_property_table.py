@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import libraries.constants as constants
+
+from libraries.property_table import PropertyTable, property_names
+from libraries.thermochemical import Thermochemical
+
+
+def test_interpolation_error_bound(table):
+    """Bilinear error peaks at the cell centres, checked there against live thermo
+    """
+
+    pytest.importorskip('thermo')
+
+    report = table.error_report(Thermochemical().get_mixture())
+
+    for name in ('Cp', 'Cv', 'gamma'):
+        assert report[name][0] < 2e-5, name
+
+    assert report['R'][0] < 1e-12
+    assert report['density'][0] < 5e-4
+
+
+def test_single_state_matches_vectorized(table):
+    T = np.array([600.0, 1234.5, 2999.9, 3000.0, 3456.7])
+    P = np.array([2e5, 1.5e6, 3447000.0, 3447000.0, 7.9e6])
+
+    interpolated = table.interpolate(T, P)
+
+    for k in range(len(T)):
+        Cp, Cv, density, R = table.properties(T[k], P[k])
+
+        np.testing.assert_allclose(
+            [Cp, Cv, density, R],
+            [interpolated[name][k] for name in ('Cp', 'Cv', 'density', 'R')],
+            rtol=1e-12
+        )
+
+
+def test_grid_points_are_exact(table):
+    i, j = 37, 101
+
+    T = table.temperatures[i]
+    P = table.pressures[j]
+
+    interpolated = table.interpolate(T, P)
+
+    for k, name in enumerate(property_names):
+        expected = table.values[k, i, j] / T if name == 'density' else table.values[k, i, j]
+
+        assert interpolated[name] == pytest.approx(expected, rel=1e-12), name
+
+
+def test_table_on_another_grid_is_rebuilt(tmp_path, monkeypatch, table):
+    pytest.importorskip('thermo')
+
+    path = str(tmp_path / 'combustion_products.npz')
+    mixture = Thermochemical(live=False).get_mixture()
+
+    table.save(path)
+
+    assert PropertyTable.load_or_build(mixture, path).temperatures.shape == table.temperatures.shape
+
+    monkeypatch.setattr(constants, 'property_table_temperatures', (500 * constants.ureg.K, 3600 * constants.ureg.K, 32))
+    monkeypatch.setattr(constants, 'property_table_pressures', (0.1 * constants.ureg.bar, 80 * constants.ureg.bar, 9))
+
+    rebuilt = PropertyTable.load_or_build(mixture, path)
+
+    assert rebuilt.values.shape == (len(property_names), 32, 9)
+    assert PropertyTable.load(path).values.shape == rebuilt.values.shape
@@ -0,0 +1,71 @@
+import os
+import json
+
+import pytest
+
+from libraries.report import run_name, run_paths, save_run, load_data, render_report, image_name
+from libraries.sinks import create_sink
+from libraries.simulation import create_simulation
+
+
+@pytest.fixture
+def saved_run(tmp_path, external_temp, table):
+    """Name and results directory of a saved 70F run, its time series and run inputs without a report
+    """
+
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('fpdf')
+
+    results_dir = str(tmp_path)
+    name = run_name(True, external_temp)
+    paths = run_paths(name, results_dir)
+
+    simulation = create_simulation(external_temp, table=table, sink=create_sink(paths['data'])).run()
+
+    save_run(paths['run'], True, external_temp, simulation.config, simulation.time, simulation.impulse)
+
+    return name, results_dir
+
+
+def test_report_is_rendered_from_saved_results(saved_run):
+    name, results_dir = saved_run
+    paths = run_paths(name, results_dir)
+
+    assert render_report(name, results_dir, workers=2, summary_page=True)
+
+    assert os.path.getsize(paths['pdf']) > 0
+
+    from PIL import Image
+
+    for column in load_data(paths['data']).columns:
+        with Image.open(os.path.join(paths['images'], image_name(column) + '.png')) as image:
+            # Opaque RGB, FPDF splits an alpha channel pixel by pixel
+            assert image.mode == 'RGB'
+
+    assert os.path.exists(os.path.join(paths['images'], 'inlet_mach.png'))
+    assert os.path.exists(os.path.join(paths['images'], 'summary.png'))
+
+
+def test_unchanged_report_is_skipped(saved_run):
+    name, results_dir = saved_run
+    paths = run_paths(name, results_dir)
+
+    assert render_report(name, results_dir, workers=1)
+    assert not render_report(name, results_dir, workers=1)
+
+    assert render_report(name, results_dir, workers=1, force=True)
+
+    # Changed run inputs render the report again
+    with open(paths['run']) as f:
+        run = json.load(f)
+
+    run['impulse (newton * second)'] += 1
+
+    with open(paths['run'], 'w') as f:
+        json.dump(run, f)
+
+    assert render_report(name, results_dir, workers=1)
+    assert not render_report(name, results_dir, workers=1)
+
+    # So do other report options
+    assert render_report(name, results_dir, workers=1, summary_page=True)
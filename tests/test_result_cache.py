@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.result_cache import ResultCache, code_version, input_key
+from libraries.thermochemical import Thermochemical
+
+
+@pytest.fixture
+def mixture():
+    return Thermochemical(live=False).get_mixture()
+
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+    return path
+
+
+def test_input_key_follows_every_input(external_temp, mixture):
+    key = input_key(MotorConfig(), external_temp, mixture, ideal=True)
+
+    assert key == input_key(MotorConfig(), external_temp, mixture, ideal=True)
+
+    assert key != input_key(MotorConfig(injector_mass_flow_rate=0.042), external_temp, mixture, ideal=True)
+    assert key != input_key(MotorConfig(), constants.ureg.Quantity(40, constants.ureg.degF), mixture, ideal=True)
+    assert key != input_key(MotorConfig(), external_temp, mixture, ideal=False)
+    assert key != input_key(MotorConfig(), external_temp, mixture, ideal=True, tabulated=True)
+
+
+def test_code_version_is_read_once():
+    code_version.cache_clear()
+
+    assert code_version() == code_version()
+    assert code_version.cache_info().misses == 1
+
+
+def test_stored_run_is_loaded_back(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+
+    source = write(str(tmp_path / 'motor_data.csv'), 'time (second),thrust\n0.0,1.0\n')
+    restored = str(tmp_path / 'restored.csv')
+
+    assert cache.load('key', {'motor_data.csv': restored}) is None
+
+    cache.store('key', {'motor_data.csv': source}, {'nozzle_throat_dia_avg': 0.17})
+
+    assert cache.load('key', {'motor_data.csv': restored}) == {'nozzle_throat_dia_avg': 0.17}
+
+    with open(restored) as f:
+        assert f.read() == 'time (second),thrust\n0.0,1.0\n'
+
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_runs_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_size=2500)
+
+    source = write(str(tmp_path / 'motor_data.csv'), 'x' * 1000)
+
+    for key in ('a', 'b'):
+        cache.store(key, {'motor_data.csv': source}, {})
+
+    # Used again, so b is the least recently used when c pushes the cache past its size
+    os.utime(cache.entry_path('a'), (1e9, 1.5e9))
+    os.utime(cache.entry_path('b'), (1e9, 1e9))
+
+    cache.store('c', {'motor_data.csv': source}, {})
+
+    assert sorted(os.listdir(cache.path)) == ['a', 'c']
+    assert cache.size() <= 2500
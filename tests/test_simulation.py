@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.simulation import create_simulation
+
+
+def test_numeric_engine_matches_pint_reference(external_temp):
+    """The numeric engine steps the reference pint engine's burn to its rounding digits
+
+    Both solve the mass flow by successive substitution, the reference engine's only solver. The reference
+    engine takes about 10 ms a step, so only the start of the burn is compared.
+    """
+
+    pytest.importorskip('thermo')
+
+    reference = create_simulation(external_temp, reference=True)
+    numeric = create_simulation(external_temp, MotorConfig(mass_flow_solver='fixed_point'))
+
+    for _ in range(200):
+        reference.step()
+        numeric.step()
+
+    expected = reference.data()
+    actual = numeric.data()
+
+    assert list(actual.columns) == list(expected.columns)
+    np.testing.assert_array_equal(actual.index.to_numpy(), expected.index.to_numpy())
+
+    for column in expected.columns:
+        np.testing.assert_allclose(actual[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float), rtol=0, atol=1e-9, err_msg=column)
+
+    assert numeric.impulse == pytest.approx(reference.impulse, rel=1e-12)
+
+
+
+def test_newton_and_fixed_point_mass_flow_solvers_agree(external_temp, table):
+    newton = create_simulation(external_temp, MotorConfig(mass_flow_solver='newton'), table=table).run()
+    fixed_point = create_simulation(external_temp, MotorConfig(mass_flow_solver='fixed_point'), table=table).run()
+
+    assert newton.count == fixed_point.count
+
+    expected = fixed_point.data()
+    actual = newton.data()
+
+    np.testing.assert_allclose(actual['nozzle thrust (newton)'], expected['nozzle thrust (newton)'], rtol=0, atol=0.005)
+    np.testing.assert_allclose(actual['average total mass flow rate (kilogram / second)'], expected['average total mass flow rate (kilogram / second)'], rtol=0, atol=2e-6)
+
+    assert newton.impulse == pytest.approx(fixed_point.impulse, rel=1e-4)
+
+    newton_diagnostics = newton.diagnostics()
+    fixed_point_diagnostics = fixed_point.diagnostics()
+
+    # Newton converges to round off in fewer iterations, fixed point stops at its tolerance
+    assert newton_diagnostics['solver residual (kilogram / second)'].abs().max() < 1e-12
+    assert fixed_point_diagnostics['solver residual (kilogram / second)'].abs().max() < 2e-6
+    assert newton_diagnostics['solver iterations'].mean() < fixed_point_diagnostics['solver iterations'].mean()
+
+
+def test_adaptive_integrator_matches_euler(external_temp, table):
+    euler = create_simulation(external_temp, table=table).run()
+    adaptive = create_simulation(external_temp, MotorConfig(integrator='rk45'), table=table).run()
+
+    # Burnout is located inside the last Euler step, and the whole burn takes a handful of steps
+    assert abs(adaptive.time - euler.time) < constants.to_si(constants.time_step)
+    assert adaptive.impulse == pytest.approx(euler.impulse, rel=1e-3)
+    assert len(adaptive.integration_steps()) < 100
+
+    data = adaptive.data()
+
+    # Resampled onto the time step grid, then the burnout row with no oxidiser flow
+    np.testing.assert_allclose(np.diff(data.index.to_numpy()[:-1]), constants.to_si(constants.time_step))
+    assert data.index[-1] == adaptive.time
+    assert data['oxidiser mass flow rate (kilogram / second)'].iloc[-1] == 0
+    assert data['oxidiser mass flow rate (kilogram / second)'].iloc[-2] > 0
+
+
+def test_adaptive_integrator_stops_on_burn_through(external_temp, table):
+    simulation = create_simulation(external_temp, MotorConfig(integrator='rk45', grain_diameter=1.05), table=table)
+
+    with pytest.raises(ValueError, match='burn through'):
+        simulation.run()
+
+    assert simulation.time < 11
+    assert simulation.data()['average port diameter (inch)'].max() <= 1.05
+
+
+def test_adaptive_integrator_runs_the_whole_burn(external_temp, table):
+    simulation = create_simulation(external_temp, MotorConfig(integrator='rk45'), table=table)
+
+    with pytest.raises(ValueError):
+        simulation.run(until=1.0)
+
+    with pytest.raises(ValueError):
+        create_simulation(external_temp, MotorConfig(integrator='rk45', oxidiser_model='blowdown'), table=table)
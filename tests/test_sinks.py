@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import libraries.constants as constants
+
+from libraries.report import load_data
+from libraries.sinks import create_sink, output_formats
+from libraries.simulation import create_simulation
+
+# Modules each output format needs besides pandas
+format_modules = {
+    'csv': None,
+    'parquet': 'pyarrow',
+    'hdf5': 'tables'
+}
+
+
+@pytest.mark.parametrize('output_format', list(output_formats))
+def test_streamed_time_series_round_trips(tmp_path, monkeypatch, external_temp, table, output_format):
+    if format_modules[output_format] is not None:
+        pytest.importorskip(format_modules[output_format])
+
+    # Small chunks, so the burn is written as many chunks
+    monkeypatch.setattr(constants, 'output_chunk_size', 1000)
+
+    path = str(tmp_path / ('motor_data' + output_formats[output_format]))
+
+    expected = create_simulation(external_temp, table=table).run()
+    streamed = create_simulation(external_temp, table=table, sink=create_sink(path, output_format)).run()
+
+    assert streamed.recorder.streamed()
+
+    data = load_data(path)
+
+    pd.testing.assert_frame_equal(data, expected.data(), check_exact=output_format != 'csv', rtol=1e-12)
+
+    # The running statistics of the streamed rows give the in memory summary
+    assert streamed.summary() == pytest.approx(expected.summary(), rel=1e-12)
+
+
+@pytest.mark.parametrize('output_format', list(output_formats))
+def test_sink_appends_chunks(tmp_path, output_format):
+    if format_modules[output_format] is not None:
+        pytest.importorskip(format_modules[output_format])
+
+    frame = pd.DataFrame(
+        {'thrust (newton)': [0.0, 1.5, 2.25, 3.125], 'oxi fuel ratio': [4.0, 4.5, 5.0, 5.5]},
+        index=pd.Index([0.0, 0.001, 0.002, 0.003], name='time (second)')
+    )
+
+    path = str(tmp_path / ('data' + output_formats[output_format]))
+
+    with create_sink(path, output_format) as sink:
+        sink.write(frame.iloc[:3])
+        sink.write(frame.iloc[3:])
+
+    assert sink.rows == len(frame)
+
+    pd.testing.assert_frame_equal(load_data(path), frame)
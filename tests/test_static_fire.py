@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import libraries.constants as constants
+
+from libraries import sweep
+from libraries.cli import load_jobs
+from libraries.static_fire import BinnedMeans, fit_test_burns, load_test_burn, simulated_thrust
+
+# Not collected as a test class by pytest
+from libraries.static_fire import TestBurn as Burn
+
+truth = {'injector_mass_flow_rate': 0.03}
+
+
+@pytest.fixture
+def synthetic_log(tmp_path, external_temp, table):
+    """Path of a 1 kHz CSV log of a burn at the truth injector flow, in ms and lbf with a load cell offset, noise and a second before ignition
+    """
+
+    sweep.warm_up(True, external_temp)
+
+    time = np.arange(0, 16, 1 / 1000)
+    thrust = simulated_thrust(Burn('truth', time - 1, time, external_temp), truth)
+    thrust[time < 1] = 0
+
+    noise = np.random.default_rng(0).normal(0, 2, len(time))
+    pounds = (thrust + 3 + noise) * constants.ureg.Quantity(1, constants.ureg.newton).to(constants.ureg.lbf).magnitude
+
+    path = str(tmp_path / 'static_fire.csv')
+
+    pd.DataFrame({'t (ms)': time * 1000, 'load cell (lbf)': pounds}).to_csv(path, index=False)
+
+    return path, time, thrust
+
+
+def test_binned_means_do_not_depend_on_the_chunks():
+    rng = np.random.default_rng(3)
+    times = np.sort(rng.uniform(0, 10, 5000))
+    values = rng.normal(0, 1, (2, 5000))
+    values[1, 100] = np.nan
+
+    whole = BinnedMeans(2, 0.1)
+    whole.add(times, values)
+
+    chunked = BinnedMeans(2, 0.1)
+
+    for start in range(0, 5000, 777):
+        chunked.add(times[start:start + 777], values[:, start:start + 777])
+
+    np.testing.assert_allclose(chunked.means()[0], whole.means()[0])
+    np.testing.assert_allclose(chunked.means()[1], whole.means()[1])
+
+    # The sample with a NaN is left out of both channels
+    kept = np.arange(5000) != 100
+    expected = pd.DataFrame(values.T[kept]).groupby(np.floor((times[kept] - times[0]) / 0.1)).mean()
+
+    assert whole.counts.sum() == 4999
+    np.testing.assert_allclose(whole.means()[1], expected.to_numpy().T)
+
+
+def test_log_is_converted_zeroed_and_aligned(synthetic_log, external_temp):
+    path, time, thrust = synthetic_log
+
+    arguments = dict(time_column='t (ms)', thrust_column='load cell (lbf)', time_units='millisecond', thrust_units='lbf')
+
+    burn = load_test_burn(path, external_temp, **arguments)
+
+    # Read a few thousand samples at a time, the log gives the same burn
+    chunked = load_test_burn(path, external_temp, chunk_size=3000, **arguments)
+
+    np.testing.assert_allclose(chunked.thrust, burn.thrust)
+
+    # Averaged down to 50 Hz, from ignition with time 0 at half the peak thrust
+    assert np.diff(burn.time) == pytest.approx(0.02)
+    assert burn.time[0] < 0 < burn.time[-1]
+    assert burn.thrust[burn.time < 0].max() <= 0.5 * burn.thrust.max() < burn.thrust[burn.time == 0][0]
+
+    assert burn.impulse() == pytest.approx(np.trapz(thrust, time), rel=0.01)
+
+    # Away from the filter's ringing at ignition and burnout
+    middle = (burn.time > 2) & (burn.time < 8)
+
+    np.testing.assert_allclose(burn.thrust[middle], np.interp(burn.time[middle], time - 1, thrust), rtol=0.02)
+
+    with pytest.raises(ValueError):
+        load_test_burn(path.replace('.csv', '.xlsx'), external_temp)
+
+
+def test_fit_recovers_the_injector_flow(synthetic_log, external_temp, tmp_path):
+    path, _, _ = synthetic_log
+
+    burn = load_test_burn(path, external_temp, time_column='t (ms)', thrust_column='load cell (lbf)', time_units='millisecond', thrust_units='lbf')
+
+    result = fit_test_burns([burn], shared=(), restarts=2, workers=2)
+
+    assert result.parameters[0]['injector_mass_flow_rate'] == pytest.approx(truth['injector_mass_flow_rate'], rel=0.02)
+    assert result.cost == result.restarts['cost'].iloc[0]
+    assert len(result.restarts) == 2
+
+    # Within the noise and the filtered ignition transient
+    assert result.rms_error()[burn.name] < 0.05 * burn.thrust.max()
+
+    # The motor definition it writes runs with the fitted injector flow
+    job, = load_jobs(result.write(str(tmp_path / 'fitted'))[0])
+
+    assert job['name'] == 'static_fire'
+    assert job['parameters']['injector_mass_flow_rate'] == pytest.approx(result.parameters[0]['injector_mass_flow_rate'])
+
+
+def test_fitted_parameters_are_checked(external_temp):
+    burn = Burn('burn', np.linspace(0, 10, 11), np.ones(11), external_temp)
+
+    with pytest.raises(ValueError, match='grain_diamter'):
+        fit_test_burns([burn], shared=('grain_diamter',))
+
+    with pytest.raises(ValueError, match='both shared and individual'):
+        fit_test_burns([burn], shared=('a',), individual=('a',))
+
+    with pytest.raises(ValueError, match='bounds'):
+        fit_test_burns([burn], shared=('port_length',))
@@ -0,0 +1,84 @@
+import pytest
+
+from libraries.config import MotorConfig
+from libraries.simulation import create_simulation
+from libraries.thermodynamic import NumericThermodynamic, PropertyCache, property_cache
+
+
+class CountingMixture:
+    """Stands in for a thermo Mixture of an ideal gas, counting the property reads
+    """
+
+    CASs = ['7727-37-9']
+    zs = [1.0]
+
+    def __init__(self, T=3000.0, P=3447000.0):
+        self.T = T
+        self.P = P
+        self.reads = 0
+
+    @property
+    def Cpg(self):
+        self.reads += 1
+
+        return 1000.0 + self.T / 10
+
+    Cvg = 750.0
+    R_specific = 296.8
+
+    @property
+    def rhog(self):
+        return self.P / (self.R_specific * self.T)
+
+
+def test_cache_hits_repeated_states_and_evicts_the_least_recently_used():
+    cache = PropertyCache(2)
+    mixture = CountingMixture()
+    composition = (tuple(mixture.CASs), tuple(mixture.zs))
+
+    for T in (1000.0, 2000.0, 1000.0, 3000.0, 2000.0):
+        mixture.T = T
+        cache.lookup(composition, mixture)
+
+    # 1000 K hit once, 2000 K was evicted by 3000 K before it came back
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert mixture.reads == 4
+    assert len(cache.entries) == 2
+
+
+def test_uncached_state_reads_the_mixture_once_per_state():
+    cache = PropertyCache(16)
+    mixture = CountingMixture()
+    thermo = NumericThermodynamic(mixture, cache=None)
+
+    thermo.set_state(2500.0, 2e6)
+    K = thermo.K()
+    thermo.Cp()
+
+    # The same state again keeps what was read at it
+    thermo.set_state(2500.0, 2e6)
+    thermo.Cp()
+
+    assert mixture.reads == 1
+    assert K == pytest.approx((1000.0 + 250.0) / 750.0)
+    assert thermo.density() == pytest.approx(2e6 / (296.8 * 2500.0))
+
+    thermo.set_state(2600.0, 2e6)
+    thermo.Cp()
+
+    assert mixture.reads == 2
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_states_new_every_step_bypass_the_shared_cache(external_temp):
+    pytest.importorskip('thermo')
+
+    property_cache.clear()
+
+    simulation = create_simulation(external_temp, MotorConfig(chamber_pressure_model='throat'))
+
+    for _ in range(100):
+        simulation.step()
+
+    # Only the exit state went through the cache, not the throat and chamber states that move every step
+    assert property_cache.misses <= 1
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import libraries.constants as constants
+
+from libraries.config import MotorConfig
+from libraries.simulation import create_simulation
+from libraries.vectorized import VectorizedSimulation, burn_through_error
+
+configs = [
+    MotorConfig(),
+    MotorConfig(injector_mass_flow_rate=0.042),
+    MotorConfig(grain_diameter=2.0, port_length=10.0),
+    MotorConfig(mass_flow_solver='newton', a=0.06)
+]
+
+compared_columns = [
+    'burn time (second)',
+    'impulse (newton * second)',
+    'average thrust (newton)',
+    'nozzle throat diameter (inch)',
+    'nozzle exit diameter (inch)',
+    'nozzle diffuser length (inch)',
+    'peak thrust (newton)',
+    'average oxi fuel ratio'
+]
+
+
+def test_lockstep_batch_matches_one_by_one_runs(external_temp, table):
+    summary = VectorizedSimulation(configs, external_temp, table=table).run().summary()
+
+    for k, config in enumerate(configs):
+        expected = create_simulation(external_temp, config, table=table).run().summary()
+
+        assert summary['motor code'][k] == expected['motor code']
+
+        for column in compared_columns:
+            # The one by one runs round their recorded columns to the reported digits
+            assert summary[column][k] == pytest.approx(expected[column], rel=1e-4, abs=1e-6), column
+
+
+def test_each_motor_stops_on_its_own(external_temp, table):
+    thin = MotorConfig(grain_diameter=1.05)
+
+    summary = VectorizedSimulation([MotorConfig(), thin], external_temp, table=table).run().summary()
+
+    assert summary['error'][0] is None
+    assert summary['error'][1] == burn_through_error
+    assert summary['burn time (second)'][1] < summary['burn time (second)'][0]
+
+    with pytest.raises(ValueError):
+        create_simulation(external_temp, thin, table=table).run()
+
+
+def test_motors_in_lockstep_share_a_time_step(external_temp, table):
+    with pytest.raises(ValueError):
+        VectorizedSimulation([MotorConfig(), MotorConfig(time_step=0.002 * constants.ureg.sec)], external_temp, table=table)
+
+
+def test_external_temperature_per_motor(external_temp, table):
+    colder = constants.ureg.Quantity(40, constants.ureg.degF)
+
+    summary = VectorizedSimulation([MotorConfig(), MotorConfig()], [external_temp, colder], table=table).run().summary()
+
+    expected = create_simulation(colder, table=table).run().summary()
+
+    assert summary['impulse (newton * second)'][1] == pytest.approx(expected['impulse (newton * second)'], rel=1e-6)
+    assert not np.isclose(summary['impulse (newton * second)'][0], summary['impulse (newton * second)'][1])